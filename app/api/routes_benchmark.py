@@ -1,11 +1,20 @@
 from fastapi import APIRouter
 from app.evaluation.benchmark import run_benchmark
+from app.evaluation.index_benchmark import run_index_benchmark
 
 router = APIRouter(prefix="/benchmark", tags=["benchmark"])
 
 
 @router.post("/run")
-def run():
+def run(answers: bool = True):
     return {
-        "results": run_benchmark()
+        "results": run_benchmark(answers=answers)
+    }
+
+
+@router.post("/index")
+def run_index(k: int = 10, n_queries: int = 200):
+    return {
+        "k": k,
+        "results": run_index_benchmark(k=k, n_queries=n_queries)
     }
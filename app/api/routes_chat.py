@@ -1,21 +1,26 @@
 from fastapi import APIRouter, HTTPException
+from app.api.sse import sse_response
 from app.models.chat import ChatRequest
-from app.rag.rag_chat import answer_chat
+from app.rag.rag_chat import aanswer_chat, astream_chat
 from app.core.logger import logger
 from app.core.errors import RagError
 
 router = APIRouter()
 
 @router.post("/chat")
-def chat_route(body: ChatRequest):
+async def chat_route(body: ChatRequest):
     try:
-        return answer_chat(
+        return await aanswer_chat(
             session_id=body.session_id,
             user_message=body.messages[-1].content,
             model=body.model,
             temperature=body.temperature,
             top_p=body.top_p,
             top_k=body.top_k,
+            nprobe=body.nprobe,
+            ef_search=body.ef_search,
+            filters=body.filters.to_store() if body.filters else None,
+            collection=body.collection,
         )
     
     except RagError as e:
@@ -28,3 +33,19 @@ def chat_route(body: ChatRequest):
             status_code=500,
             detail="Unexpected server error. Check logs."
         )
+
+@router.post("/chat/stream")
+async def chat_stream_route(body: ChatRequest):
+    """Streaming /chat: the same events as /stream, "done" adds memory_context."""
+    return sse_response(astream_chat(
+        session_id=body.session_id,
+        user_message=body.messages[-1].content,
+        model=body.model,
+        temperature=body.temperature,
+        top_p=body.top_p,
+        top_k=body.top_k,
+        nprobe=body.nprobe,
+        ef_search=body.ef_search,
+        filters=body.filters.to_store() if body.filters else None,
+        collection=body.collection,
+    ))
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from app.core.store import collections
+from app.models.collection import CollectionRequest
+
+router = APIRouter()
+
+@router.get("/collections")
+def list_collections():
+    return {"collections": [collections.describe(name) for name in collections.names()]}
+
+@router.post("/collections")
+def create_collection(body: CollectionRequest):
+    collections.create(body.name, body.settings)
+    return collections.describe(body.name)
+
+@router.delete("/collections/{name}")
+def drop_collection(name: str):
+    collections.drop(name)
+    return {"status": "dropped", "collection": name}
@@ -1,18 +1,29 @@
+from typing import Optional
 from fastapi import APIRouter
 import ollama
 from app.core.metrics import metrics
-from app.core.store import vs
+from app.core.embedding_cache import embedding_cache
+from app.core.rerank_cache import rerank_cache
+from app.core.rewrite_cache import rewrite_cache
+from app.core.store import collections, vs
+from app.rag.answer_cache import answer_cache
 
 router = APIRouter()
 
 @router.get("/debug/metrics")
 def get_metrics():
-    return metrics.summary()
+    return {
+        **metrics.summary(),
+        "embedding_cache": embedding_cache.stats(),
+        "rerank_cache": rerank_cache.stats(),
+        "rewrite_cache": rewrite_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+    }
 
 @router.get("/debug/health")
 def health_check():
-    # Vector store status
-    vector_store_ok = vs.index is not None and vs.meta is not None
+    # Vector store status (does not trigger the lazy load)
+    vector_store_ok = vs.load_error is None
 
     # Check Ollama availability
     try:
@@ -24,12 +35,20 @@ def health_check():
     return {
         "api_status": "ok",
         "vector_store_ok": vector_store_ok,
+        "vector_store": vs.load_status(),
         "ollama_ok": ollama_ok,
         "loaded_models": models.get("models", []) if ollama_ok else [],
         "query_count": metrics.data["query_count"],
         "uptime_seconds": metrics.uptime_seconds(),
     }
 
+@router.post("/debug/warmup")
+def warmup(collection: Optional[str] = None):
+    """Loads a collection's vector store now instead of on the first request."""
+    store = collections.get(collection)
+    store.load()
+    return store.load_status()
+
 @router.get("/debug/ping")
 def ping():
     return {"status": "ok", "message": "pong"}
\ No newline at end of file
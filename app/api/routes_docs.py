@@ -1,97 +1,127 @@
 import os
+import time
 import uuid
-from fastapi import APIRouter, File, UploadFile
+from typing import Optional
+from fastapi import APIRouter, File, Form, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from app.ingestion.extractor import extract_text
 from app.rag.chunking import chunk_text
-from app.rag.embeddings import embed_text
-from app.core.store import vs
+from app.rag.collections import DEFAULT_COLLECTION
+from app.ingestion.dedup import file_hash
+from app.rag.rag import aembed_chunks
+from app.rag.reranker import invalidate_scores
+from app.core.store import collections
 
 router = APIRouter()
 
+def _find_duplicate(store, digest: str) -> Optional[dict]:
+    """Registry record of a live document with these file bytes, if any."""
+    doc_id = store.find_file(digest)
+    # Deleted since find_file → not a duplicate, upload it
+    return store.get_document(doc_id) if doc_id is not None else None
+
 @router.post("/upload")
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(
+        file: UploadFile = File(...),
+        tags: Optional[str] = Form(None),
+        collection: Optional[str] = Form(None)):
+    # Uploading to a new collection creates it with the default settings
+    # (folder and config file on disk → threadpool)
+    store = await run_in_threadpool(collections.get, collection, create=True)
+    data = await file.read()
+
+    # An identical file is already indexed → nothing to extract or embed
+    digest = file_hash(data)
+    existing = await run_in_threadpool(_find_duplicate, store, digest)
+    if existing is not None:
+        return {
+            "status": "duplicate",
+            "chunks": existing["chunk_count"],
+            "filename": file.filename,
+            "doc_id": existing["doc_id"],
+            "collection": collection or DEFAULT_COLLECTION,
+        }
+
     # generate ID
     doc_id = str(uuid.uuid4())
 
-    # save file
-    filepath = f"uploads/{file.filename}"
+    # save file (content-addressed, so same-named uploads don't collide)
+    filename = os.path.basename(file.filename)
+    filepath = os.path.join("uploads", f"{digest[:16]}_{filename}")
     os.makedirs("uploads", exist_ok=True)
     with open(filepath, "wb") as f:
-        f.write(await file.read())
-
-    # extract text
-    text = extract_text(filepath)
+        f.write(data)
 
-    # chunk text
-    chunks = chunk_text(text)
+    # extract text (CPU-bound, keep it off the event loop)
+    text = await run_in_threadpool(extract_text, filepath)
 
-    # embed and store
+    # chunk text, tagging every chunk with filterable metadata
+    chunks = chunk_text(text, doc_id=doc_id)
+    uploaded_at = time.time()
+    tag_list = [t.strip() for t in tags.split(",") if t.strip()] if tags else []
     for chunk in chunks:
-        emb = embed_text(chunk["text"])
-        vs.add(emb, chunk)
+        chunk["filename"] = file.filename
+        chunk["uploaded_at"] = uploaded_at
+        chunk["tags"] = tag_list
+        chunk["file_hash"] = digest
+        chunk["file_size"] = len(data)
 
-    vs.save()
+    # embed (reusing vectors of chunks already indexed) and store;
+    # durable once the WAL record is fsynced
+    embs = await aembed_chunks(chunks, store)
+    await run_in_threadpool(store.add_batch, embs, chunks)
 
     return {
         "status": "indexed",
         "chunks": len(chunks),
         "filename": file.filename,
-        "doc_id": doc_id
+        "doc_id": doc_id,
+        "tags": tag_list,
+        "collection": collection or DEFAULT_COLLECTION,
     }
 
 @router.get("/documents")
-def list_documents():
-    results = {}
-
-    for entry in vs.meta:
-        doc_id = entry["doc_id"]
-        if doc_id not in results:
-            results[doc_id] = 0
-        results[doc_id] += 1
-
-    return results
+def list_documents(
+        collection: Optional[str] = None,
+        offset: int = Query(0, ge=0),
+        limit: int = Query(50, ge=1, le=500)):
+    # One page from the document registry, newest first
+    return collections.get(collection).list_documents(offset, limit)
 
 @router.get("/documents/{doc_id}")
-def get_document_chunks(doc_id: str):
-    chunks = [entry for entry in vs.meta if entry["doc_id"] == doc_id]
-
-    if not chunks:
+def get_document_chunks(
+        doc_id: str,
+        collection: Optional[str] = None,
+        offset: int = Query(0, ge=0),
+        limit: Optional[int] = Query(None, ge=1)):
+    store = collections.get(collection)
+    document = store.get_document(doc_id)
+
+    if document is None:
         return {"error": "Document not found"}
 
     return {
         "doc_id": doc_id,
-        "chunks": chunks
+        "document": document,
+        "chunks": store.get_chunks(doc_id, offset, limit)
     }
 
 @router.delete("/documents/{doc_id}")
-def delete_document(doc_id: str):
-    new_meta = []
-    new_vectors = []
-
-    # Filter out chunks from that document
-    for idx, entry in enumerate(vs.meta):
-        if entry["doc_id"] != doc_id:
-            new_meta.append(entry)
-            new_vectors.append(vs.index.reconstruct(idx))
-
-    if len(new_meta) == len(vs.meta):
+def delete_document(doc_id: str, collection: Optional[str] = None):
+    store = collections.get(collection)
+    # Read before the delete: cached rerank scores for this content go
+    # too, so a re-indexed document is scored afresh
+    chunks = store.get_chunks(doc_id)
+
+    # Tombstones the document's chunks; compaction reclaims space later
+    if not store.delete_document(doc_id):
         return {"error": "Document not found"}
 
-    # Rebuild FAISS index
-    import numpy as np
-    import faiss
-
-    vs.meta = new_meta
-    vs.index = faiss.IndexFlatL2(vs.dim)
-
-    if new_vectors:
-        vs.index.add(np.array(new_vectors).astype("float32"))
-
-    vs.save()
+    invalidate_scores(chunks)
 
     return {"status": "deleted", "doc_id": doc_id}
 
 @router.post("/documents/{doc_id}/reindex")
-def reindex_document(doc_id: str):
-    delete_document(doc_id)
+def reindex_document(doc_id: str, collection: Optional[str] = None):
+    delete_document(doc_id, collection)
     return {"status": "ready_for_upload", "doc_id": doc_id}
\ No newline at end of file
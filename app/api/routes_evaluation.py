@@ -1,42 +1,49 @@
 from fastapi import APIRouter
+from app.core.config import CONFIG
 from app.evaluation.eval_dataset import EVAL_DATASET
 from app.evaluation.evaluator import (
     evaluate_answer,
     evaluate_retrieval,
 )
-from app.rag.rag import answer_query
+from app.rag.rag import answer_query, retrieve_batch
 
 router = APIRouter(prefix="/evaluation", tags=["evaluation"])
 
 @router.post("/run")
-def run_evaluation():
+def run_evaluation(answers: bool = True):
     results = []
 
-    for sample in EVAL_DATASET:
-        question = sample["question"]
+    # Retrieval for every sample in one batched search
+    questions = [sample["question"] for sample in EVAL_DATASET]
+    retrieved = retrieve_batch(questions, retrieval_k=CONFIG.top_k)
 
-        # Run RAG
-        answer, sources = answer_query(question)
+    for sample, chunks in zip(EVAL_DATASET, retrieved):
+        question = sample["question"]
 
         # Evaluation
         retrieval_eval = evaluate_retrieval(
-            sources, sample["expected_doc_ids"]
-        )
-
-        answer_eval = evaluate_answer(
-            answer,
-            sources,
-            sample["expected_facts"]
+            chunks, sample["expected_doc_ids"]
         )
 
-        results.append({
+        entry = {
             "id": sample["id"],
             "question": question,
-            "answer": answer,
-            "sources": sources,
             "retrieval": retrieval_eval,
-            "answer_eval": answer_eval,
-        })
+        }
+
+        if answers:
+            # Run RAG
+            result = answer_query(question)
+
+            entry["answer"] = result["answer"]
+            entry["sources"] = result["sources"]
+            entry["answer_eval"] = evaluate_answer(
+                result["answer"],
+                result["sources"],
+                sample["expected_facts"]
+            )
+
+        results.append(entry)
 
     return {
         "total": len(results),
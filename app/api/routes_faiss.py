@@ -1,18 +1,36 @@
 import os
+from typing import Optional
 from fastapi import APIRouter
-from app.core.store import vs
-from app.rag.vectorstore import DB_FOLDER
+from app.core.store import collections
+from app.rag.index_factory import describe_index
 
 router = APIRouter()
 
 @router.get("/faiss/info")
-def faiss_info():
-    index_path = os.path.join(DB_FOLDER, "index.faiss")
-    size = os.path.getsize(index_path) if os.path.exists(index_path) else 0
+def faiss_info(collection: Optional[str] = None):
+    vs = collections.get(collection)
+    vs.load()
+    size = sum(os.path.getsize(path) for path in vs.index_files if os.path.exists(path))
 
     return {
-        "vectors": vs.index.ntotal,
+        "vectors": vs.ntotal,
+        "delta_vectors": vs.ntotal - vs.index.ntotal,
+        "delta_segments": vs.delta_segments,
         "dimension": vs.dim,
-        "documents": len(vs.meta),
+        "documents": len(vs.documents),
+        "chunks": len(vs.meta),
         "index_file_size_bytes": size,
+        "index": describe_index(vs.index),
+        "mmap": vs.mmapped,
+        "tombstones": len(vs.tombstones),
+        "tombstone_ratio": vs.tombstone_ratio(),
+        "checkpoint": {
+            "generation": vs.checkpoint_generation,
+            "lsn": vs.checkpoint_lsn,
+        },
+        "wal": {
+            "lsn": vs.wal.lsn,
+            "size_bytes": vs.wal.size_bytes(),
+            "fsync_count": vs.wal.fsync_count,
+        },
     }
@@ -1,39 +1,67 @@
 from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
-import ollama
-from app.core.config import CONFIG
-from app.models.query import QueryRequest
-from app.rag.rag import answer_query
+from app.api.sse import sse_response
+from app.models.query import BatchQueryRequest, QueryRequest
+from app.rag.rag import aanswer_query, aretrieve_batch, astream_query
 
 router = APIRouter()
 
 @router.post("/query")
-def query_route(body: QueryRequest):
-    return answer_query(
+async def query_route(body: QueryRequest):
+    return await aanswer_query(
         body.question,
         model=body.model,
         temperature=body.temperature,
         top_p=body.top_p,
         top_k=body.top_k,
+        nprobe=body.nprobe,
+        ef_search=body.ef_search,
+        filters=body.filters.to_store() if body.filters else None,
+        collection=body.collection,
     )
 
-@router.post("/stream")
-def stream_answer(body: QueryRequest):
-
-    async def event_stream():
-        # get the final answer + top chunks
-        answer, sources = answer_query(body.question)
-
-        # stream the answer token-by-token
-        stream = ollama.generate(
-            model=CONFIG.llm_model,
-            prompt=answer,
-            stream=True
-        )
-
-        for chunk in stream:
-            token = chunk.get("response", "")
-            if token:
-                yield token
+@router.post("/query/batch")
+async def batch_query_route(body: BatchQueryRequest):
+    """Retrieval only (no rewrite, rerank or generation) for many questions."""
+    retrieved = await aretrieve_batch(
+        body.questions,
+        retrieval_k=body.top_k,
+        nprobe=body.nprobe,
+        ef_search=body.ef_search,
+        filters=body.filters.to_store() if body.filters else None,
+        collection=body.collection,
+    )
+    return {
+        "results": [
+            {
+                "question": question,
+                "chunks": [
+                    {
+                        "id": c["id"],
+                        "doc_id": c["doc_id"],
+                        "text": c["text"],
+                        "score": c["score"],
+                    }
+                    for c in chunks
+                ],
+            }
+            for question, chunks in zip(body.questions, retrieved)
+        ]
+    }
 
-    return StreamingResponse(event_stream(), media_type="text/plain")
\ No newline at end of file
+@router.post("/stream")
+async def stream_route(body: QueryRequest):
+    """
+    Server-sent events: "sources", then a "token" per generated fragment,
+    then "done" with the guardrail and confidence results (or "error").
+    """
+    return sse_response(astream_query(
+        body.question,
+        model=body.model,
+        temperature=body.temperature,
+        top_p=body.top_p,
+        top_k=body.top_k,
+        nprobe=body.nprobe,
+        ef_search=body.ef_search,
+        filters=body.filters.to_store() if body.filters else None,
+        collection=body.collection,
+    ))
\ No newline at end of file
@@ -0,0 +1,20 @@
+import json
+from typing import AsyncIterator, Tuple
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+def sse_response(events: AsyncIterator[Tuple[str, dict]]) -> StreamingResponse:
+    """Server-sent events from (event, data) pairs, unbuffered by proxies."""
+
+    async def body():
+        async for event, data in events:
+            yield sse_event(event, data)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
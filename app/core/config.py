@@ -1,4 +1,5 @@
 import os
+from typing import Literal, Optional
 from pydantic import BaseModel, Field, field_validator
 
 class RagConfig(BaseModel):
@@ -8,11 +9,110 @@ class RagConfig(BaseModel):
     llm_model: str = Field(default="llama3.2:3b")
     embedding_model: str = Field(default="nomic-embed-text")
 
+    # ---------------------------
+    # Ollama client
+    # ---------------------------
+    ollama_host: Optional[str] = Field(default=None)
+    ollama_timeout_s: float = Field(default=120.0, gt=0)
+    ollama_max_connections: int = Field(default=32, ge=1)
+
+    # ---------------------------
+    # Embeddings
+    # ---------------------------
+    embed_batch_size: int = Field(default=32, ge=1, le=512)
+    embed_cache_enabled: bool = Field(default=True)
+    embed_cache_max_bytes: int = Field(default=64 * 1024 * 1024, ge=0)
+    embed_cache_disk: bool = Field(default=True)
+
+    # ---------------------------
+    # Query rewrite
+    # ---------------------------
+    # auto: skip questions that are already specific; always / off force it
+    rewrite_mode: Literal["auto", "always", "off"] = Field(default="auto")
+    rewrite_min_words: int = Field(default=6, ge=0)
+    rewrite_cache_max_entries: int = Field(default=10_000, ge=0)
+    rewrite_cache_ttl_s: float = Field(default=3600.0, gt=0)
+    # Search the original question while the rewrite runs; give up on a
+    # rewrite that isn't back this long after that search finished
+    rewrite_speculative: bool = Field(default=False)
+    rewrite_speculative_wait_s: float = Field(default=5.0, ge=0)
+
+    # ---------------------------
+    # Semantic answer cache
+    # ---------------------------
+    # Reuse an answer when a question embeds within this cosine similarity of an earlier one
+    answer_cache_enabled: bool = Field(default=True)
+    answer_cache_threshold: float = Field(default=0.95, ge=0.0, le=1.0)
+    answer_cache_max_entries: int = Field(default=1000, ge=0)
+
     # ---------------------------
     # Retrieval
     # ---------------------------
     top_k: int = Field(default=5, ge=1, le=20)
     rerank_enabled: bool = Field(default=True)
+    # llm: scored by the LLM; local: embedding + lexical features, no LLM call; off: retrieval order
+    rerank_backend: Literal["llm", "local", "off"] = Field(default="llm")
+    rerank_local_lexical_weight: float = Field(default=0.3, ge=0.0, le=1.0)
+    # listwise: one LLM call ranks every candidate; pointwise: one call per chunk
+    rerank_mode: Literal["listwise", "pointwise"] = Field(default="listwise")
+    # Pointwise calls in flight at once; match Ollama's OLLAMA_NUM_PARALLEL
+    rerank_concurrency: int = Field(default=4, ge=1)
+    # Per pointwise call, as httpx's per-operation timeout (connect, send, each read);
+    # a non-streamed generate replies in one read, so this bounds the generation
+    rerank_timeout_s: float = Field(default=15.0, gt=0)
+    # Adaptive LLM rerank, margins in points of the 0-100 retrieval blend:
+    # skip when the top hit leads by skip_margin, else rerank the band near the cutoff
+    rerank_adaptive: bool = Field(default=True)
+    rerank_skip_margin: float = Field(default=15.0, ge=0.0, le=100.0)
+    rerank_band_margin: float = Field(default=10.0, ge=0.0, le=100.0)
+    # Pointwise scores cached per (model, normalized query, chunk content)
+    rerank_cache_enabled: bool = Field(default=True)
+    rerank_cache_max_entries: int = Field(default=50_000, ge=0)
+    rerank_cache_ttl_s: float = Field(default=24 * 3600.0, gt=0)
+    rerank_cache_disk: bool = Field(default=True)
+
+    # Hybrid search: BM25 + vector ranking fused by reciprocal rank
+    bm25_enabled: bool = Field(default=True)
+    rrf_k: int = Field(default=60, ge=1)
+    rrf_vector_weight: float = Field(default=1.0, ge=0.0)
+    rrf_bm25_weight: float = Field(default=1.0, ge=0.0)
+    # Filters matching at most this many chunks skip the ANN index and are scored exactly
+    filter_exact_threshold: int = Field(default=4096, ge=0)
+
+    # ---------------------------
+    # ANN index
+    # ---------------------------
+    index_type: Literal["flat", "ivf_flat", "ivf_pq", "hnsw"] = Field(default="flat")
+    index_metric: Literal["l2", "cosine"] = Field(default="l2")
+    index_auto_promote: bool = Field(default=True)
+    index_promote_threshold: int = Field(default=50_000, ge=1)
+    ivf_nlist: int = Field(default=0, ge=0)  # 0 = derive from corpus size
+    ivf_nprobe: int = Field(default=16, ge=1)
+    hnsw_m: int = Field(default=32, ge=4)
+    hnsw_ef_construction: int = Field(default=200, ge=8)
+    hnsw_ef_search: int = Field(default=64, ge=1)
+    compaction_tombstone_ratio: float = Field(default=0.2, gt=0.0, le=1.0)
+    index_shards: int = Field(default=1, ge=1, le=64)  # searched in parallel, ids routed by id % shards
+    delta_merge_vectors: int = Field(default=10_000, ge=1)  # writes since the last merge
+    delta_max_segments: int = Field(default=32, ge=2)  # one per write; folded into one beyond this
+
+    # ---------------------------
+    # Vector compression
+    # ---------------------------
+    index_encoding: Literal["float32", "fp16", "sq8"] = Field(default="float32")
+    pq_m: int = Field(default=64, ge=1)  # sub-quantizers, must divide the stored dim
+    pq_nbits: int = Field(default=8, ge=1, le=16)
+    index_reduction: Literal["none", "pca", "truncate"] = Field(default="none")
+    index_reduced_dim: int = Field(default=256, ge=1)
+
+    # ---------------------------
+    # Persistence (WAL + checkpoints)
+    # ---------------------------
+    wal_group_commit_ms: float = Field(default=2.0, ge=0.0)
+    wal_checkpoint_bytes: int = Field(default=64 * 1024 * 1024, ge=1)
+    wal_checkpoint_interval_s: float = Field(default=300.0, gt=0)
+    index_mmap: bool = True
+    vector_store_preload: bool = False
 
     # ---------------------------
     # Chunking
@@ -20,6 +120,11 @@ class RagConfig(BaseModel):
     max_chunk_chars: int = Field(default=800, ge=200)
     overlap_chars: int = Field(default=120, ge=0)
 
+    # ---------------------------
+    # Guardrails
+    # ---------------------------
+    safety_categories_file: Optional[str] = Field(default=None)
+
     # ---------------------------
     # Generation
     # ---------------------------
@@ -38,8 +143,65 @@ def load_config() -> RagConfig:
     return RagConfig(
         llm_model=os.getenv("RAG_LLM_MODEL", "llama3.2:3b"),
         embedding_model=os.getenv("RAG_EMBED_MODEL", "nomic-embed-text"),
+        ollama_host=os.getenv("OLLAMA_HOST"),
+        ollama_timeout_s=float(os.getenv("RAG_OLLAMA_TIMEOUT", 120.0)),
+        ollama_max_connections=int(os.getenv("RAG_OLLAMA_MAX_CONNECTIONS", 32)),
+        embed_batch_size=int(os.getenv("RAG_EMBED_BATCH_SIZE", 32)),
+        embed_cache_enabled=os.getenv("RAG_EMBED_CACHE", "true").lower() == "true",
+        embed_cache_max_bytes=int(os.getenv("RAG_EMBED_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+        embed_cache_disk=os.getenv("RAG_EMBED_CACHE_DISK", "true").lower() == "true",
+        rewrite_mode=os.getenv("RAG_REWRITE_MODE", "auto"),
+        rewrite_min_words=int(os.getenv("RAG_REWRITE_MIN_WORDS", 6)),
+        rewrite_cache_max_entries=int(os.getenv("RAG_REWRITE_CACHE_MAX_ENTRIES", 10_000)),
+        rewrite_cache_ttl_s=float(os.getenv("RAG_REWRITE_CACHE_TTL", 3600.0)),
+        rewrite_speculative=os.getenv("RAG_REWRITE_SPECULATIVE", "false").lower() == "true",
+        rewrite_speculative_wait_s=float(os.getenv("RAG_REWRITE_SPECULATIVE_WAIT", 5.0)),
+        answer_cache_enabled=os.getenv("RAG_ANSWER_CACHE", "true").lower() == "true",
+        answer_cache_threshold=float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", 0.95)),
+        answer_cache_max_entries=int(os.getenv("RAG_ANSWER_CACHE_MAX_ENTRIES", 1000)),
         top_k=int(os.getenv("RAG_TOP_K", 5)),
         rerank_enabled=os.getenv("RAG_RERANK", "true").lower() == "true",
+        rerank_backend=os.getenv("RAG_RERANK_BACKEND", "llm"),
+        rerank_local_lexical_weight=float(os.getenv("RAG_RERANK_LOCAL_LEXICAL_WEIGHT", 0.3)),
+        rerank_mode=os.getenv("RAG_RERANK_MODE", "listwise"),
+        rerank_concurrency=int(os.getenv("RAG_RERANK_CONCURRENCY", os.getenv("OLLAMA_NUM_PARALLEL", 4))),
+        rerank_timeout_s=float(os.getenv("RAG_RERANK_TIMEOUT", 15.0)),
+        rerank_adaptive=os.getenv("RAG_RERANK_ADAPTIVE", "true").lower() == "true",
+        rerank_skip_margin=float(os.getenv("RAG_RERANK_SKIP_MARGIN", 15.0)),
+        rerank_band_margin=float(os.getenv("RAG_RERANK_BAND_MARGIN", 10.0)),
+        rerank_cache_enabled=os.getenv("RAG_RERANK_CACHE", "true").lower() == "true",
+        rerank_cache_max_entries=int(os.getenv("RAG_RERANK_CACHE_MAX_ENTRIES", 50_000)),
+        rerank_cache_ttl_s=float(os.getenv("RAG_RERANK_CACHE_TTL", 24 * 3600.0)),
+        rerank_cache_disk=os.getenv("RAG_RERANK_CACHE_DISK", "true").lower() == "true",
+        bm25_enabled=os.getenv("RAG_BM25", "true").lower() == "true",
+        rrf_k=int(os.getenv("RAG_RRF_K", 60)),
+        rrf_vector_weight=float(os.getenv("RAG_RRF_VECTOR_WEIGHT", 1.0)),
+        rrf_bm25_weight=float(os.getenv("RAG_RRF_BM25_WEIGHT", 1.0)),
+        filter_exact_threshold=int(os.getenv("RAG_FILTER_EXACT_THRESHOLD", 4096)),
+        index_type=os.getenv("RAG_INDEX_TYPE", "flat"),
+        index_metric=os.getenv("RAG_INDEX_METRIC", "l2"),
+        index_auto_promote=os.getenv("RAG_INDEX_AUTO_PROMOTE", "true").lower() == "true",
+        index_promote_threshold=int(os.getenv("RAG_INDEX_PROMOTE_THRESHOLD", 50_000)),
+        ivf_nlist=int(os.getenv("RAG_IVF_NLIST", 0)),
+        ivf_nprobe=int(os.getenv("RAG_IVF_NPROBE", 16)),
+        hnsw_m=int(os.getenv("RAG_HNSW_M", 32)),
+        hnsw_ef_construction=int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", 200)),
+        hnsw_ef_search=int(os.getenv("RAG_HNSW_EF_SEARCH", 64)),
+        compaction_tombstone_ratio=float(os.getenv("RAG_COMPACTION_TOMBSTONE_RATIO", 0.2)),
+        index_shards=int(os.getenv("RAG_INDEX_SHARDS", 1)),
+        delta_merge_vectors=int(os.getenv("RAG_DELTA_MERGE_VECTORS", 10_000)),
+        delta_max_segments=int(os.getenv("RAG_DELTA_MAX_SEGMENTS", 32)),
+        index_encoding=os.getenv("RAG_INDEX_ENCODING", "float32"),
+        pq_m=int(os.getenv("RAG_PQ_M", 64)),
+        pq_nbits=int(os.getenv("RAG_PQ_NBITS", 8)),
+        index_reduction=os.getenv("RAG_INDEX_REDUCTION", "none"),
+        index_reduced_dim=int(os.getenv("RAG_INDEX_REDUCED_DIM", 256)),
+        wal_group_commit_ms=float(os.getenv("RAG_WAL_GROUP_COMMIT_MS", 2.0)),
+        wal_checkpoint_bytes=int(os.getenv("RAG_WAL_CHECKPOINT_BYTES", 64 * 1024 * 1024)),
+        wal_checkpoint_interval_s=float(os.getenv("RAG_WAL_CHECKPOINT_INTERVAL", 300.0)),
+        index_mmap=os.getenv("RAG_INDEX_MMAP", "true").lower() == "true",
+        vector_store_preload=os.getenv("RAG_VECTOR_STORE_PRELOAD", "false").lower() == "true",
+        safety_categories_file=os.getenv("RAG_SAFETY_CATEGORIES"),
         temperature=float(os.getenv("RAG_TEMPERATURE", 0.2)),
         top_p=float(os.getenv("RAG_TOP_P", 0.9)),
     )
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from app.core.config import CONFIG
+from app.core.logger import logger
+
+CACHE_FILE = os.path.join("db", "embed_cache.sqlite")
+
+# Approximate per-entry overhead of the key tuple and dict slot
+ENTRY_OVERHEAD_BYTES = 128
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed by (embedding model, text hash).
+
+    Two tiers:
+    - memory: LRU bounded by a byte budget
+    - disk:   SQLite table under db/ that survives restarts
+    """
+
+    def __init__(self, max_bytes: int, path: Optional[str] = CACHE_FILE):
+        self.max_bytes = max_bytes
+        self.path = path
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._db = None
+        self.reset_stats()
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    " model TEXT NOT NULL,"
+                    " hash TEXT NOT NULL,"
+                    " vec BLOB NOT NULL,"
+                    " PRIMARY KEY (model, hash))"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"❌ [EMBED CACHE] Disk tier disabled: {e}")
+                self._db = None
+
+    def reset_stats(self):
+        self.stats_data = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+
+    # ---------------------------
+    # Memory tier
+    # ---------------------------
+    def _remember(self, key: tuple, vec: np.ndarray):
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            return
+
+        self._lru[key] = vec
+        self._bytes += vec.nbytes + ENTRY_OVERHEAD_BYTES
+
+        while self._bytes > self.max_bytes and self._lru:
+            _, old = self._lru.popitem(last=False)
+            self._bytes -= old.nbytes + ENTRY_OVERHEAD_BYTES
+            self.stats_data["evictions"] += 1
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Returns one vector per text, or None where both tiers miss."""
+        keys = [(model, text_hash(t)) for t in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+
+        with self._lock:
+            disk_lookup = []
+            for i, key in enumerate(keys):
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self._lru.move_to_end(key)
+                    results[i] = vec
+                    self.stats_data["memory_hits"] += 1
+                else:
+                    disk_lookup.append(i)
+
+            if disk_lookup and self._db is not None:
+                found = self._read_disk(model, {keys[i][1] for i in disk_lookup})
+                for i in disk_lookup:
+                    vec = found.get(keys[i][1])
+                    if vec is not None:
+                        self._remember(keys[i], vec)
+                        results[i] = vec
+                        self.stats_data["disk_hits"] += 1
+
+            self.stats_data["misses"] += sum(1 for r in results if r is None)
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: np.ndarray):
+        rows = []
+        with self._lock:
+            for text, vec in zip(texts, vectors):
+                vec = np.ascontiguousarray(vec, dtype="float32")
+                h = text_hash(text)
+                self._remember((model, h), vec)
+                rows.append((model, h, vec.tobytes()))
+
+            if rows and self._db is not None:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (model, hash, vec) VALUES (?, ?, ?)",
+                        rows
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"❌ [EMBED CACHE] Disk write failed: {e}")
+
+    def _read_disk(self, model: str, hashes: set) -> Dict[str, np.ndarray]:
+        found = {}
+        hashes = list(hashes)
+        try:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                cur = self._db.execute(
+                    f"SELECT hash, vec FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch]
+                )
+                for h, blob in cur:
+                    found[h] = np.frombuffer(blob, dtype="float32")
+        except sqlite3.Error as e:
+            logger.error(f"❌ [EMBED CACHE] Disk read failed: {e}")
+        return found
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.stats_data["memory_hits"] + self.stats_data["disk_hits"]
+            total = hits + self.stats_data["misses"]
+            return {
+                **self.stats_data,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_entries": len(self._lru),
+                "memory_bytes": self._bytes,
+                "memory_max_bytes": self.max_bytes,
+                "disk_enabled": self._db is not None,
+            }
+
+embedding_cache = EmbeddingCache(
+    max_bytes=CONFIG.embed_cache_max_bytes,
+    path=CACHE_FILE if CONFIG.embed_cache_disk else None,
+)
@@ -21,3 +21,7 @@ class PromptError(RagError):
 class LLMError(RagError):
     """LLM model generation failure."""
     pass
+
+class CollectionError(RagError):
+    """Unknown, invalid or misconfigured collection."""
+    pass
@@ -12,9 +12,20 @@ class Metrics:
             "embed_ms": [],
             "search_ms": [],
             "rerank_ms": [],
+            "rerank_listwise_ms": [],
+            "rerank_pointwise_ms": [],
+            "rerank_local_ms": [],
+            "rerank_candidates": [],
             "prompt_ms": [],
             "llm_ms": [],
-            "query_count": 0
+            "llm_first_token_ms": [],
+            "query_count": 0,
+            "rewrite_bypass_count": 0,
+            "rewrite_discarded_count": 0,
+            "rerank_fallback_count": 0,
+            "rerank_timeout_count": 0,
+            "rerank_error_count": 0,
+            "rerank_skip_count": 0,
         }
 
     def record(self, stage: str, duration_ms: float):
@@ -25,6 +36,10 @@ class Metrics:
     def increment_queries(self):
         self.data["query_count"] += 1
 
+    def increment(self, counter: str):
+        if counter in self.data:
+            self.data[counter] += 1
+
     def summary(self) -> Dict:
         def avg(arr):
             return sum(arr) / len(arr) if arr else 0
@@ -32,11 +47,22 @@ class Metrics:
         return {
             "query_count": self.data["query_count"],
             "avg_rewrite_ms": avg(self.data["rewrite_ms"]),
+            "rewrite_bypass_count": self.data["rewrite_bypass_count"],
+            "rewrite_discarded_count": self.data["rewrite_discarded_count"],
             "avg_embed_ms": avg(self.data["embed_ms"]),
             "avg_search_ms": avg(self.data["search_ms"]),
             "avg_rerank_ms": avg(self.data["rerank_ms"]),
+            "avg_rerank_listwise_ms": avg(self.data["rerank_listwise_ms"]),
+            "avg_rerank_pointwise_ms": avg(self.data["rerank_pointwise_ms"]),
+            "avg_rerank_local_ms": avg(self.data["rerank_local_ms"]),
+            "avg_rerank_candidates": avg(self.data["rerank_candidates"]),
+            "rerank_skip_count": self.data["rerank_skip_count"],
+            "rerank_fallback_count": self.data["rerank_fallback_count"],
+            "rerank_timeout_count": self.data["rerank_timeout_count"],
+            "rerank_error_count": self.data["rerank_error_count"],
             "avg_prompt_ms": avg(self.data["prompt_ms"]),
             "avg_llm_ms": avg(self.data["llm_ms"]),
+            "avg_llm_first_token_ms": avg(self.data["llm_first_token_ms"]),
             "uptime_seconds": self.uptime_seconds(),
         }
 
@@ -0,0 +1,49 @@
+import threading
+import httpx
+from ollama import AsyncClient, Client
+from app.core.config import CONFIG
+
+_async_clients = {}
+_sync_clients = {}
+_sync_lock = threading.Lock()
+
+def get_async_client(timeout: float = None) -> AsyncClient:
+    """
+    Returns the process-wide AsyncClient per timeout. Every coroutine
+    shares its pooled HTTP connections to Ollama instead of opening new ones.
+    """
+    timeout = timeout or CONFIG.ollama_timeout_s
+    client = _async_clients.get(timeout)
+    if client is None:
+        client = AsyncClient(
+            host=CONFIG.ollama_host,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=CONFIG.ollama_max_connections,
+                max_keepalive_connections=CONFIG.ollama_max_connections,
+            ),
+        )
+        _async_clients[timeout] = client
+    return client
+
+def get_sync_client(timeout: float = None) -> Client:
+    """
+    Process-wide sync Client per timeout. Thread-safe, so worker
+    threads share its connection pool.
+    """
+    timeout = timeout or CONFIG.ollama_timeout_s
+    client = _sync_clients.get(timeout)
+    if client is None:
+        with _sync_lock:
+            client = _sync_clients.get(timeout)
+            if client is None:
+                client = Client(
+                    host=CONFIG.ollama_host,
+                    timeout=timeout,
+                    limits=httpx.Limits(
+                        max_connections=CONFIG.ollama_max_connections,
+                        max_keepalive_connections=CONFIG.ollama_max_connections,
+                    ),
+                )
+                _sync_clients[timeout] = client
+    return client
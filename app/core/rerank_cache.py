@@ -0,0 +1,213 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.config import CONFIG
+from app.core.logger import logger
+
+CACHE_FILE = os.path.join("db", "rerank_cache.sqlite")
+
+def normalize_query(query: str) -> str:
+    """Case-folded, whitespace-collapsed query so trivial variants share entries."""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+
+class RerankCache:
+    """
+    Pointwise relevance scores keyed by (reranker model, normalized
+    query hash, chunk content hash).
+
+    Two tiers, like the embedding cache:
+    - memory: LRU bounded by an entry count
+    - disk:   SQLite table under db/ that survives restarts
+
+    Entries expire after `ttl_s`; deleting a chunk drops every score
+    computed for its content.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float, path: Optional[str] = CACHE_FILE):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.path = path
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[tuple, Tuple[int, float]]" = OrderedDict()
+        self._db = None
+        self.reset_stats()
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS rerank_scores ("
+                    " model TEXT NOT NULL,"
+                    " query_hash TEXT NOT NULL,"
+                    " chunk_hash TEXT NOT NULL,"
+                    " score INTEGER NOT NULL,"
+                    " expires_at REAL NOT NULL,"
+                    " PRIMARY KEY (model, query_hash, chunk_hash))"
+                )
+                self._db.execute(
+                    "CREATE INDEX IF NOT EXISTS rerank_scores_chunk ON rerank_scores (chunk_hash)"
+                )
+                self._db.execute("DELETE FROM rerank_scores WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"❌ [RERANK CACHE] Disk tier disabled: {e}")
+                self._db = None
+
+    def reset_stats(self):
+        self.stats_data = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    # ---------------------------
+    # Memory tier
+    # ---------------------------
+    def _remember(self, key: tuple, score: int, expires_at: float):
+        self._lru[key] = (score, expires_at)
+        self._lru.move_to_end(key)
+
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.stats_data["evictions"] += 1
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+    def get_many(self, model: str, query: str, chunk_hashes: List[str]) -> List[Optional[int]]:
+        """Returns one score per chunk hash, or None where both tiers miss."""
+        qh = query_hash(query)
+        now = time.time()
+        results: List[Optional[int]] = [None] * len(chunk_hashes)
+
+        with self._lock:
+            disk_lookup = []
+            for i, h in enumerate(chunk_hashes):
+                key = (model, qh, h)
+                entry = self._lru.get(key)
+                if entry is not None and entry[1] <= now:
+                    del self._lru[key]
+                    self.stats_data["expired"] += 1
+                    entry = None
+                if entry is not None:
+                    self._lru.move_to_end(key)
+                    results[i] = entry[0]
+                    self.stats_data["memory_hits"] += 1
+                else:
+                    disk_lookup.append(i)
+
+            if disk_lookup and self._db is not None:
+                found = self._read_disk(model, qh, {chunk_hashes[i] for i in disk_lookup}, now)
+                for i in disk_lookup:
+                    entry = found.get(chunk_hashes[i])
+                    if entry is not None:
+                        self._remember((model, qh, chunk_hashes[i]), *entry)
+                        results[i] = entry[0]
+                        self.stats_data["disk_hits"] += 1
+
+            self.stats_data["misses"] += sum(1 for r in results if r is None)
+
+        return results
+
+    def put_many(self, model: str, query: str, chunk_hashes: List[str], scores: List[int]):
+        qh = query_hash(query)
+        expires_at = time.time() + self.ttl_s
+        rows = []
+        with self._lock:
+            for h, score in zip(chunk_hashes, scores):
+                self._remember((model, qh, h), int(score), expires_at)
+                rows.append((model, qh, h, int(score), expires_at))
+
+            if rows and self._db is not None:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO rerank_scores"
+                        " (model, query_hash, chunk_hash, score, expires_at) VALUES (?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"❌ [RERANK CACHE] Disk write failed: {e}")
+
+    def _read_disk(self, model: str, qh: str, hashes: set, now: float) -> Dict[str, Tuple[int, float]]:
+        found = {}
+        hashes = list(hashes)
+        try:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                cur = self._db.execute(
+                    "SELECT chunk_hash, score, expires_at FROM rerank_scores"
+                    f" WHERE model = ? AND query_hash = ? AND expires_at > ? AND chunk_hash IN ({placeholders})",
+                    [model, qh, now, *batch]
+                )
+                for h, score, expires_at in cur:
+                    found[h] = (score, expires_at)
+        except sqlite3.Error as e:
+            logger.error(f"❌ [RERANK CACHE] Disk read failed: {e}")
+        return found
+
+    def invalidate_chunks(self, chunk_hashes: Iterable[str]):
+        """Drops every cached score for these chunk contents, in both tiers."""
+        hashes = set(chunk_hashes)
+        if not hashes:
+            return
+
+        with self._lock:
+            stale = [key for key in self._lru if key[2] in hashes]
+            for key in stale:
+                del self._lru[key]
+            self.stats_data["invalidations"] += len(stale)
+
+            if self._db is not None:
+                try:
+                    batch_hashes = list(hashes)
+                    for start in range(0, len(batch_hashes), 500):
+                        batch = batch_hashes[start:start + 500]
+                        placeholders = ",".join("?" * len(batch))
+                        self._db.execute(
+                            f"DELETE FROM rerank_scores WHERE chunk_hash IN ({placeholders})",
+                            batch
+                        )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"❌ [RERANK CACHE] Disk invalidation failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM rerank_scores")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.stats_data["memory_hits"] + self.stats_data["disk_hits"]
+            total = hits + self.stats_data["misses"]
+            return {
+                **self.stats_data,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_entries": len(self._lru),
+                "memory_max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "disk_enabled": self._db is not None,
+            }
+
+rerank_cache = RerankCache(
+    max_entries=CONFIG.rerank_cache_max_entries,
+    ttl_s=CONFIG.rerank_cache_ttl_s,
+    path=CACHE_FILE if CONFIG.rerank_cache_disk else None,
+)
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.core.config import CONFIG
+from app.core.rerank_cache import normalize_query
+
+class RewriteCache:
+    """
+    In-memory LRU of query rewrites keyed by (model, normalized question),
+    with entries expiring after `ttl_s`. Rewrites are short strings, so
+    the bound is an entry count.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[tuple, Tuple[str, float]]" = OrderedDict()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats_data = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+        }
+
+    def get(self, model: str, question: str) -> Optional[str]:
+        key = (model, normalize_query(question))
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and entry[1] <= time.time():
+                del self._lru[key]
+                self.stats_data["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats_data["misses"] += 1
+                return None
+            self._lru.move_to_end(key)
+            self.stats_data["hits"] += 1
+            return entry[0]
+
+    def put(self, model: str, question: str, rewritten: str):
+        key = (model, normalize_query(question))
+        with self._lock:
+            self._lru[key] = (rewritten, time.time() + self.ttl_s)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self.stats_data["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.stats_data["hits"] + self.stats_data["misses"]
+            return {
+                **self.stats_data,
+                "hit_rate": self.stats_data["hits"] / total if total else 0.0,
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+            }
+
+rewrite_cache = RewriteCache(
+    max_entries=CONFIG.rewrite_cache_max_entries,
+    ttl_s=CONFIG.rewrite_cache_ttl_s,
+)
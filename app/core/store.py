@@ -1,3 +1,5 @@
+from app.rag.collections import CollectionRegistry
 from app.rag.vectorstore import VectorStore
 
-vs = VectorStore(dim=768)
\ No newline at end of file
+vs = VectorStore(dim=768)
+collections = CollectionRegistry(default=vs)
@@ -0,0 +1,169 @@
+import random
+import tempfile
+import threading
+import time
+import numpy as np
+from typing import Dict, List
+from app.core.config import CONFIG, RagConfig
+from app.rag.vectorstore import VectorStore
+
+DIM = 64
+WORDS = ["alpha", "beta", "gamma", "delta", "omega", "sigma", "kappa", "theta"]
+
+def _chunks(doc_id: str, n: int, rng: random.Random) -> List[dict]:
+    return [
+        {"doc_id": doc_id, "text": " ".join(rng.choices(WORDS, k=12)), "tags": [rng.choice(WORDS)]}
+        for _ in range(n)
+    ]
+
+def run_stress(
+        seconds: float = 10.0,
+        writers: int = 2,
+        deleters: int = 1,
+        searchers: int = 4,
+        index_type: str = "flat",
+        dim: int = DIM,
+        folder: str = None,
+        **overrides) -> Dict:
+    """
+    Interleaves uploads, deletes and searches against a throwaway store
+    (random vectors, no Ollama) and checks every result against what
+    was committed when the search started:
+
+    - each hit has its chunk metadata and a stored vector
+    - no hit belongs to a document whose delete had already returned
+
+    A small `delta_merge_vectors` keeps background merges and
+    compactions swapping snapshots throughout the run. The store is
+    then checkpointed, reloaded and compared chunk for chunk. `folder`
+    defaults to a fresh temporary directory.
+    """
+    config = RagConfig(**{
+        **CONFIG.model_dump(),
+        "index_type": index_type,
+        "index_promote_threshold": 2_000,
+        "delta_merge_vectors": 300,
+        "compaction_tombstone_ratio": 0.1,
+        "wal_group_commit_ms": 0.0,
+        **overrides,
+    })
+    folder = folder or tempfile.mkdtemp(prefix="rag-stress-")
+    store = VectorStore(dim=dim, folder=folder, config=config)
+    store.load()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    live_docs: List[str] = []
+    deleted_docs: Dict[str, float] = {}
+    counts = {"uploads": 0, "deletes": 0, "searches": 0, "hits": 0}
+    errors: List[str] = []
+
+    def fail(message: str):
+        with lock:
+            errors.append(message)
+
+    def writer(worker: int):
+        rng = random.Random(worker)
+        n = 0
+        while not stop.is_set():
+            doc_id = f"w{worker}-{n}"
+            n += 1
+            chunks = _chunks(doc_id, rng.randint(1, 40), rng)
+            embs = np.random.default_rng(n + 1000 * worker).standard_normal((len(chunks), dim))
+            try:
+                store.add_batch(embs, chunks)
+            except Exception as e:
+                fail(f"upload {doc_id}: {e!r}")
+                continue
+            with lock:
+                live_docs.append(doc_id)
+                counts["uploads"] += 1
+
+    def deleter(worker: int):
+        rng = random.Random(100 + worker)
+        while not stop.is_set():
+            with lock:
+                doc_id = live_docs.pop(rng.randrange(len(live_docs))) if len(live_docs) > 5 else None
+            if doc_id is None:
+                time.sleep(0.001)
+                continue
+            try:
+                store.delete_document(doc_id)
+            except Exception as e:
+                fail(f"delete {doc_id}: {e!r}")
+                continue
+            with lock:
+                deleted_docs[doc_id] = time.perf_counter()
+                counts["deletes"] += 1
+
+    def searcher(worker: int):
+        rng = random.Random(200 + worker)
+        qrng = np.random.default_rng(200 + worker)
+        while not stop.is_set():
+            started = time.perf_counter()
+            filters = {"tags": rng.choice(WORDS)} if rng.random() < 0.3 else None
+            try:
+                results = store.search_batch(
+                    qrng.standard_normal((4, dim)),
+                    retrieval_k=5,
+                    query_texts=[rng.choice(WORDS) for _ in range(4)],
+                    filters=filters,
+                )
+            except Exception as e:
+                fail(f"search: {e!r}")
+                continue
+
+            with lock:
+                gone = {d for d, at in deleted_docs.items() if at < started}
+                counts["searches"] += 1
+            for hits in results:
+                for hit in hits:
+                    if "text" not in hit or hit["vector"] is None or len(hit["vector"]) != dim:
+                        fail(f"incomplete hit {hit.get('id')}")
+                    if hit["doc_id"] in gone:
+                        fail(f"hit {hit['id']} from deleted document {hit['doc_id']}")
+                    with lock:
+                        counts["hits"] += 1
+
+    threads = (
+        [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        + [threading.Thread(target=deleter, args=(i,)) for i in range(deleters)]
+        + [threading.Thread(target=searcher, args=(i,)) for i in range(searchers)]
+    )
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    # Let a running merge finish, then check durability
+    while store._maintenance_lock.locked():
+        time.sleep(0.05)
+    store.close()
+    reloaded = VectorStore(dim=dim, folder=folder, config=config)
+    reloaded.load()
+    if reloaded.meta != store.meta:
+        errors.append("reloaded metadata differs")
+    if reloaded.ntotal - len(reloaded.tombstones) != len(reloaded.meta):
+        errors.append("reloaded index and metadata disagree")
+    reloaded.close()
+
+    return {
+        **counts,
+        "chunks": len(store.meta),
+        "folder": folder,
+        "errors": errors[:20],
+        "error_count": len(errors),
+    }
+
+if __name__ == "__main__":
+    for index_type in ("flat", "hnsw", "ivf_flat"):
+        report = run_stress(seconds=5.0, index_type=index_type)
+        print(
+            f"{index_type:<10} uploads={report['uploads']} deletes={report['deletes']} "
+            f"searches={report['searches']} hits={report['hits']} chunks={report['chunks']} "
+            f"errors={report['error_count']}"
+        )
+        for error in report["errors"]:
+            print(f"    {error}")
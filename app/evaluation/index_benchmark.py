@@ -0,0 +1,145 @@
+import faiss
+import numpy as np
+from typing import Dict, List
+from app.core.config import CONFIG
+from app.core.store import vs
+from app.core.timer import Timer
+from app.evaluation.eval_dataset import EVAL_DATASET
+from app.rag.embeddings import embed_texts
+from app.rag.index_factory import build_index, search_params, training_sample_size
+
+# Candidate storage modes, compared against exact float32 flat search
+INDEX_BENCHMARK_MODES = [
+    {"name": "flat_fp16", "index_type": "flat", "encoding": "fp16"},
+    {"name": "flat_sq8", "index_type": "flat", "encoding": "sq8"},
+    {"name": "ivf_flat", "index_type": "ivf_flat"},
+    {"name": "ivf_sq8", "index_type": "ivf_flat", "encoding": "sq8"},
+    {"name": "ivf_pq", "index_type": "ivf_pq"},
+    {"name": "hnsw_sq8", "index_type": "hnsw", "encoding": "sq8"},
+    {"name": "pca_256", "index_type": "flat", "reduction": "pca", "reduced_dim": 256},
+    {"name": "truncate_256", "index_type": "flat", "reduction": "truncate", "reduced_dim": 256},
+    {"name": "truncate_256_ivf_sq8", "index_type": "ivf_flat", "encoding": "sq8",
+     "reduction": "truncate", "reduced_dim": 256},
+]
+
+def _corpus(n_queries: int, seed: int = 0):
+    """
+    Reads every stored chunk vector (no embedding calls) and holds out
+    `n_queries` of them as queries, plus the evaluation questions.
+    The live index must store exact vectors: a quantized or reduced
+    one raises VectorStoreError rather than benchmark lossy data.
+    """
+    ids, xb = vs.stored_vectors()
+
+    rng = np.random.default_rng(seed)
+    held_out = rng.choice(len(ids), min(n_queries, len(ids) // 10), replace=False)
+    keep = np.setdiff1d(np.arange(len(ids)), held_out)
+
+    questions = embed_texts([sample["question"] for sample in EVAL_DATASET])
+    xq = np.vstack([xb[held_out], questions]) if len(held_out) else questions
+
+    xb = np.ascontiguousarray(xb[keep], dtype="float32")
+    xq = np.ascontiguousarray(xq, dtype="float32")
+    if CONFIG.index_metric == "cosine":
+        faiss.normalize_L2(xb)
+        faiss.normalize_L2(xq)
+    return ids[keep], xb, xq
+
+def _evaluate(index, xq: np.ndarray, k: int, truth: np.ndarray = None) -> Dict:
+    params = search_params(index)
+    latencies = []
+    found = []
+    for q in xq:
+        with Timer() as t:
+            _, I = index.search(q[None, :], k, params=params)
+        latencies.append(t.ms)
+        found.append(I[0])
+    found = np.array(found)
+
+    recall = None
+    if truth is not None:
+        # A corpus smaller than k has fewer true neighbours than k
+        hits = [
+            len(set(f[f != -1]) & set(g[g != -1])) / max(len(g[g != -1]), 1)
+            for f, g in zip(found, truth)
+        ]
+        recall = float(np.mean(hits))
+
+    return {
+        "recall_at_k": recall,
+        "latency_ms_mean": float(np.mean(latencies)),
+        "latency_ms_p95": float(np.percentile(latencies, 95)),
+        "index_bytes": int(faiss.serialize_index(index).nbytes),
+    }, found
+
+def _build(mode: Dict, ids: np.ndarray, xb: np.ndarray) -> Dict:
+    with Timer() as t:
+        index = build_index(
+            mode["index_type"],
+            xb.shape[1],
+            CONFIG.index_metric,
+            n=len(ids),
+            encoding=mode.get("encoding", "float32"),
+            reduction=mode.get("reduction", "none"),
+            reduced_dim=mode.get("reduced_dim"),
+        )
+        if not index.is_trained:
+            n_train = training_sample_size(index, len(ids))
+            sample = xb[np.random.default_rng(0).choice(len(ids), n_train, replace=False)]
+            index.train(sample)
+        index.add_with_ids(xb, ids)
+    return index, t.ms
+
+def run_index_benchmark(k: int = 10, n_queries: int = 200, modes: List[Dict] = None) -> List[Dict]:
+    """
+    Builds each storage mode over the current corpus and reports
+    recall@k against exact flat search, per-query latency and index
+    size, so a memory / accuracy tradeoff can be picked with data.
+    """
+    ids, xb, xq = _corpus(n_queries)
+    if len(ids) == 0:
+        return []
+
+    exact, build_ms = _build({"index_type": "flat"}, ids, xb)
+    exact_stats, truth = _evaluate(exact, xq, k)
+    exact_bytes = exact_stats["index_bytes"]
+
+    results = [{
+        "mode": "flat",
+        **exact_stats,
+        "recall_at_k": 1.0,
+        "bytes_per_vector": exact_bytes / len(ids),
+        "compression": 1.0,
+        "build_ms": build_ms,
+    }]
+
+    for mode in modes or INDEX_BENCHMARK_MODES:
+        try:
+            index, build_ms = _build(mode, ids, xb)
+            stats, _ = _evaluate(index, xq, k, truth)
+        except Exception as e:
+            # e.g. too few vectors to train PQ codebooks
+            results.append({"mode": mode["name"], "error": str(e)})
+            continue
+
+        results.append({
+            "mode": mode["name"],
+            **stats,
+            "bytes_per_vector": stats["index_bytes"] / len(ids),
+            "compression": exact_bytes / stats["index_bytes"],
+            "build_ms": build_ms,
+        })
+
+    return results
+
+if __name__ == "__main__":
+    header = f"{'mode':<24}{'recall@k':>10}{'mean ms':>10}{'p95 ms':>10}{'B/vec':>10}{'x':>8}"
+    print(header)
+    for row in run_index_benchmark():
+        if "error" in row:
+            print(f"{row['mode']:<24}  error: {row['error']}")
+            continue
+        print(
+            f"{row['mode']:<24}{row['recall_at_k']:>10.3f}{row['latency_ms_mean']:>10.3f}"
+            f"{row['latency_ms_p95']:>10.3f}{row['bytes_per_vector']:>10.0f}{row['compression']:>8.1f}"
+        )
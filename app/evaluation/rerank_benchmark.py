@@ -0,0 +1,65 @@
+import numpy as np
+from typing import Dict, List
+from app.core.store import vs
+from app.core.timer import Timer
+from app.evaluation.eval_dataset import EVAL_DATASET
+from app.evaluation.evaluator import fact_coverage
+from app.rag.embeddings import embed_texts
+from app.rag.reranker import RERANK_BACKENDS, rerank_chunks
+
+def _first_relevant_rank(chunks: List[Dict], expected_doc_ids: List[str]):
+    for rank, chunk in enumerate(chunks, start=1):
+        if chunk["doc_id"] in expected_doc_ids:
+            return rank
+    return None
+
+def run_rerank_benchmark(backends=RERANK_BACKENDS, candidates: int = 10, top_k: int = 5) -> List[Dict]:
+    """
+    Retrieves `candidates` chunks once per evaluation question, then
+    reorders the same lists with each backend and scores the top_k:
+
+    - success: every expected document is in the top_k
+    - mrr: reciprocal rank of the first chunk from an expected document
+    - fact_coverage: share of expected facts present in the top_k text
+
+    Latency is per question. The llm backend needs Ollama; its pointwise
+    scores may come from the rerank cache on repeated runs.
+    """
+    questions = [sample["question"] for sample in EVAL_DATASET]
+    q_embs = embed_texts(questions)
+    retrieved = vs.search_batch(q_embs, retrieval_k=candidates, query_texts=questions)
+
+    results = []
+    for backend in backends:
+        latencies, success, mrr, coverage = [], [], [], []
+        for sample, q_emb, chunks in zip(EVAL_DATASET, q_embs, retrieved):
+            with Timer() as t:
+                top = rerank_chunks(sample["question"], chunks, q_emb=q_emb, backend=backend, top_k=top_k)[:top_k]
+            latencies.append(t.ms)
+
+            top_docs = {c["doc_id"] for c in top}
+            success.append(all(d in top_docs for d in sample["expected_doc_ids"]))
+            rank = _first_relevant_rank(top, sample["expected_doc_ids"])
+            mrr.append(1.0 / rank if rank else 0.0)
+            hits = fact_coverage("\n".join(c["text"] for c in top), sample["expected_facts"])
+            coverage.append(sum(hits.values()) / max(len(hits), 1))
+
+        results.append({
+            "backend": backend,
+            "success": float(np.mean(success)),
+            "mrr": float(np.mean(mrr)),
+            "fact_coverage": float(np.mean(coverage)),
+            "latency_ms_mean": float(np.mean(latencies)),
+            "latency_ms_p95": float(np.percentile(latencies, 95)),
+        })
+
+    return results
+
+if __name__ == "__main__":
+    header = f"{'backend':<10}{'success':>10}{'mrr':>8}{'facts':>8}{'mean ms':>10}{'p95 ms':>10}"
+    print(header)
+    for row in run_rerank_benchmark():
+        print(
+            f"{row['backend']:<10}{row['success']:>10.3f}{row['mrr']:>8.3f}{row['fact_coverage']:>8.3f}"
+            f"{row['latency_ms_mean']:>10.1f}{row['latency_ms_p95']:>10.1f}"
+        )
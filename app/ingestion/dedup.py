@@ -0,0 +1,15 @@
+import hashlib
+import re
+import unicodedata
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+def file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def normalize_chunk_text(text: str) -> str:
+    """Unicode-normalized, whitespace-collapsed text (extraction noise only)."""
+    return WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()
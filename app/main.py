@@ -1,4 +1,7 @@
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.logging_middleware import LoggingMiddleware
 from app.core.errors import RagError
@@ -10,14 +13,48 @@ from app.api.routes_debug import router as debug_router
 from app.api.routes_faiss import router as faiss_router
 from app.api.routes_evaluation import router as evaluation_router
 from app.api.routes_benchmark import router as benchmark_router
+from app.api.routes_collections import router as collections_router
 from app.core.config import CONFIG
 from app.core.logger import logger
+from app.core.store import collections, vs
+from app.rag.rag_evaluator import get_safety_matrix
+
+def _preload_vector_store():
+    try:
+        vs.load()
+    except Exception as e:
+        logger.error(f"❌ Vector store preload failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # ------------------------------------------------------
+    # Startup warmup
+    # ------------------------------------------------------
+    # Falls back to lazy loading on first query if Ollama is not up yet
+    try:
+        await run_in_threadpool(get_safety_matrix)
+    except Exception as e:
+        logger.warning(f"⚠️ Safety matrix warmup skipped: {e}")
+
+    # Off by default: the store loads on first use. When enabled it
+    # loads in the background so the server accepts requests at once.
+    if CONFIG.vector_store_preload:
+        threading.Thread(target=_preload_vector_store, name="faiss-preload", daemon=True).start()
+
+    yield
+
+    # ------------------------------------------------------
+    # Shutdown
+    # ------------------------------------------------------
+    # Leaves an empty WAL so the next start needs no replay
+    await run_in_threadpool(collections.close)
 
 def create_app() -> FastAPI:
     app = FastAPI(
         title="My First RAG App",
         description="A fully local RAG system using FastAPI + Ollama + FAISS.",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan,
     )
 
     # ------------------------------------------------------
@@ -42,6 +79,7 @@ def create_app() -> FastAPI:
     app.include_router(faiss_router, prefix="/api")
     app.include_router(evaluation_router, prefix="/api")
     app.include_router(benchmark_router, prefix="/api")
+    app.include_router(collections_router, prefix="/api")
 
     app.add_exception_handler(RagError, rag_error_handler)
 
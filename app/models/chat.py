@@ -1,7 +1,8 @@
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from app.core.config import CONFIG
+from app.models.query import SearchFilters
 
 class ChatMessage(BaseModel):
     role: str
@@ -14,3 +15,10 @@ class ChatRequest(BaseModel):
     temperature: float = CONFIG.temperature
     top_p: float = CONFIG.top_p
     top_k: int = CONFIG.top_k
+    # ANN search overrides (IVF / HNSW indexes only)
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
+    # Restrict retrieval to matching chunks
+    filters: Optional[SearchFilters] = None
+    # Named collection to search (None → default)
+    collection: Optional[str] = None
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+from typing import Any, Dict
+
+class CollectionRequest(BaseModel):
+    name: str
+    # RagConfig overrides, e.g. {"index_type": "hnsw", "index_shards": 4}
+    settings: Dict[str, Any] = {}
@@ -1,9 +1,41 @@
+from datetime import datetime
 from pydantic import BaseModel
+from typing import List, Optional
 from app.core.config import CONFIG
 
+class SearchFilters(BaseModel):
+    """Fields are ANDed; several values for one field match any of them."""
+    doc_id: Optional[List[str]] = None
+    filename: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+
+    def to_store(self) -> Optional[dict]:
+        filters = self.model_dump(exclude_none=True)
+        return filters or None
+
 class QueryRequest(BaseModel):
     question: str
     model: str = CONFIG.llm_model
     temperature: float = CONFIG.temperature
     top_p: float = CONFIG.top_p
-    top_k: int = CONFIG.top_k
\ No newline at end of file
+    top_k: int = CONFIG.top_k
+    # ANN search overrides (IVF / HNSW indexes only)
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
+    # Restrict retrieval to matching chunks
+    filters: Optional[SearchFilters] = None
+    # Named collection to search (None → default)
+    collection: Optional[str] = None
+
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    top_k: int = CONFIG.top_k
+    # ANN search overrides (IVF / HNSW indexes only)
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
+    # Restrict retrieval to matching chunks
+    filters: Optional[SearchFilters] = None
+    # Named collection to search (None → default)
+    collection: Optional[str] = None
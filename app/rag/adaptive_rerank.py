@@ -0,0 +1,63 @@
+import numpy as np
+from typing import NamedTuple
+from app.core.config import CONFIG
+from app.rag.local_reranker import local_scores, vector_similarity
+
+class RerankPlan(NamedTuple):
+    """
+    How much of a candidate list the LLM reranker should see.
+
+    action: "skip" (local order stands), "band" (only `band` is
+            reranked) or "full" (every candidate is)
+    head:   clearly inside the top_k, kept first in local-score order
+    band:   ambiguous around the top_k cutoff, sent to the reranker
+    tail:   clearly outside the top_k, kept last in local-score order
+
+    Every chunk carries its 0-100 local score as `score`. Once the band
+    is replaced by LLM scores, `score` only orders chunks within their
+    own part: the list's order, not its scores, is the ranking.
+    """
+    action: str
+    head: list
+    band: list
+    tail: list
+    margin: float
+
+def plan_rerank(question: str, chunks: list, q_emb, top_k: int) -> RerankPlan:
+    """
+    Ranks the candidates by the local reranker's 0-100 blend of vector
+    similarity and lexical overlap, then decides:
+
+    - skip: the best candidate is also first on both the vector and
+      the BM25 score and leads the next by `rerank_skip_margin` points
+    - otherwise the band is the cutoff candidate plus every candidate
+      within `rerank_band_margin` points of it, so a wide score gap
+      means few candidates and a flat distribution means many
+    """
+    scores = local_scores(question, chunks, q_emb)
+    # Stable, so ties keep retrieval order
+    order = np.argsort(-scores, kind="stable")
+    scores = scores[order]
+    ranked = [{**chunks[i], "score": round(float(s))} for i, s in zip(order.tolist(), scores)]
+    n = len(chunks)
+    margin = float(scores[0] - scores[1]) if n > 1 else 100.0
+
+    best = int(order[0])
+    bm25 = np.array([c.get("bm25_score") or 0.0 for c in chunks])
+    vector = vector_similarity(chunks, q_emb)
+    if (margin >= CONFIG.rerank_skip_margin and bm25[best] > 0
+            and bm25.argmax() == best and vector.argmax() == best):
+        return RerankPlan("skip", ranked, [], [], margin)
+
+    cut = min(top_k, n) - 1
+    head = 0
+    while head < cut and scores[head] - scores[cut] >= CONFIG.rerank_band_margin:
+        head += 1
+
+    # Sorted, so the band is contiguous and everything after it is tail
+    end = cut + 1
+    while end < n and scores[cut] - scores[end] < CONFIG.rerank_band_margin:
+        end += 1
+
+    action = "full" if head == 0 and end == n else "band"
+    return RerankPlan(action, ranked[:head], ranked[head:end], ranked[end:], margin)
@@ -0,0 +1,131 @@
+import copy
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import faiss
+import numpy as np
+from app.core.config import CONFIG
+
+def answer_cache_key(model, temperature, top_p, top_k, nprobe, ef_search, filters) -> str:
+    """Generation and retrieval parameters an answer depends on."""
+    return json.dumps(
+        [model, temperature, top_p, top_k, nprobe, ef_search, filters],
+        sort_keys=True,
+        default=str,
+    )
+
+class SemanticAnswerCache:
+    """
+    Finished answers reused for questions that embed close to an earlier one.
+
+    - index:   small exact inner-product FAISS index over the unit-length
+               question embeddings (cosine similarity)
+    - entries: id -> (params key, collection, store version, result),
+               in LRU order, at most `max_entries`
+
+    Each entry records its collection's vector-store version (the WAL
+    position, which every upload and delete advances); once the store
+    moves on, every answer of that collection is dropped.
+    """
+
+    def __init__(self, max_entries: int, threshold: float):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._index = None
+        self._entries: "OrderedDict[int, Tuple[str, str, int, dict]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._next_id = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats_data = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    @staticmethod
+    def _unit(q_emb) -> np.ndarray:
+        x = np.ascontiguousarray(np.asarray(q_emb, dtype="float32").reshape(1, -1))
+        faiss.normalize_L2(x)
+        return x
+
+    def _drop(self, ids):
+        for i in ids:
+            del self._entries[i]
+        if ids:
+            self._index.remove_ids(np.array(ids, dtype="int64"))
+
+    def _invalidate_stale(self, collection: str, version: int):
+        """Drops a collection's answers once its store has changed."""
+        if self._versions.get(collection, version) != version:
+            stale = [i for i, entry in self._entries.items() if entry[1] == collection]
+            self._drop(stale)
+            self.stats_data["invalidations"] += len(stale)
+        self._versions[collection] = version
+
+    def get(self, q_emb, key: str, collection: str, version: int) -> Optional[dict]:
+        """The stored answer of the closest matching question above the threshold, if any."""
+        x = self._unit(q_emb)
+        with self._lock:
+            self._invalidate_stale(collection, version)
+            if self._index is None or self._index.ntotal == 0 or self._index.d != x.shape[1]:
+                self.stats_data["misses"] += 1
+                return None
+
+            D, I = self._index.search(x, min(8, self._index.ntotal))
+            for sim, i in zip(D[0].tolist(), I[0].tolist()):
+                if i == -1 or sim < self.threshold:
+                    break
+                entry = self._entries.get(i)
+                if entry is not None and entry[0] == key and entry[1] == collection:
+                    self._entries.move_to_end(i)
+                    self.stats_data["hits"] += 1
+                    return copy.deepcopy(entry[3])
+
+            self.stats_data["misses"] += 1
+            return None
+
+    def put(self, q_emb, key: str, collection: str, version: int, result: dict):
+        x = self._unit(q_emb)
+        with self._lock:
+            # Answered against an older store: already stale
+            if self._versions.get(collection, version) != version:
+                return
+            if self._index is None or self._index.d != x.shape[1]:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(x.shape[1]))
+                self._entries.clear()
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(x, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = (key, collection, version, copy.deepcopy(result))
+
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                self._drop(list(self._entries)[:overflow])
+                self.stats_data["evictions"] += overflow
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.stats_data["hits"] + self.stats_data["misses"]
+            return {
+                **self.stats_data,
+                "hit_rate": self.stats_data["hits"] / total if total else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+            }
+
+answer_cache = SemanticAnswerCache(
+    max_entries=CONFIG.answer_cache_max_entries,
+    threshold=CONFIG.answer_cache_threshold,
+)
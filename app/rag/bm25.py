@@ -0,0 +1,131 @@
+import heapq
+import json
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+class BM25Index:
+    """
+    Incremental inverted index with Okapi BM25 scoring.
+
+    postings: term -> {row_id: term frequency}
+    Query cost is proportional to the postings of the query terms,
+    not to the number of chunks.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_len: Dict[int, int] = {}
+        self.total_len = 0
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, row_id: int, text: str):
+        tokens = tokenize(text)
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, {})[row_id] = tf
+        self.doc_len[row_id] = len(tokens)
+        self.total_len += len(tokens)
+
+    def remove(self, row_id: int, text: str):
+        """Drops a chunk; `text` must be the text it was added with."""
+        if row_id not in self.doc_len:
+            return
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(row_id, None)
+            if not posting:
+                del self.postings[term]
+        self.total_len -= self.doc_len.pop(row_id)
+
+    def search(self, query: str, k: int, allowed: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Returns up to k (row_id, score) pairs, best first.
+        With `allowed`, only those row ids are scored.
+
+        Safe against a concurrent add/remove: postings are copied
+        before iterating (an atomic dict copy under the GIL), and rows
+        removed meanwhile are skipped.
+        """
+        n = len(self.doc_len)
+        if n == 0:
+            return []
+
+        avg_len = self.total_len / n
+        scores: Dict[int, float] = {}
+
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+
+            df = len(posting)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+            for row_id, tf in posting.copy().items():
+                if allowed is not None and row_id not in allowed:
+                    continue
+                doc_len = self.doc_len.get(row_id)
+                if doc_len is None:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * doc_len / avg_len)
+                scores[row_id] = scores.get(row_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda x: x[1])
+
+    # ---------------------------
+    # Persistence
+    # ---------------------------
+    def copy(self) -> "BM25Index":
+        """Independent copy, so a checkpoint can save it while writes continue."""
+        index = BM25Index(k1=self.k1, b=self.b)
+        index.postings = {term: posting.copy() for term, posting in self.postings.items()}
+        index.doc_len = self.doc_len.copy()
+        index.total_len = self.total_len
+        return index
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "postings": self.postings,
+                "doc_len": self.doc_len,
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        index = cls(k1=data["k1"], b=data["b"])
+        # JSON object keys are strings; row ids are ints
+        index.postings = {
+            term: {int(row_id): tf for row_id, tf in posting.items()}
+            for term, posting in data["postings"].items()
+        }
+        index.doc_len = {int(row_id): n for row_id, n in data["doc_len"].items()}
+        index.total_len = sum(index.doc_len.values())
+        return index
+
+def reciprocal_rank_fusion(rankings: List[Tuple[List[int], float]], k: int = 60) -> Dict[int, float]:
+    """
+    Fuses several ranked id lists. Each ranking is (ids best-first, weight);
+    an id scores weight / (k + rank) in every list it appears in.
+    """
+    fused: Dict[int, float] = {}
+    for ids, weight in rankings:
+        for rank, row_id in enumerate(ids, start=1):
+            fused[row_id] = fused.get(row_id, 0.0) + weight / (k + rank)
+    return fused
@@ -0,0 +1,170 @@
+import json
+import os
+import re
+import shutil
+import threading
+from typing import Dict, List, Optional
+from app.core.config import CONFIG, RagConfig
+from app.core.errors import CollectionError
+from app.core.logger import logger
+from app.rag.vectorstore import DB_FOLDER, VectorStore
+
+# The pre-collections store in db/ keeps serving unnamed requests
+DEFAULT_COLLECTION = "default"
+COLLECTIONS_FOLDER = os.path.join(DB_FOLDER, "collections")
+COLLECTION_FILE = "collection.json"
+
+# Names double as folder names
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# RagConfig fields a collection may override; everything else
+# (models, generation, WAL tuning) stays global
+COLLECTION_SETTINGS = (
+    "index_type",
+    "index_metric",
+    "index_auto_promote",
+    "index_promote_threshold",
+    "index_shards",
+    "ivf_nlist",
+    "ivf_nprobe",
+    "hnsw_m",
+    "hnsw_ef_construction",
+    "hnsw_ef_search",
+    "compaction_tombstone_ratio",
+    "delta_merge_vectors",
+    "delta_max_segments",
+    "index_encoding",
+    "pq_m",
+    "pq_nbits",
+    "index_reduction",
+    "index_reduced_dim",
+    "index_mmap",
+    "bm25_enabled",
+    "rrf_k",
+    "rrf_vector_weight",
+    "rrf_bm25_weight",
+    "filter_exact_threshold",
+)
+
+def collection_config(settings: dict) -> RagConfig:
+    """The global config with a collection's overrides applied (and validated)."""
+    unknown = set(settings) - set(COLLECTION_SETTINGS)
+    if unknown:
+        raise CollectionError(f"Settings not configurable per collection: {sorted(unknown)}")
+    try:
+        return RagConfig(**{**CONFIG.model_dump(), **settings})
+    except ValueError as e:
+        raise CollectionError(f"Invalid collection settings: {e}") from e
+
+class CollectionRegistry:
+    """
+    Named, isolated vector stores (one per tenant or corpus). Each
+    collection has its own folder, WAL, checkpoints and index settings
+    under db/collections/<name>/, and is loaded on first use like the
+    default store.
+    """
+
+    def __init__(self, default: VectorStore, folder: str = COLLECTIONS_FOLDER):
+        self.default = default
+        self.folder = folder
+        self._stores: Dict[str, VectorStore] = {}
+        self._lock = threading.Lock()
+
+    def _folder(self, name: str) -> str:
+        if not NAME_PATTERN.match(name):
+            raise CollectionError(f"Invalid collection name: {name!r}")
+        return os.path.join(self.folder, name)
+
+    def _settings_file(self, name: str) -> str:
+        return os.path.join(self._folder(name), COLLECTION_FILE)
+
+    def _open(self, name: str) -> VectorStore:
+        """Store for an existing collection folder. Caller holds the lock."""
+        with open(self._settings_file(name), "r") as f:
+            settings = json.load(f)
+        store = VectorStore(dim=self.default.dim, folder=self._folder(name), config=collection_config(settings))
+        self._stores[name] = store
+        return store
+
+    def exists(self, name: str) -> bool:
+        return name == DEFAULT_COLLECTION or os.path.exists(self._settings_file(name))
+
+    def get(self, name: Optional[str] = None, create: bool = False) -> VectorStore:
+        """
+        Store for `name` (None → default collection). Unknown names
+        raise CollectionError unless `create` is set.
+        """
+        if name is None or name == DEFAULT_COLLECTION:
+            return self.default
+
+        store = self._stores.get(name)
+        if store is not None:
+            return store
+
+        if not self.exists(name):
+            if not create:
+                raise CollectionError(f"Unknown collection: {name}")
+            return self.create(name)
+
+        with self._lock:
+            return self._stores.get(name) or self._open(name)
+
+    def create(self, name: str, settings: Optional[dict] = None) -> VectorStore:
+        """Creates a collection with `settings` overriding the global index config."""
+        settings = settings or {}
+        collection_config(settings)
+
+        with self._lock:
+            if name == DEFAULT_COLLECTION or os.path.exists(self._settings_file(name)):
+                raise CollectionError(f"Collection already exists: {name}")
+
+            os.makedirs(self._folder(name), exist_ok=True)
+            with open(self._settings_file(name), "w") as f:
+                json.dump(settings, f)
+
+            logger.info(f"🗂️ [COLLECTIONS] Created collection '{name}' {settings}")
+            return self._open(name)
+
+    def names(self) -> List[str]:
+        names = [DEFAULT_COLLECTION]
+        if os.path.isdir(self.folder):
+            names += sorted(
+                name for name in os.listdir(self.folder)
+                if os.path.exists(os.path.join(self.folder, name, COLLECTION_FILE))
+            )
+        return names
+
+    def describe(self, name: str) -> dict:
+        store = self.get(name)
+        if name == DEFAULT_COLLECTION:
+            settings = {}
+        else:
+            with open(self._settings_file(name), "r") as f:
+                settings = json.load(f)
+        return {
+            "name": name,
+            "settings": settings,
+            "index_type": store.config.index_type,
+            **store.load_status(),
+        }
+
+    def drop(self, name: str):
+        """Deletes a collection and all its data. The default one can't be dropped."""
+        if name == DEFAULT_COLLECTION:
+            raise CollectionError("The default collection can't be dropped")
+        if not self.exists(name):
+            raise CollectionError(f"Unknown collection: {name}")
+
+        with self._lock:
+            store = self._stores.pop(name, None)
+            if store is not None and store.loaded:
+                store.wal.close()
+            shutil.rmtree(self._folder(name))
+
+        logger.info(f"🗑️ [COLLECTIONS] Dropped collection '{name}'")
+
+    def close(self):
+        """Checkpoints every loaded collection (see VectorStore.close)."""
+        self.default.close()
+        for store in list(self._stores.values()):
+            store.close()
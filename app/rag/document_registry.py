@@ -0,0 +1,150 @@
+import bisect
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Document-level fields copied from a document's first chunk
+DOCUMENT_FIELDS = ("filename", "file_size", "file_hash", "tags")
+
+def _add_to_ranges(ranges: List[List[int]], chunk_id: int) -> List[List[int]]:
+    """New sorted list of inclusive [first, last] id ranges including chunk_id."""
+    ranges = [list(r) for r in ranges]
+    if ranges and ranges[-1][1] + 1 == chunk_id:
+        # Uploads assign consecutive ids → almost always this branch
+        ranges[-1][1] = chunk_id
+        return ranges
+    i = bisect.bisect_left(ranges, [chunk_id, chunk_id])
+    ranges.insert(i, [chunk_id, chunk_id])
+    return ranges
+
+def _remove_from_ranges(ranges: List[List[int]], chunk_id: int) -> List[List[int]]:
+    out = []
+    for first, last in ranges:
+        if first <= chunk_id <= last:
+            if first < chunk_id:
+                out.append([first, chunk_id - 1])
+            if chunk_id < last:
+                out.append([chunk_id + 1, last])
+        else:
+            out.append([first, last])
+    return out
+
+class DocumentRegistry:
+    """
+    Document-level view of the chunk metadata, kept in step with every
+    add and delete so listing a page or a document's chunks never
+    scans the corpus.
+
+    documents: doc_id -> record (filename, file_size, file_hash, tags,
+               uploaded_at, updated_at, chunk_count, chunk_ranges)
+    order: sorted (uploaded_at, first chunk id, doc_id) keys for paging
+
+    Records are replaced rather than mutated, so a reader holding one
+    always sees a consistent version.
+    """
+
+    def __init__(self):
+        self.documents: Dict[str, dict] = {}
+        self.order: List[Tuple[float, int, str]] = []
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self.documents
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        return self.documents.get(doc_id)
+
+    @staticmethod
+    def _key(record: dict) -> Tuple[float, int, str]:
+        return (record["uploaded_at"] or 0.0, record["chunk_ranges"][0][0], record["doc_id"])
+
+    def add(self, chunk_id: int, chunk: dict):
+        doc_id = chunk["doc_id"]
+        uploaded_at = chunk.get("uploaded_at")
+        record = self.documents.get(doc_id)
+
+        if record is None:
+            record = {
+                "doc_id": doc_id,
+                **{field: chunk.get(field) for field in DOCUMENT_FIELDS},
+                "uploaded_at": uploaded_at,
+                "updated_at": uploaded_at,
+                "chunk_count": 1,
+                "chunk_ranges": [[chunk_id, chunk_id]],
+            }
+            self.documents[doc_id] = record
+            bisect.insort(self.order, self._key(record))
+            return
+
+        updated_at = record["updated_at"]
+        if uploaded_at is not None and (updated_at is None or uploaded_at > updated_at):
+            updated_at = uploaded_at
+        self.documents[doc_id] = {
+            **record,
+            "updated_at": updated_at,
+            "chunk_count": record["chunk_count"] + 1,
+            "chunk_ranges": _add_to_ranges(record["chunk_ranges"], chunk_id),
+        }
+        # Ids normally arrive in increasing order; keep the sort key
+        # (which includes the first chunk id) right if they don't
+        if chunk_id < record["chunk_ranges"][0][0]:
+            self._reorder(record, self.documents[doc_id])
+
+    def remove(self, chunk_id: int, chunk: dict):
+        doc_id = chunk["doc_id"]
+        record = self.documents.get(doc_id)
+        if record is None:
+            return
+
+        if record["chunk_count"] <= 1:
+            del self.documents[doc_id]
+            self._drop_key(self._key(record))
+            return
+
+        new = {
+            **record,
+            "chunk_count": record["chunk_count"] - 1,
+            "chunk_ranges": _remove_from_ranges(record["chunk_ranges"], chunk_id),
+        }
+        self.documents[doc_id] = new
+        if new["chunk_ranges"][0][0] != record["chunk_ranges"][0][0]:
+            self._reorder(record, new)
+
+    def _drop_key(self, key):
+        i = bisect.bisect_left(self.order, key)
+        if i < len(self.order) and self.order[i] == key:
+            del self.order[i]
+
+    def _reorder(self, old: dict, new: dict):
+        self._drop_key(self._key(old))
+        bisect.insort(self.order, self._key(new))
+
+    def page(self, offset: int = 0, limit: int = 50, newest_first: bool = True) -> List[dict]:
+        """One page of document records, by upload time."""
+        n = len(self.order)
+        if newest_first:
+            keys = self.order[max(n - offset - limit, 0):max(n - offset, 0)][::-1]
+        else:
+            keys = self.order[offset:offset + limit]
+        records = (self.documents.get(doc_id) for _, _, doc_id in keys)
+        return [record for record in records if record is not None]
+
+    def chunk_ids(self, doc_id: str, offset: int = 0, limit: Optional[int] = None) -> Iterator[int]:
+        """A document's chunk ids in order, straight from its ranges."""
+        record = self.documents.get(doc_id)
+        if record is None:
+            return
+        skip = offset
+        remaining = limit
+        for first, last in record["chunk_ranges"]:
+            size = last - first + 1
+            if skip >= size:
+                skip -= size
+                continue
+            for chunk_id in range(first + skip, last + 1):
+                if remaining is not None:
+                    if remaining == 0:
+                        return
+                    remaining -= 1
+                yield chunk_id
+            skip = 0
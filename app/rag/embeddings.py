@@ -1,9 +1,104 @@
+import asyncio
 import ollama
+import numpy as np
+from typing import List
 from app.core.config import CONFIG
+from app.core.embedding_cache import embedding_cache
+from app.core.errors import EmbeddingError
+from app.core.ollama_client import get_async_client
+
+def _batches(texts: List[str], batch_size: int):
+    for start in range(0, len(texts), batch_size):
+        yield texts[start:start + batch_size]
+
+def _check_batch(batch: List[str], embeddings: list):
+    if len(embeddings) != len(batch):
+        raise EmbeddingError(
+            f"Expected {len(batch)} embeddings, got {len(embeddings)}"
+        )
+
+def _embed_uncached(texts: List[str], batch_size: int) -> np.ndarray:
+    rows = []
+    for batch in _batches(texts, batch_size):
+        response = ollama.embed(
+            model=CONFIG.embedding_model,
+            input=batch
+        )
+        embeddings = response["embeddings"]
+        _check_batch(batch, embeddings)
+        rows.extend(embeddings)
+
+    return np.ascontiguousarray(rows, dtype="float32")
+
+async def _aembed_uncached(texts: List[str], batch_size: int) -> np.ndarray:
+    client = get_async_client()
+
+    rows = []
+    for batch in _batches(texts, batch_size):
+        response = await client.embed(
+            model=CONFIG.embedding_model,
+            input=batch
+        )
+        embeddings = response["embeddings"]
+        _check_batch(batch, embeddings)
+        rows.extend(embeddings)
+
+    return np.ascontiguousarray(rows, dtype="float32")
+
+def _lookup_cached(texts: List[str]):
+    """Returns (vectors with None for misses, distinct missing texts)."""
+    vectors = embedding_cache.get_many(CONFIG.embedding_model, texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+    return vectors, missing
+
+def _merge_fetched(texts: List[str], vectors: list, missing: List[str], fetched: np.ndarray) -> np.ndarray:
+    if missing:
+        embedding_cache.put_many(CONFIG.embedding_model, missing, fetched)
+        lookup = dict(zip(missing, fetched))
+        vectors = [lookup[t] if v is None else v for t, v in zip(texts, vectors)]
+
+    return np.ascontiguousarray(np.stack(vectors), dtype="float32")
+
+def embed_texts(texts: List[str], batch_size: int = None) -> np.ndarray:
+    """
+    Embeds several strings through Ollama's batch embed endpoint.
+    Cached vectors are reused; only unseen texts are sent, at most
+    `batch_size` per request. Returns a contiguous float32 matrix
+    of shape (len(texts), dim).
+    """
+    batch_size = batch_size or CONFIG.embed_batch_size
+
+    if not texts:
+        return np.zeros((0, 0), dtype="float32")
+
+    if not CONFIG.embed_cache_enabled:
+        return _embed_uncached(texts, batch_size)
+
+    vectors, missing = _lookup_cached(texts)
+    fetched = _embed_uncached(missing, batch_size) if missing else None
+    return _merge_fetched(texts, vectors, missing, fetched)
+
+async def aembed_texts(texts: List[str], batch_size: int = None) -> np.ndarray:
+    """
+    Async variant of embed_texts using the shared AsyncClient. The
+    cache's SQLite reads and writes run in a worker thread.
+    """
+    batch_size = batch_size or CONFIG.embed_batch_size
+
+    if not texts:
+        return np.zeros((0, 0), dtype="float32")
+
+    if not CONFIG.embed_cache_enabled:
+        return await _aembed_uncached(texts, batch_size)
+
+    vectors, missing = await asyncio.to_thread(_lookup_cached, texts)
+    if not missing:
+        return _merge_fetched(texts, vectors, missing, None)
+    fetched = await _aembed_uncached(missing, batch_size)
+    return await asyncio.to_thread(_merge_fetched, texts, vectors, missing, fetched)
 
 def embed_text(text):
-    response = ollama.embeddings(
-        model=CONFIG.embedding_model,
-        prompt=text
-    )
-    return response['embedding']
+    return embed_texts([text])[0]
+
+async def aembed_text(text):
+    return (await aembed_texts([text]))[0]
@@ -0,0 +1,349 @@
+import math
+import faiss
+import numpy as np
+from app.core.config import CONFIG
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+TRAINED_INDEX_TYPES = ("ivf_flat", "ivf_pq")
+ENCODINGS = ("float32", "fp16", "sq8")
+REDUCTIONS = ("none", "pca", "truncate")
+
+# Training sample size per IVF list (or PQ centroid)
+TRAIN_POINTS_PER_LIST = 64
+
+# Scalar codecs in index_factory syntax
+CODECS = {"float32": "Flat", "fp16": "SQfp16", "sq8": "SQ8"}
+
+def faiss_metric(metric: str) -> int:
+    """'cosine' is inner product over L2-normalized vectors."""
+    return faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+
+def auto_nlist(n: int) -> int:
+    """Common IVF heuristic: ~4·sqrt(n) lists, kept within sane bounds."""
+    return int(min(max(4 * math.sqrt(max(n, 1)), 16), 65536))
+
+def requires_training(index_type: str, encoding: str = None, reduction: str = None, config=None) -> bool:
+    """IVF coarse quantizers, SQ8 ranges and PCA all need sample vectors."""
+    config = config or CONFIG
+    encoding = encoding or config.index_encoding
+    reduction = reduction or config.index_reduction
+    return index_type in TRAINED_INDEX_TYPES or encoding == "sq8" or reduction == "pca"
+
+def factory_string(index_type: str, n: int = 0, encoding: str = None, dim: int = None, config=None) -> str:
+    """
+    Index body in index_factory syntax. `encoding` picks how vectors are
+    stored (ivf_pq always uses product quantization); `dim` is only
+    needed to validate the PQ split.
+    """
+    config = config or CONFIG
+    codec = CODECS[encoding or config.index_encoding]
+
+    if index_type == "flat":
+        return codec
+    if index_type == "ivf_flat":
+        nlist = config.ivf_nlist or auto_nlist(n)
+        return f"IVF{nlist},{codec}"
+    if index_type == "ivf_pq":
+        nlist = config.ivf_nlist or auto_nlist(n)
+        if dim is not None and dim % config.pq_m:
+            raise ValueError(f"pq_m={config.pq_m} must divide the stored dimension {dim}")
+        return f"IVF{nlist},PQ{config.pq_m}x{config.pq_nbits}"
+    if index_type == "hnsw":
+        return f"HNSW{config.hnsw_m},{codec}"
+    raise ValueError(f"Unsupported index type: {index_type}")
+
+def build_index(
+        index_type: str,
+        dim: int,
+        metric: str,
+        n: int = 0,
+        encoding: str = None,
+        reduction: str = None,
+        reduced_dim: int = None,
+        shards: int = 1,
+        config=None):
+    """
+    Builds an empty index addressable by stable 64-bit ids. `n` is the
+    expected number of vectors and sizes the IVF coarse quantizer;
+    trained types still need train().
+
+    `encoding`, `reduction` and `reduced_dim` default to `config`
+    (RagConfig). Reduced indexes still take and reconstruct `dim`-sized
+    vectors. With `shards` > 1 a ShardedIndex of identical indexes is
+    returned.
+    """
+    config = config or CONFIG
+    encoding = encoding or config.index_encoding
+    reduction = reduction or config.index_reduction
+    stored_dim = dim if reduction == "none" else (reduced_dim or config.index_reduced_dim)
+    if stored_dim > dim:
+        raise ValueError(f"Reduced dimension {stored_dim} exceeds embedding dimension {dim}")
+
+    body = factory_string(index_type, n // max(shards, 1), encoding, stored_dim, config)
+    if index_type not in TRAINED_INDEX_TYPES:
+        # IVF stores ids natively; everything else gets an id map,
+        # placed under any transform so selectors see external ids
+        body = "IDMap2," + body
+
+    if reduction == "pca":
+        index = faiss.index_factory(dim, f"PCA{stored_dim},{body}", faiss_metric(metric))
+    else:
+        index = faiss.index_factory(stored_dim, body, faiss_metric(metric))
+        if reduction == "truncate":
+            index = _truncated(index, dim, metric)
+
+    hnsw = getattr(base_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efConstruction = config.hnsw_ef_construction
+
+    enable_reconstruct(index)
+    if shards > 1:
+        return ShardedIndex([index] + [copy_index(index) for _ in range(shards - 1)])
+    return index
+
+def _truncated(index, dim: int, metric: str):
+    """
+    Matryoshka-style reduction: keeps the first index.d dimensions
+    (re-normalized for cosine). Models trained that way, such as
+    nomic-embed-text v1.5, stay usable at 512/256/128 dims.
+    """
+    remap = faiss.RemapDimensionsTransform(dim, index.d, False)
+    if metric != "cosine":
+        return faiss.IndexPreTransform(remap, index)
+
+    pre = faiss.IndexPreTransform(faiss.NormalizationTransform(index.d, 2.0), index)
+    pre.prepend_transform(remap)
+    return pre
+
+def informative_dim(index) -> int:
+    """
+    Leading dimensions of a reconstructed vector that carry data.
+    Truncated indexes pad the rest with zeros, which would skew cosine
+    comparisons against full-size embeddings.
+    """
+    index = _first(index)
+    if isinstance(index, faiss.IndexPreTransform) and index.chain.size():
+        first = faiss.downcast_VectorTransform(index.chain.at(0))
+        if isinstance(first, faiss.RemapDimensionsTransform):
+            return first.d_out
+    return index.d
+
+def copy_index(index):
+    """
+    Deep copy through serialization. Unlike clone_index it supports
+    every transform, and the copy owns its memory even when `index`
+    is memory-mapped.
+    """
+    if isinstance(index, ShardedIndex):
+        return ShardedIndex([copy_index(shard) for shard in index.shards])
+    return faiss.deserialize_index(faiss.serialize_index(index))
+
+def training_sample_size(index, n: int) -> int:
+    ivf = faiss.try_extract_index_ivf(_first(index))
+    nlist = ivf.nlist if ivf is not None else 0
+    # 256 covers 8-bit PQ codebooks; SQ8 and PCA need far fewer
+    return min(n, TRAIN_POINTS_PER_LIST * max(nlist, 256))
+
+def _first(index):
+    """Shards are identical in kind, so the first one describes them all."""
+    return index.shards[0] if isinstance(index, ShardedIndex) else index
+
+def _unwrap(index):
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2, faiss.IndexPreTransform)):
+        return faiss.downcast_index(index.index)
+    return None
+
+def base_index(index):
+    """Unwraps IndexPreTransform / IndexIDMap layers to the index doing the search."""
+    index = _first(index)
+    inner = _unwrap(index)
+    while inner is not None:
+        index, inner = inner, _unwrap(inner)
+    return index
+
+def has_ids(index) -> bool:
+    """False for legacy positional indexes (row number == id)."""
+    index = _first(index)
+    layer = index
+    while layer is not None:
+        if isinstance(layer, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+            return True
+        layer = _unwrap(layer)
+    return faiss.try_extract_index_ivf(index) is not None
+
+def is_flat(index) -> bool:
+    """Brute-force scan, whatever the vector encoding."""
+    return isinstance(base_index(index), (faiss.IndexFlat, faiss.IndexScalarQuantizer))
+
+def is_exact_flat(index) -> bool:
+    """Uncompressed float32 flat index: the placeholder before training."""
+    return isinstance(base_index(index), faiss.IndexFlat) and not isinstance(_first(index), faiss.IndexPreTransform)
+
+def stores_exact_vectors(index) -> bool:
+    """
+    reconstruct() returns the float32 vectors as added: flat, IVF-flat
+    or HNSW-flat storage with no quantization or dimension reduction.
+    """
+    index = _first(index)
+    if isinstance(index, faiss.IndexPreTransform):
+        return False
+    base = base_index(index)
+    if isinstance(base, faiss.IndexHNSW):
+        base = faiss.downcast_index(base.storage)
+    return isinstance(base, (faiss.IndexFlat, faiss.IndexIVFFlat))
+
+def is_hnsw(index) -> bool:
+    return getattr(base_index(index), "hnsw", None) is not None
+
+def with_ids(index):
+    """
+    Makes an empty index addressable by stable 64-bit ids.
+    IVF stores ids natively (a hashtable direct map gives reconstruct
+    and remove by id); every other type is wrapped in IndexIDMap2.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+    return faiss.IndexIDMap2(index)
+
+def enable_reconstruct(index):
+    """IVF indexes need a hashtable direct map before reconstruct(id) works."""
+    if isinstance(index, ShardedIndex):
+        for shard in index.shards:
+            enable_reconstruct(shard)
+        return
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type != faiss.DirectMap.Hashtable:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+def search_params(index, nprobe: int = None, ef_search: int = None, sel=None, config=None):
+    """
+    Per-call search parameters. Passing them to index.search() avoids
+    mutating shared index state, so concurrent requests can differ.
+    `sel` is an optional faiss.IDSelector applied during the scan.
+    Sharded indexes pass the same parameters to every shard.
+    """
+    config = config or CONFIG
+    index = _first(index)
+    if faiss.try_extract_index_ivf(index) is not None:
+        params = faiss.SearchParametersIVF()
+        params.nprobe = nprobe or config.ivf_nprobe
+    elif is_hnsw(index):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = ef_search or config.hnsw_ef_search
+    elif sel is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+
+    if sel is not None:
+        params.sel = sel
+
+    if isinstance(index, faiss.IndexPreTransform):
+        # A transform only forwards its nested index_params
+        outer = faiss.SearchParametersPreTransform()
+        outer.index_params = params
+        outer.referenced_objects = [params]
+        return outer
+    return params
+
+def describe_index(index) -> dict:
+    shards = len(index.shards) if isinstance(index, ShardedIndex) else 1
+    index = _first(index)
+    ivf = faiss.try_extract_index_ivf(index)
+    base = base_index(index)
+
+    transforms = []
+    if isinstance(index, faiss.IndexPreTransform):
+        for i in range(index.chain.size()):
+            transforms.append(type(faiss.downcast_VectorTransform(index.chain.at(i))).__name__)
+
+    return {
+        "type": type(base).__name__,
+        "id_mapped": has_ids(index) and ivf is None,
+        "metric": "cosine" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2",
+        "is_trained": bool(index.is_trained),
+        "nlist": ivf.nlist if ivf is not None else None,
+        "transforms": transforms,
+        "stored_dim": base.d,
+        "shards": shards,
+    }
+
+class ShardedIndex:
+    """
+    Several indexes of the same kind, with chunk ids routed by
+    `id % len(shards)`. Searches fan out to all shards in parallel
+    through faiss.IndexShards and merge their top-k. Everything else
+    runs per shard, since IndexShards can't reconstruct, remove ids
+    or be serialized.
+
+    Exposes the subset of the faiss.Index API VectorStore uses.
+    """
+
+    def __init__(self, shards):
+        self.shards = list(shards)
+        self.d = self.shards[0].d
+        self.metric_type = self.shards[0].metric_type
+        self._build_view()
+
+    def _build_view(self):
+        # threaded=True: one search thread per shard
+        self._view = faiss.IndexShards(self.d, True, False)
+        for shard in self.shards:
+            self._view.add_shard(shard)
+
+    @property
+    def ntotal(self) -> int:
+        return sum(shard.ntotal for shard in self.shards)
+
+    @property
+    def is_trained(self) -> bool:
+        return all(shard.is_trained for shard in self.shards)
+
+    def _owners(self, ids: np.ndarray) -> np.ndarray:
+        return ids % len(self.shards)
+
+    def train(self, x):
+        """Trains one shard and copies it, so all shards share quantizers."""
+        self.shards[0].train(x)
+        self.shards = [self.shards[0]] + [copy_index(self.shards[0]) for _ in self.shards[1:]]
+        self._build_view()
+
+    def add_with_ids(self, x, ids):
+        ids = np.asarray(ids, dtype="int64")
+        owners = self._owners(ids)
+        for i, shard in enumerate(self.shards):
+            rows = owners == i
+            if rows.any():
+                shard.add_with_ids(np.ascontiguousarray(x[rows]), ids[rows])
+        self._view.syncWithSubIndexes()
+
+    def remove_ids(self, ids) -> int:
+        ids = np.asarray(ids, dtype="int64")
+        owners = self._owners(ids)
+        removed = sum(
+            shard.remove_ids(ids[owners == i])
+            for i, shard in enumerate(self.shards)
+            if (owners == i).any()
+        )
+        self._view.syncWithSubIndexes()
+        return removed
+
+    def reconstruct_batch(self, ids) -> np.ndarray:
+        ids = np.asarray(ids, dtype="int64")
+        owners = self._owners(ids)
+        out = np.empty((len(ids), self.d), dtype="float32")
+        for i, shard in enumerate(self.shards):
+            rows = owners == i
+            if rows.any():
+                out[rows] = shard.reconstruct_batch(ids[rows])
+        return out
+
+    def reset(self):
+        for shard in self.shards:
+            shard.reset()
+        self._view.syncWithSubIndexes()
+
+    def search(self, x, k, params=None):
+        return self._view.search(x, k, params=params)
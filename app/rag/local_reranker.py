@@ -0,0 +1,53 @@
+import numpy as np
+from typing import Optional
+from app.core.config import CONFIG
+from app.core.metrics import metrics
+from app.core.timer import Timer
+from app.rag.bm25 import tokenize
+
+def vector_similarity(chunks: list, q_emb) -> np.ndarray:
+    """Cosine similarity of the query to each stored vector, clipped to [0, 1]."""
+    vectors = [c.get("vector") for c in chunks]
+    if q_emb is None or any(v is None for v in vectors):
+        return np.zeros(len(chunks), dtype="float32")
+
+    V = np.asarray(np.stack(vectors), dtype="float32")
+    # Truncated indexes store a prefix of each vector; compare like with like
+    q = np.asarray(q_emb, dtype="float32").ravel()[:V.shape[1]]
+    norms = np.linalg.norm(V, axis=1) * np.linalg.norm(q)
+    sims = (V @ q) / np.maximum(norms, 1e-12)
+    return np.clip(sims, 0.0, 1.0)
+
+def lexical_overlap(question: str, chunks: list) -> np.ndarray:
+    """Query-term coverage and candidate-normalized BM25, averaged, in [0, 1]."""
+    terms = {term: j for j, term in enumerate(dict.fromkeys(tokenize(question)))}
+    coverage = np.zeros(len(chunks), dtype="float32")
+    if terms:
+        hits = np.zeros((len(chunks), len(terms)), dtype=bool)
+        for row, chunk in enumerate(chunks):
+            cols = [terms[t] for t in set(tokenize(chunk["text"])) if t in terms]
+            hits[row, cols] = True
+        coverage = hits.mean(axis=1)
+
+    bm25 = np.array([c.get("bm25_score") or 0.0 for c in chunks], dtype="float32")
+    if bm25.max() > 0:
+        bm25 /= bm25.max()
+
+    return 0.5 * coverage + 0.5 * bm25
+
+def local_scores(question: str, chunks: list, q_emb=None) -> np.ndarray:
+    """
+    0-100 relevance per chunk without an LLM call: embedding similarity
+    blended with lexical overlap by `rerank_local_lexical_weight`.
+    Without a query embedding only the lexical features count.
+    """
+    w = CONFIG.rerank_local_lexical_weight if q_emb is not None else 1.0
+    return 100.0 * ((1.0 - w) * vector_similarity(chunks, q_emb) + w * lexical_overlap(question, chunks))
+
+def rerank_local(question: str, chunks: list, q_emb: Optional[np.ndarray] = None) -> list:
+    with Timer() as t:
+        scores = local_scores(question, chunks, q_emb)
+    metrics.record("rerank_local_ms", t.ms)
+
+    order = np.argsort(-scores, kind="stable")
+    return [{**chunks[i], "score": round(float(scores[i]))} for i in order.tolist()]
@@ -0,0 +1,115 @@
+import bisect
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+# Exact-match fields; a chunk's "tags" list is indexed value by value
+FILTER_FIELDS = ("doc_id", "filename", "tags")
+DATE_FILTERS = ("uploaded_after", "uploaded_before")
+
+# Indexed for ingestion-time deduplication, not exposed as filters
+HASH_FIELDS = ("file_hash", "chunk_hash")
+INDEXED_FIELDS = FILTER_FIELDS + HASH_FIELDS
+
+def _timestamp(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+class MetadataIndex:
+    """
+    Posting lists over chunk metadata, so a filter resolves to its
+    matching chunk ids in time proportional to the matches rather
+    than to the corpus.
+
+    postings: field -> value -> {chunk ids}
+    dates: sorted (uploaded_at, chunk id) pairs for range filters
+
+    match() may run while a writer adds or removes chunks: it only
+    reads through set unions and list slices, which are atomic under
+    the GIL, and never iterates a shared container in Python.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, Set[int]]] = {f: {} for f in INDEXED_FIELDS}
+        self.dates = []
+        self.uploaded_at: Dict[int, float] = {}
+
+    @staticmethod
+    def _values(chunk: dict, field: str):
+        value = chunk.get(field)
+        if value is None:
+            return []
+        return value if isinstance(value, list) else [value]
+
+    def add(self, chunk_id: int, chunk: dict):
+        for field in INDEXED_FIELDS:
+            for value in self._values(chunk, field):
+                self.postings[field].setdefault(value, set()).add(chunk_id)
+
+        if chunk.get("uploaded_at") is not None:
+            ts = float(chunk["uploaded_at"])
+            bisect.insort(self.dates, (ts, chunk_id))
+            self.uploaded_at[chunk_id] = ts
+
+    def remove(self, chunk_id: int, chunk: dict):
+        for field in INDEXED_FIELDS:
+            for value in self._values(chunk, field):
+                ids = self.postings[field].get(value)
+                if ids is None:
+                    continue
+                ids.discard(chunk_id)
+                if not ids:
+                    del self.postings[field][value]
+
+        ts = self.uploaded_at.pop(chunk_id, None)
+        if ts is not None:
+            i = bisect.bisect_left(self.dates, (ts, chunk_id))
+            if i < len(self.dates) and self.dates[i] == (ts, chunk_id):
+                del self.dates[i]
+
+    def lookup(self, field: str, value: str) -> Set[int]:
+        """Live chunk ids whose `field` equals `value` (a copy)."""
+        return set(self.postings[field].get(value, ()))
+
+    def match(self, filters: dict) -> Optional[Set[int]]:
+        """
+        Chunk ids matching every given field (AND); a list of values
+        within one field matches any of them (OR). Dates bound
+        `uploaded_at` inclusively. Returns None when nothing is filtered.
+        """
+        unknown = set(filters) - set(FILTER_FIELDS) - set(DATE_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter fields: {sorted(unknown)}")
+
+        candidates = []
+        for field in FILTER_FIELDS:
+            values = filters.get(field)
+            if values is None:
+                continue
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            matched = set()
+            for value in values:
+                matched |= self.postings[field].get(value, set())
+            candidates.append(matched)
+
+        after = filters.get("uploaded_after")
+        before = filters.get("uploaded_before")
+        lo = _timestamp(after) if after is not None else float("-inf")
+        hi = _timestamp(before) if before is not None else float("inf")
+        has_dates = after is not None or before is not None
+
+        if not candidates:
+            if not has_dates:
+                return None
+            # Range scan over the sorted dates only
+            start = bisect.bisect_left(self.dates, (lo, -1))
+            end = bisect.bisect_right(self.dates, (hi, float("inf")))
+            return {chunk_id for _, chunk_id in self.dates[start:end]}
+
+        # Intersect smallest first; dates are checked per surviving id
+        candidates.sort(key=len)
+        result = set(candidates[0])
+        for other in candidates[1:]:
+            result &= other
+        if has_dates:
+            result = {i for i in result if lo <= self.uploaded_at.get(i, float("nan")) <= hi}
+        return result
@@ -1,82 +1,192 @@
+import asyncio
 import ollama
 import codecs
 import logging
-from app.core.store import vs
+import re
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from app.core.store import collections, vs
 from app.core.config import CONFIG
+from app.core.ollama_client import get_async_client
 from app.rag.rag_answer import build_rag_prompt
 from app.rag.chunking import chunk_text
-from app.rag.embeddings import embed_text
-from app.rag.reranker import rerank_chunks
-from app.rag.rewriter import rewrite_query
+from app.ingestion.dedup import chunk_hash
+from app.rag.embeddings import aembed_text, aembed_texts, embed_text, embed_texts
+from app.rag.reranker import arerank_chunks, rerank_chunks
+from app.rag.answer_cache import answer_cache, answer_cache_key
+from app.rag.bm25 import reciprocal_rank_fusion
+from app.rag.collections import DEFAULT_COLLECTION
+from app.rag.rewriter import agenerate_rewrite, arewrite_query, cached_rewrite, generate_rewrite, rewrite_query
 from app.core.errors import EmbeddingError, LLMError, PromptError, RagError, RerankError, VectorStoreError
 from app.core.timer import Timer
 from app.core.logger import log_stage
 from app.core.metrics import metrics
-from app.rag.rag_evaluator import align_citations, detect_hallucination, evaluate_answer, guardrail_decision, safety_check, semantic_score
+from app.rag.rag_evaluator import align_citations, detect_hallucination, evaluate_answer, get_safety_matrix, guardrail_decision, safety_check, semantic_score, split_sentences
 from app.core.confidence import compute_confidence
+from app.core.rerank_cache import normalize_query
 
 logger = logging.getLogger("rag")
 
+# Speculative retrieval: rewrites racing the search of the original question
+_rewrite_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rewrite")
+_pending_rewrites = set()
+
+# Literal escape sequences the model sometimes writes out: \n, \u00e9...
+ESCAPE_RE = re.compile(r"\\(?:u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|[nrt\"'\\])")
+
 def index_document(text):
     chunks = chunk_text(text)
 
+    embs = embed_chunks(chunks)
+    vs.add_batch(embs, chunks)
+
+def _known_chunk_vectors(chunks, store):
+    """
+    Tags each chunk with its normalized text hash. Returns the stored
+    vectors of chunks already in `store` (only when it stores them
+    exactly) and, by hash, the texts that still need embedding (each
+    distinct text once; the embedding cache serves repeats).
+    """
+    for chunk in chunks:
+        chunk["chunk_hash"] = chunk_hash(chunk["text"])
+
+    known = store.vectors_for_hashes([chunk["chunk_hash"] for chunk in chunks])
+    missing = {}
     for chunk in chunks:
-        emb = embed_text(chunk)
-        vs.add(emb, chunk)
+        if chunk["chunk_hash"] not in known:
+            missing.setdefault(chunk["chunk_hash"], chunk["text"])
+
+    if known:
+        logger.info("♻️ [DEDUP] Reusing stored vectors for %d/%d chunks", len(chunks) - len(missing), len(chunks))
+    return known, missing
+
+def _chunk_matrix(chunks, known, missing, fetched) -> np.ndarray:
+    vectors = {**known, **dict(zip(missing, fetched))}
+    return np.array([vectors[chunk["chunk_hash"]] for chunk in chunks], dtype="float32")
+
+def embed_chunks(chunks, store=None) -> np.ndarray:
+    """Embeddings for chunks, reusing vectors of identical chunks already indexed."""
+    known, missing = _known_chunk_vectors(chunks, store or vs)
+    fetched = embed_texts(list(missing.values())) if missing else []
+    return _chunk_matrix(chunks, known, missing, fetched)
 
-    vs.save()
+async def aembed_chunks(chunks, store=None) -> np.ndarray:
+    """Async variant of embed_chunks."""
+    known, missing = await asyncio.to_thread(_known_chunk_vectors, chunks, store or vs)
+    fetched = await aembed_texts(list(missing.values())) if missing else []
+    return _chunk_matrix(chunks, known, missing, fetched)
 
 def answer_query(
         question,
         model=CONFIG.llm_model,
         temperature=CONFIG.temperature,
         top_p=CONFIG.top_p,
-        top_k=CONFIG.top_k):
+        top_k=CONFIG.top_k,
+        nprobe=None,
+        ef_search=None,
+        filters=None,
+        collection=None):
     try:
-        return _answer_query_internal(question, model, temperature, top_p, top_k)
+        return _answer_query_internal(
+            question, model, temperature, top_p, top_k, nprobe, ef_search, filters, collection
+        )
     except RagError as e:
         logger.error("🔥 [RAG ERROR] %s", str(e))
         raise
     except Exception as e:
         logger.error("🔥 [UNKNOWN ERROR] %s", str(e))
         raise RagError("Unknown internal error") from e
-    
-def _answer_query_internal(
+
+async def aanswer_query(
         question,
         model=CONFIG.llm_model,
         temperature=CONFIG.temperature,
         top_p=CONFIG.top_p,
-        top_k=CONFIG.top_k):
-
-    logger.info("🔎 [QUERY] User question: %s", question)
+        top_k=CONFIG.top_k,
+        nprobe=None,
+        ef_search=None,
+        filters=None,
+        collection=None):
+    """Async variant of answer_query; every Ollama call goes through the shared AsyncClient."""
+    try:
+        return await _aanswer_query_internal(
+            question, model, temperature, top_p, top_k, nprobe, ef_search, filters, collection
+        )
+    except RagError as e:
+        logger.error("🔥 [RAG ERROR] %s", str(e))
+        raise
+    except Exception as e:
+        logger.error("🔥 [UNKNOWN ERROR] %s", str(e))
+        raise RagError("Unknown internal error") from e
 
-    # 1. Rewrite the question
+def retrieve_batch(questions, retrieval_k=10, nprobe=None, ef_search=None, filters=None, collection=None):
+    """
+    Retrieval only, for many questions at once: one embedding batch and
+    one FAISS call. No rewrite or rerank, so offline evaluation is bound
+    by search throughput rather than per-question LLM calls.
+    """
     try:
         with Timer() as t:
-            rewritten = rewrite_query(question)
-        log_stage("REWRITE", True, t.ms)
-        metrics.record("rewrite_ms", t.ms)
+            q_embs = embed_texts(questions)
+        log_stage("EMBED_BATCH", True, t.ms)
+        metrics.record("embed_ms", t.ms)
     except Exception as e:
-        log_stage("REWRITE", False, t.ms if 't' in locals() else 0, str(e))
-        raise PromptError(f"Rewrite failed: {e}")
+        log_stage("EMBED_BATCH", False, t.ms if 't' in locals() else 0, str(e))
+        raise EmbeddingError(f"Embedding failed: {e}")
+
+    return _search_batch_stage(q_embs, questions, retrieval_k, nprobe, ef_search, filters, collection)
 
-    # 2. Embed and retrieve chunks
+async def aretrieve_batch(questions, retrieval_k=10, nprobe=None, ef_search=None, filters=None, collection=None):
+    """Async variant of retrieve_batch; FAISS runs in a worker thread."""
     try:
         with Timer() as t:
-            q_emb = embed_text(rewritten)
-        log_stage("EMBED", True, t.ms)
+            q_embs = await aembed_texts(questions)
+        log_stage("EMBED_BATCH", True, t.ms)
         metrics.record("embed_ms", t.ms)
     except Exception as e:
-        log_stage("EMBED", False, t.ms if 't' in locals() else 0, str(e))
+        log_stage("EMBED_BATCH", False, t.ms if 't' in locals() else 0, str(e))
         raise EmbeddingError(f"Embedding failed: {e}")
 
-    # 3️. Vector search
+    return await asyncio.to_thread(
+        _search_batch_stage, q_embs, questions, retrieval_k, nprobe, ef_search, filters, collection
+    )
+
+# ------------------------------------------------------
+# Pipeline stages shared by the sync and async paths
+# ------------------------------------------------------
+def _search_batch_stage(q_embs, questions, retrieval_k, nprobe=None, ef_search=None, filters=None, collection=None):
+    # Unknown collections raise CollectionError before the search starts
+    store = collections.get(collection)
+    try:
+        with Timer() as t:
+            results = store.search_batch(
+                q_embs,
+                retrieval_k=retrieval_k,
+                query_texts=questions,
+                nprobe=nprobe,
+                ef_search=ef_search,
+                filters=filters,
+            )
+        log_stage("SEARCH_BATCH", True, t.ms)
+        metrics.record("search_ms", t.ms / max(len(questions), 1))
+    except Exception as e:
+        log_stage("SEARCH_BATCH", False, t.ms if 't' in locals() else 0, str(e))
+        raise VectorStoreError(f"Vector search failed: {e}")
+
+    return results
+
+def _search_stage(q_emb, rewritten, nprobe=None, ef_search=None, filters=None, collection=None):
+    store = collections.get(collection)
     try:
         with Timer() as t:
-            raw_chunks = vs.search(
+            raw_chunks = store.search(
                 q_emb,
                 retrieval_k=10,
-                query_text=rewritten
+                query_text=rewritten,
+                nprobe=nprobe,
+                ef_search=ef_search,
+                filters=filters,
             )
         log_stage("SEARCH", True, t.ms)
         metrics.record("search_ms", t.ms)
@@ -88,25 +198,183 @@ def _answer_query_internal(
     for i, c in enumerate(raw_chunks[:3]):
         logger.info("    • Chunk %d preview: %.50s", i, c["text"])
 
-    # 4. Rerank
+    return raw_chunks
+
+async def _asearch_stage(q_emb, rewritten, nprobe=None, ef_search=None, filters=None, collection=None):
+    # FAISS, BM25 and a first lazy store load all block → worker thread
+    return await asyncio.to_thread(_search_stage, q_emb, rewritten, nprobe, ef_search, filters, collection)
+
+def _rewrite_stage(question, rewrite=rewrite_query):
     try:
         with Timer() as t:
-            reranked = rerank_chunks(rewritten, raw_chunks)
-        log_stage("RERANK", True, t.ms)
-        metrics.record("rerank_ms", t.ms)
+            rewritten = rewrite(question)
+        log_stage("REWRITE", True, t.ms)
+        metrics.record("rewrite_ms", t.ms)
     except Exception as e:
-        log_stage("RERANK", False, t.ms if 't' in locals() else 0, str(e))
-        raise RerankError(f"Reranking failed: {e}")
+        log_stage("REWRITE", False, t.ms if 't' in locals() else 0, str(e))
+        raise PromptError(f"Rewrite failed: {e}")
+    return rewritten
 
-    if reranked:
-        logger.info("📊 [RERANK TOP] %s", [c["score"] for c in reranked[:5]])
+async def _arewrite_stage(question, rewrite=arewrite_query):
+    try:
+        with Timer() as t:
+            rewritten = await rewrite(question)
+        log_stage("REWRITE", True, t.ms)
+        metrics.record("rewrite_ms", t.ms)
+    except Exception as e:
+        log_stage("REWRITE", False, t.ms if 't' in locals() else 0, str(e))
+        raise PromptError(f"Rewrite failed: {e}")
+    return rewritten
 
-    top_chunks = reranked[:top_k]
+def _embed_stage(text):
+    try:
+        with Timer() as t:
+            q_emb = embed_text(text)
+        log_stage("EMBED", True, t.ms)
+        metrics.record("embed_ms", t.ms)
+    except Exception as e:
+        log_stage("EMBED", False, t.ms if 't' in locals() else 0, str(e))
+        raise EmbeddingError(f"Embedding failed: {e}")
+    return q_emb
+
+async def _aembed_stage(text):
+    try:
+        with Timer() as t:
+            q_emb = await aembed_text(text)
+        log_stage("EMBED", True, t.ms)
+        metrics.record("embed_ms", t.ms)
+    except Exception as e:
+        log_stage("EMBED", False, t.ms if 't' in locals() else 0, str(e))
+        raise EmbeddingError(f"Embedding failed: {e}")
+    return q_emb
 
-    # 5. Build context
+def _merge_speculative(main, speculative):
+    """Fuses the rewritten and original questions' hits by reciprocal rank."""
+    hits = {c["id"]: c for c in speculative}
+    hits.update({c["id"]: c for c in main})
+    fused = reciprocal_rank_fusion(
+        [([c["id"] for c in main], 1.0), ([c["id"] for c in speculative], 1.0)],
+        k=CONFIG.rrf_k,
+    )
+    ranked = sorted(fused, key=fused.get, reverse=True)[:max(len(main), len(speculative))]
+    return [{**hits[i], "score": fused[i]} for i in ranked]
+
+def _rewrite_changed(question, rewritten):
+    if normalize_query(rewritten) == normalize_query(question):
+        logger.info("🎯 [SPECULATIVE] Rewrite matches the question, reusing the speculative search")
+        return False
+    return True
+
+def _rewrite_done(task):
+    _pending_rewrites.discard(task)
+    # An abandoned rewrite's failure is never awaited: retrieve it so
+    # asyncio doesn't report it (log_stage already logged it)
+    if not task.cancelled():
+        task.exception()
+
+def _retrieve_stage(question, nprobe=None, ef_search=None, filters=None, collection=None):
+    """
+    Steps 1-3: rewrite, embed, search. Returns (rewritten, q_emb, chunks).
+
+    In speculative mode the original question is embedded and searched
+    while the rewrite runs in a worker thread. A rewrite that matches
+    the question reuses that search, one that differs is searched too
+    and fused with it, and one still running `rewrite_speculative_wait_s`
+    later is dropped (it still lands in the rewrite cache). A failed
+    rewrite is dropped too.
+    """
+    # Bypassed or cached rewrites are instant; only an LLM rewrite is worth racing
+    rewritten = cached_rewrite(question) if CONFIG.rewrite_speculative else _rewrite_stage(question)
+    if rewritten is not None:
+        q_emb = _embed_stage(rewritten)
+        return rewritten, q_emb, _search_stage(q_emb, rewritten, nprobe, ef_search, filters, collection)
+
+    # cached_rewrite already missed: the worker goes straight to the LLM
+    future = _rewrite_pool.submit(_rewrite_stage, question, generate_rewrite)
+    spec_emb = _embed_stage(question)
+    spec_chunks = _search_stage(spec_emb, question, nprobe, ef_search, filters, collection)
+
+    try:
+        rewritten = future.result(timeout=CONFIG.rewrite_speculative_wait_s)
+    except FutureTimeout:
+        logger.warning("⏩ [SPECULATIVE] Rewrite still running, answering from the original question")
+        metrics.increment("rewrite_discarded_count")
+        return question, spec_emb, spec_chunks
+    except PromptError:
+        # Already logged by the rewrite stage; the original question's search stands
+        logger.warning("⏩ [SPECULATIVE] Rewrite failed, answering from the original question")
+        metrics.increment("rewrite_discarded_count")
+        return question, spec_emb, spec_chunks
+
+    if not _rewrite_changed(question, rewritten):
+        return rewritten, spec_emb, spec_chunks
+    q_emb = _embed_stage(rewritten)
+    raw_chunks = _search_stage(q_emb, rewritten, nprobe, ef_search, filters, collection)
+    return rewritten, q_emb, _merge_speculative(raw_chunks, spec_chunks)
+
+async def _aretrieve_stage(question, nprobe=None, ef_search=None, filters=None, collection=None):
+    """Async variant of _retrieve_stage; the rewrite runs as a task."""
+    rewritten = cached_rewrite(question) if CONFIG.rewrite_speculative else await _arewrite_stage(question)
+    if rewritten is not None:
+        q_emb = await _aembed_stage(rewritten)
+        return rewritten, q_emb, await _asearch_stage(q_emb, rewritten, nprobe, ef_search, filters, collection)
+
+    task = asyncio.create_task(_arewrite_stage(question, agenerate_rewrite))
+    # Keep a reference so an abandoned rewrite can finish and be cached
+    _pending_rewrites.add(task)
+    task.add_done_callback(_rewrite_done)
+
+    spec_emb = await _aembed_stage(question)
+    spec_chunks = await _asearch_stage(spec_emb, question, nprobe, ef_search, filters, collection)
+
+    try:
+        rewritten = await asyncio.wait_for(asyncio.shield(task), CONFIG.rewrite_speculative_wait_s)
+    except asyncio.TimeoutError:
+        logger.warning("⏩ [SPECULATIVE] Rewrite still running, answering from the original question")
+        metrics.increment("rewrite_discarded_count")
+        return question, spec_emb, spec_chunks
+    except PromptError:
+        # Already logged by the rewrite stage; the original question's search stands
+        logger.warning("⏩ [SPECULATIVE] Rewrite failed, answering from the original question")
+        metrics.increment("rewrite_discarded_count")
+        return question, spec_emb, spec_chunks
+
+    if not _rewrite_changed(question, rewritten):
+        return rewritten, spec_emb, spec_chunks
+    q_emb = await _aembed_stage(rewritten)
+    raw_chunks = await _asearch_stage(q_emb, rewritten, nprobe, ef_search, filters, collection)
+    return rewritten, q_emb, _merge_speculative(raw_chunks, spec_chunks)
+
+def _answer_cache_lookup(question_emb, key, collection):
+    """
+    Returns (slot, cached result or None). The slot pins the store
+    version read before retrieval, so an answer racing an upload is
+    stored as already stale.
+    """
+    name = collection or DEFAULT_COLLECTION
+    version = collections.get(collection).version
+    cached = answer_cache.get(question_emb, key, name, version)
+    if cached is not None:
+        logger.info("💾 [ANSWER CACHE] Hit, reusing the answer to a similar question")
+        metrics.increment_queries()
+        cached["cached"] = True
+    return (question_emb, key, name, version), cached
+
+async def _aanswer_cache_lookup(question_emb, key, collection):
+    # Reading the store version may load it from disk → worker thread
+    return await asyncio.to_thread(_answer_cache_lookup, question_emb, key, collection)
+
+def _answer_cache_store(slot, result):
+    # Blocked answers are not reused; the next attempt may pass the guardrails
+    if slot is not None and result["allowed"]:
+        answer_cache.put(*slot, result)
+    return result
+
+def _prompt_stage(question, top_chunks):
+    # Build context
     context = "\n\n".join([c["text"] for c in top_chunks])
 
-    # 6. Build RAG prompt
+    # Build RAG prompt
     try:
         with Timer() as t:
             prompt = build_rag_prompt(context, question)
@@ -116,39 +384,39 @@ def _answer_query_internal(
         log_stage("PROMPT", False, t.ms if 't' in locals() else 0, str(e))
         raise PromptError(f"Prompt creation failed: {e}")
 
-    # 7. LLM CALL
-    try:
-        with Timer() as t:
-            result = ollama.generate(
-                model=model,
-                prompt=prompt,
-                options={
-                    "temperature": temperature,
-                    "top_p": top_p,
-                    "top_k": top_k
-                }
-            )
-        log_stage("LLM_GENERATION", True, t.ms)
-        metrics.record("llm_ms", t.ms)
-        answer = result["response"]
-        logger.info("✨ [ANSWER] %s", answer[:200] + "...")
-    except Exception as e:
-        log_stage("LLM_GENERATION", False, t.ms if 't' in locals() else 0, str(e))
-        raise LLMError(f"LLM generation failed: {e}")
-    
-    # 8. Decode
+    return prompt
+
+def _generation_options(temperature, top_p, top_k):
+    return {
+        "temperature": temperature,
+        "top_p": top_p,
+        "top_k": top_k
+    }
+
+def _decode_answer(answer):
+    """Unescapes literal escape sequences only; other text, non-ASCII included, is kept as is."""
     if isinstance(answer, str):
-        answer = codecs.decode(answer, "unicode_escape")
+        answer = ESCAPE_RE.sub(lambda m: codecs.decode(m.group(0), "unicode_escape"), answer)
+    return answer
+
+def _sources(top_chunks):
+    return [{"doc_id": c["doc_id"], "text": c["text"]} for c in top_chunks]
 
-    # 9. Build sources
-    sources = [{"doc_id": c["doc_id"], "text": c["text"]} for c in top_chunks]
+def _finalize_answer(answer, top_chunks, answer_emb, sentence_embs=None):
+    """
+    Runs evaluation & guardrails on an already-decoded answer.
+    With `sentence_embs` provided, this makes no embedding calls.
+    """
+    # Build sources (stored FAISS vectors stay server-side)
+    sources = _sources(top_chunks)
+    source_embs = np.array([c["vector"] for c in top_chunks], dtype="float32")
 
-    # 10. Evaluation & Guardrails
+    # Evaluation & Guardrails
     evaluation = evaluate_answer(answer, sources)
-    semantic = semantic_score(answer, sources)
-    hallucination = detect_hallucination(answer, sources)
-    citations = align_citations(answer, sources)
-    safety = safety_check(answer)
+    semantic = semantic_score(answer, sources, answer_emb=answer_emb, source_embs=source_embs)
+    hallucination = detect_hallucination(answer, sources, answer_emb=answer_emb, source_embs=source_embs)
+    citations = align_citations(answer, sources, source_embs=source_embs, sentence_embs=sentence_embs)
+    safety = safety_check(answer, answer_emb=answer_emb)
     confidence = compute_confidence(
         evaluation,
         semantic,
@@ -170,7 +438,7 @@ def _answer_query_internal(
         confidence_level = confidence["level"]
     else:
         confidence_level = "blocked"
-        
+
     logger.info("🎉 [RAG] Query completed successfully")
     metrics.increment_queries()
 
@@ -188,3 +456,264 @@ def _answer_query_internal(
             "safety": safety,
         },
     }
+
+def _rerank_stage(rewritten, raw_chunks, q_emb, top_k):
+    try:
+        with Timer() as t:
+            reranked = rerank_chunks(rewritten, raw_chunks, q_emb=q_emb, top_k=top_k)
+        log_stage("RERANK", True, t.ms)
+        metrics.record("rerank_ms", t.ms)
+    except Exception as e:
+        log_stage("RERANK", False, t.ms if 't' in locals() else 0, str(e))
+        raise RerankError(f"Reranking failed: {e}")
+
+    if reranked:
+        logger.info("📊 [RERANK TOP] %s", [c["score"] for c in reranked[:5]])
+
+    return reranked[:top_k]
+
+async def _arerank_stage(rewritten, raw_chunks, q_emb, top_k):
+    try:
+        with Timer() as t:
+            reranked = await arerank_chunks(rewritten, raw_chunks, q_emb=q_emb, top_k=top_k)
+        log_stage("RERANK", True, t.ms)
+        metrics.record("rerank_ms", t.ms)
+    except Exception as e:
+        log_stage("RERANK", False, t.ms if 't' in locals() else 0, str(e))
+        raise RerankError(f"Reranking failed: {e}")
+
+    if reranked:
+        logger.info("📊 [RERANK TOP] %s", [c["score"] for c in reranked[:5]])
+
+    return reranked[:top_k]
+
+def _generate_stage(model, prompt, temperature, top_p, top_k):
+    """LLM call; returns the decoded answer."""
+    try:
+        with Timer() as t:
+            result = ollama.generate(
+                model=model,
+                prompt=prompt,
+                options=_generation_options(temperature, top_p, top_k)
+            )
+        log_stage("LLM_GENERATION", True, t.ms)
+        metrics.record("llm_ms", t.ms)
+        answer = result["response"]
+        logger.info("✨ [ANSWER] %s", answer[:200] + "...")
+    except Exception as e:
+        log_stage("LLM_GENERATION", False, t.ms if 't' in locals() else 0, str(e))
+        raise LLMError(f"LLM generation failed: {e}")
+
+    return _decode_answer(answer)
+
+async def _agenerate_stage(model, prompt, temperature, top_p, top_k):
+    try:
+        with Timer() as t:
+            result = await get_async_client().generate(
+                model=model,
+                prompt=prompt,
+                options=_generation_options(temperature, top_p, top_k)
+            )
+        log_stage("LLM_GENERATION", True, t.ms)
+        metrics.record("llm_ms", t.ms)
+        answer = result["response"]
+        logger.info("✨ [ANSWER] %s", answer[:200] + "...")
+    except Exception as e:
+        log_stage("LLM_GENERATION", False, t.ms if 't' in locals() else 0, str(e))
+        raise LLMError(f"LLM generation failed: {e}")
+
+    return _decode_answer(answer)
+
+def _finalize_stage(answer, top_chunks):
+    # Answer and sentence embeddings share one batch
+    sentences = split_sentences(answer)
+    embs = embed_texts([answer] + sentences)
+    return _finalize_answer(answer, top_chunks, embs[0], sentence_embs=embs[1:])
+
+async def _afinalize_stage(answer, top_chunks):
+    # The embeddings go through the async client; the safety matrix is
+    # embedded synchronously on first use (if startup warmup failed),
+    # so that happens in a worker thread
+    sentences = split_sentences(answer)
+    embs = await aembed_texts([answer] + sentences)
+    await asyncio.to_thread(get_safety_matrix)
+    return _finalize_answer(answer, top_chunks, embs[0], sentence_embs=embs[1:])
+
+# ------------------------------------------------------
+# Sync pipeline
+# ------------------------------------------------------
+def _answer_query_internal(
+        question,
+        model=CONFIG.llm_model,
+        temperature=CONFIG.temperature,
+        top_p=CONFIG.top_p,
+        top_k=CONFIG.top_k,
+        nprobe=None,
+        ef_search=None,
+        filters=None,
+        collection=None):
+
+    logger.info("🔎 [QUERY] User question: %s", question)
+
+    # 0. Semantic answer cache
+    slot = None
+    if CONFIG.answer_cache_enabled:
+        key = answer_cache_key(model, temperature, top_p, top_k, nprobe, ef_search, filters)
+        slot, cached = _answer_cache_lookup(_embed_stage(question), key, collection)
+        if cached is not None:
+            return cached
+
+    # 1-3. Rewrite, embed and search
+    rewritten, q_emb, raw_chunks = _retrieve_stage(question, nprobe, ef_search, filters, collection)
+
+    # 4. Rerank
+    top_chunks = _rerank_stage(rewritten, raw_chunks, q_emb, top_k)
+
+    # 5-6. Build context & RAG prompt
+    prompt = _prompt_stage(question, top_chunks)
+
+    # 7-8. LLM CALL & decode
+    answer = _generate_stage(model, prompt, temperature, top_p, top_k)
+
+    # 9-10. Sources, evaluation & guardrails
+    return _answer_cache_store(slot, _finalize_stage(answer, top_chunks))
+
+# ------------------------------------------------------
+# Async pipeline
+# ------------------------------------------------------
+async def _aanswer_query_internal(
+        question,
+        model=CONFIG.llm_model,
+        temperature=CONFIG.temperature,
+        top_p=CONFIG.top_p,
+        top_k=CONFIG.top_k,
+        nprobe=None,
+        ef_search=None,
+        filters=None,
+        collection=None):
+
+    logger.info("🔎 [QUERY] User question: %s", question)
+
+    # 0. Semantic answer cache
+    slot = None
+    if CONFIG.answer_cache_enabled:
+        key = answer_cache_key(model, temperature, top_p, top_k, nprobe, ef_search, filters)
+        slot, cached = await _aanswer_cache_lookup(await _aembed_stage(question), key, collection)
+        if cached is not None:
+            return cached
+
+    # 1-3. Rewrite, embed and search
+    rewritten, q_emb, raw_chunks = await _aretrieve_stage(question, nprobe, ef_search, filters, collection)
+
+    # 4. Rerank
+    top_chunks = await _arerank_stage(rewritten, raw_chunks, q_emb, top_k)
+
+    # 5-6. Build context & RAG prompt
+    prompt = _prompt_stage(question, top_chunks)
+
+    # 7-8. LLM CALL & decode
+    answer = await _agenerate_stage(model, prompt, temperature, top_p, top_k)
+
+    # 9-10. Sources, evaluation & guardrails
+    return _answer_cache_store(slot, await _afinalize_stage(answer, top_chunks))
+
+# ------------------------------------------------------
+# Streaming pipeline
+# ------------------------------------------------------
+def _done_event(result):
+    # Sources went out before the first token
+    return "done", {k: v for k, v in result.items() if k != "sources"}
+
+async def astream_query(
+        question,
+        model=CONFIG.llm_model,
+        temperature=CONFIG.temperature,
+        top_p=CONFIG.top_p,
+        top_k=CONFIG.top_k,
+        nprobe=None,
+        ef_search=None,
+        filters=None,
+        collection=None):
+    """
+    Streaming variant of aanswer_query: an async generator of (event,
+    data) pairs. "sources" comes once rewrite, retrieval and rerank are
+    done, then a "token" per generated fragment, then "done" with the
+    guardrail verdict, confidence and final answer. Tokens are sent raw;
+    the final answer is decoded and possibly blocked by the guardrails,
+    so clients replace the streamed text with it. A failure ends the
+    stream with "error".
+    """
+    try:
+        async for event in _astream_query_internal(
+            question, model, temperature, top_p, top_k, nprobe, ef_search, filters, collection
+        ):
+            yield event
+    except RagError as e:
+        logger.error("🔥 [RAG ERROR] %s", str(e))
+        yield "error", {"error": e.__class__.__name__, "message": str(e), "type": "rag_error"}
+    except Exception as e:
+        logger.error("🔥 [UNKNOWN ERROR] %s", str(e))
+        yield "error", {"error": "RagError", "message": "Unknown internal error", "type": "rag_error"}
+
+async def _astream_query_internal(
+        question,
+        model=CONFIG.llm_model,
+        temperature=CONFIG.temperature,
+        top_p=CONFIG.top_p,
+        top_k=CONFIG.top_k,
+        nprobe=None,
+        ef_search=None,
+        filters=None,
+        collection=None):
+
+    logger.info("🔎 [QUERY] User question (stream): %s", question)
+
+    # 0. Semantic answer cache
+    slot = None
+    if CONFIG.answer_cache_enabled:
+        key = answer_cache_key(model, temperature, top_p, top_k, nprobe, ef_search, filters)
+        slot, cached = await _aanswer_cache_lookup(await _aembed_stage(question), key, collection)
+        if cached is not None:
+            yield "sources", {"sources": cached["sources"]}
+            yield "token", {"text": cached["answer"]}
+            yield _done_event(cached)
+            return
+
+    # 1-6. Rewrite, retrieve, rerank, build the prompt
+    rewritten, q_emb, raw_chunks = await _aretrieve_stage(question, nprobe, ef_search, filters, collection)
+    top_chunks = await _arerank_stage(rewritten, raw_chunks, q_emb, top_k)
+    prompt = _prompt_stage(question, top_chunks)
+
+    yield "sources", {"sources": _sources(top_chunks)}
+
+    # 7. LLM CALL, forwarded token by token
+    parts = []
+    try:
+        with Timer() as t:
+            stream = await get_async_client().generate(
+                model=model,
+                prompt=prompt,
+                options=_generation_options(temperature, top_p, top_k),
+                stream=True,
+            )
+            async for part in stream:
+                token = part.get("response", "")
+                if not token:
+                    continue
+                if not parts:
+                    metrics.record("llm_first_token_ms", (time.time() - t.start) * 1000)
+                parts.append(token)
+                yield "token", {"text": token}
+        log_stage("LLM_GENERATION", True, t.ms)
+        metrics.record("llm_ms", t.ms)
+    except Exception as e:
+        log_stage("LLM_GENERATION", False, t.ms if 't' in locals() else 0, str(e))
+        raise LLMError(f"LLM generation failed: {e}")
+
+    answer = "".join(parts)
+    logger.info("✨ [ANSWER] %s", answer[:200] + "...")
+
+    # 8-10. Decode, then guardrails on the complete answer. An escape can
+    # straddle two tokens, so only the answer in "done" is decoded
+    answer = _decode_answer(answer)
+    yield _done_event(_answer_cache_store(slot, await _afinalize_stage(answer, top_chunks)))
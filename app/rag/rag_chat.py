@@ -1,7 +1,34 @@
 from app.core.memory import memory
-from app.rag.rag import answer_query
+from app.rag.rag import aanswer_query, answer_query, astream_query
 from app.rag.summarizer import summarize_messages
 
+def _prepare_chat(session_id: str, user_message: str) -> str:
+    # 1. Store user message
+    memory.add_message(session_id, "user", user_message)
+
+    # 2. Summarize history
+    history = summarize_messages(
+        memory.get_messages(session_id)
+    )
+
+    # 3. Build chat context (for UI / debugging)
+    return "\n".join(
+        f"{m['role']}: {m['content']}" for m in history
+    )
+
+def _complete_chat(session_id: str, result: dict, chat_context: str) -> dict:
+    # 5. Store assistant answer
+    memory.add_message(
+        session_id,
+        "assistant",
+        result["answer"],
+    )
+
+    return {
+        **result,
+        "memory_context": chat_context,
+    }
+
 def answer_chat(
     session_id: str,
     user_message: str,
@@ -9,41 +36,96 @@ def answer_chat(
     temperature: float,
     top_p: float,
     top_k: int,
+    nprobe: int = None,
+    ef_search: int = None,
+    filters: dict = None,
+    collection: str = None,
 ):
     """
     Full RAG-powered chat pipeline with memory.
     """
 
-    # 1. Store user message
-    memory.add_message(session_id, "user", user_message)
+    chat_context = _prepare_chat(session_id, user_message)
 
-    # 2. Summarize history
-    history = summarize_messages(
-        memory.get_messages(session_id)
+    # 4. Run unified RAG pipeline
+    result = answer_query(
+        question=user_message,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        top_k=top_k,
+        nprobe=nprobe,
+        ef_search=ef_search,
+        filters=filters,
+        collection=collection,
     )
 
-    # 3. Build chat context (for UI / debugging)
-    chat_context = "\n".join(
-        f"{m['role']}: {m['content']}" for m in history
-    )
+    return _complete_chat(session_id, result, chat_context)
+
+async def aanswer_chat(
+    session_id: str,
+    user_message: str,
+    model: str,
+    temperature: float,
+    top_p: float,
+    top_k: int,
+    nprobe: int = None,
+    ef_search: int = None,
+    filters: dict = None,
+    collection: str = None,
+):
+    """
+    Async variant of answer_chat.
+    """
+
+    chat_context = _prepare_chat(session_id, user_message)
 
     # 4. Run unified RAG pipeline
-    result = answer_query(
+    result = await aanswer_query(
         question=user_message,
         model=model,
         temperature=temperature,
         top_p=top_p,
         top_k=top_k,
+        nprobe=nprobe,
+        ef_search=ef_search,
+        filters=filters,
+        collection=collection,
     )
 
-    # 5. Store assistant answer
-    memory.add_message(
-        session_id,
-        "assistant",
-        result["answer"],
-    )
+    return _complete_chat(session_id, result, chat_context)
 
-    return {
-        **result,
-        "memory_context": chat_context,
-    }
+async def astream_chat(
+    session_id: str,
+    user_message: str,
+    model: str,
+    temperature: float,
+    top_p: float,
+    top_k: int,
+    nprobe: int = None,
+    ef_search: int = None,
+    filters: dict = None,
+    collection: str = None,
+):
+    """
+    Streaming variant of aanswer_chat: astream_query's events, with the
+    final answer stored in memory and the memory context on "done".
+    """
+
+    chat_context = _prepare_chat(session_id, user_message)
+
+    # 4. Run the streaming RAG pipeline
+    async for event, data in astream_query(
+        question=user_message,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        top_k=top_k,
+        nprobe=nprobe,
+        ef_search=ef_search,
+        filters=filters,
+        collection=collection,
+    ):
+        if event == "done":
+            data = _complete_chat(session_id, data, chat_context)
+        yield event, data
@@ -1,5 +1,49 @@
-from app.rag.embeddings import embed_text
+import json
+import os
+import re
+import threading
 import numpy as np
+from app.core.config import CONFIG
+from app.core.logger import logger
+from app.rag.embeddings import embed_texts
+
+def _cosine_scores(vec: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity between one vector and every row of a matrix.
+    A longer `vec` is cut to the matrix width: stored vectors may be
+    Matryoshka-truncated, and a prefix of such an embedding is itself
+    a valid embedding.
+    """
+    vec = vec[:matrix.shape[1]]
+    denom = np.linalg.norm(matrix, axis=1) * np.linalg.norm(vec)
+    dots = matrix @ vec
+    return np.divide(dots, denom, out=np.zeros_like(dots), where=denom != 0)
+
+def _resolve_embeddings(answer: str, sources: list, answer_emb=None, source_embs=None):
+    """
+    Returns (answer_emb, source_embs), embedding only what the caller
+    did not provide. Retrieved chunks normally arrive with their stored
+    FAISS vectors, so the common case costs at most the answer embedding.
+    """
+    texts = []
+    if answer_emb is None:
+        texts.append(answer)
+    if source_embs is None:
+        texts.extend(entry["text"] for entry in sources)
+
+    embs = embed_texts(texts) if texts else None
+
+    if answer_emb is None:
+        answer_emb, embs = embs[0], embs[1:]
+    if source_embs is None:
+        source_embs = embs
+
+    answer_emb = np.asarray(answer_emb, dtype="float32")
+    source_embs = np.asarray(source_embs, dtype="float32")
+    if len(sources) == 0:
+        source_embs = np.zeros((0, answer_emb.shape[0]), dtype="float32")
+
+    return answer_emb, source_embs
 
 def evaluate_answer(answer: str, sources: list) -> dict:
     """
@@ -24,9 +68,10 @@ def evaluate_answer(answer: str, sources: list) -> dict:
         "confidence": "low" if overlap < 3 else "medium" if overlap < 10 else "high"
     }
 
-def semantic_score(answer: str, sources: list) -> dict:
+def semantic_score(answer: str, sources: list, answer_emb=None, source_embs=None) -> dict:
     """
     Computes semantic similarity between the answer and each retrieved chunk.
+    `source_embs` are the chunks' stored vectors, one row per source.
 
     Returns:
         {
@@ -38,21 +83,10 @@ def semantic_score(answer: str, sources: list) -> dict:
         }
     """
 
-    # Embed the answer
-    ans_emb = embed_text(answer)
-
-    chunk_scores = []
+    ans_emb, src_embs = _resolve_embeddings(answer, sources, answer_emb, source_embs)
 
-    for entry in sources:
-        text = entry["text"]
-        src_emb = embed_text(text)
-
-        # Cosine similarity
-        dot = float(np.dot(ans_emb, src_emb))
-        denom = float(np.linalg.norm(ans_emb) * np.linalg.norm(src_emb))
-        cos = dot / denom if denom != 0 else 0.0
-
-        chunk_scores.append(float(cos))
+    # Cosine similarity
+    chunk_scores = [float(cos) for cos in _cosine_scores(ans_emb, src_embs)]
 
     if not chunk_scores:
         return {
@@ -83,37 +117,46 @@ def semantic_score(answer: str, sources: list) -> dict:
         "confidence": conf
     }
 
-def detect_hallucination(answer: str, sources: list, threshold: float = 0.55) -> dict:
+def detect_hallucination(answer: str, sources: list, threshold: float = 0.55,
+                         answer_emb=None, source_embs=None) -> dict:
     """
-    Detects hallucinations by checking semantic similarity
-    between the answer and the combined source text.
+    Detects hallucinations by checking semantic similarity between
+    the answer and the centroid of the (normalized) source vectors.
 
     Returns:
         {
             "score": float,
+            "max": float,
             "hallucinated": bool
         }
     """
 
-    # Combine all chunk texts
-    source_texts = [entry["text"] for entry in sources]
-    combined_source = "\n".join(source_texts)
+    answer_emb, source_embs = _resolve_embeddings(answer, sources, answer_emb, source_embs)
 
-    # Embed both
-    answer_emb = embed_text(answer)
-    source_emb = embed_text(combined_source)
+    if len(source_embs) == 0:
+        return {"score": 0.0, "max": 0.0, "hallucinated": True}
 
-    # Compute cosine similarity
-    cos = np.dot(answer_emb, source_emb) / (
-        np.linalg.norm(answer_emb) * np.linalg.norm(source_emb)
-    )
+    # Normalize each chunk so long chunks don't dominate the centroid
+    norms = np.linalg.norm(source_embs, axis=1, keepdims=True)
+    unit = np.divide(source_embs, norms, out=np.zeros_like(source_embs), where=norms != 0)
+    centroid = unit.mean(axis=0)
+
+    cos = float(_cosine_scores(answer_emb, centroid[None, :])[0])
+    best = float(_cosine_scores(answer_emb, source_embs).max())
 
     return {
-        "score": float(cos),
+        "score": cos,
+        "max": best,
         "hallucinated": bool(cos < threshold)
     }
 
-def align_citations(answer: str, sources: list, threshold: float = 0.45) -> list:
+def split_sentences(answer: str) -> list:
+    """Splits an answer into the non-empty sentences used for citation alignment."""
+    sentences = re.split(r'(?<=[.!?])\s+', answer.strip())
+    return [sent for sent in sentences if sent.strip()]
+
+def align_citations(answer: str, sources: list, threshold: float = 0.45,
+                    source_embs=None, sentence_embs=None) -> list:
     """
     Aligns each sentence of the answer with the most relevant source chunk.
 
@@ -127,32 +170,33 @@ def align_citations(answer: str, sources: list, threshold: float = 0.45) -> list
     ]
     """
 
-    import re
-
     # Split answer into sentences
-    sentences = re.split(r'(?<=[.!?])\s+', answer.strip())
+    sentences = split_sentences(answer)
 
     citations = []
 
-    for sent in sentences:
-        if not sent.strip():
-            continue
+    if not sentences:
+        return citations
+
+    # Embed every sentence in one batch; chunks reuse their stored vectors
+    if sentence_embs is None:
+        sent_embs = embed_texts(sentences)
+    else:
+        sent_embs = np.asarray(sentence_embs, dtype="float32")
+    if source_embs is None:
+        src_embs = embed_texts([entry["text"] for entry in sources])
+    else:
+        src_embs = np.asarray(source_embs, dtype="float32")
 
-        sent_emb = embed_text(sent)
+    for sent, sent_emb in zip(sentences, sent_embs):
         best_score = -1
         best_source = None
 
-        for entry in sources:
-            text = entry["text"]
-            src_emb = embed_text(text)
-
-            dot = float(np.dot(sent_emb, src_emb))
-            denom = float(np.linalg.norm(sent_emb) * np.linalg.norm(src_emb))
-            cos = dot / denom if denom != 0 else 0.0
-
-            if cos > best_score:
-                best_score = cos
-                best_source = entry
+        if sources:
+            scores = _cosine_scores(sent_emb, src_embs)
+            best = int(np.argmax(scores))
+            best_score = float(scores[best])
+            best_source = sources[best]
 
         citations.append({
             "sentence": sent,
@@ -162,10 +206,59 @@ def align_citations(answer: str, sources: list, threshold: float = 0.45) -> list
 
     return citations
 
-def safety_check(answer: str, threshold: float = 0.65) -> dict:
+SAFETY_CATEGORIES_FILE = os.path.join(os.path.dirname(__file__), "safety_categories.json")
+
+# embedding model -> (category label per row, normalized reference matrix)
+_safety_matrices = {}
+_safety_lock = threading.Lock()
+
+def load_safety_categories(path: str = None) -> dict:
+    """
+    Loads {category: [reference phrase, ...]} from a JSON file.
+    A bare string is accepted as a single phrase.
+    """
+    path = path or CONFIG.safety_categories_file or SAFETY_CATEGORIES_FILE
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+
+    return {
+        category: [phrases] if isinstance(phrases, str) else list(phrases)
+        for category, phrases in raw.items()
+    }
+
+def get_safety_matrix(model: str = None):
+    """
+    Returns (labels, matrix) for the given embedding model, embedding
+    every reference phrase once on first use. Rows are L2-normalized.
+    """
+    model = model or CONFIG.embedding_model
+
+    cached = _safety_matrices.get(model)
+    if cached is not None:
+        return cached
+
+    with _safety_lock:
+        if model not in _safety_matrices:
+            categories = load_safety_categories()
+            labels = [c for c, phrases in categories.items() for _ in phrases]
+            phrases = [p for ps in categories.values() for p in ps]
+
+            matrix = embed_texts(phrases)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms != 0)
+
+            _safety_matrices[model] = (labels, np.ascontiguousarray(matrix))
+            logger.info(
+                f"🛡️ [SAFETY] Embedded {len(phrases)} reference phrases "
+                f"for {len(categories)} categories (model={model})"
+            )
+
+    return _safety_matrices[model]
+
+def safety_check(answer: str, threshold: float = 0.65, answer_emb=None) -> dict:
     """
     Detects unsafe content using semantic similarity
-    to reference unsafe category embeddings.
+    to the precomputed unsafe category reference matrix.
     
     Returns:
         {
@@ -175,35 +268,24 @@ def safety_check(answer: str, threshold: float = 0.65) -> dict:
         }
     """
 
-    unsafe_categories = {
-        "hate": "hate speech, racial slurs, extremist insults",
-        "toxicity": "offensive language, insults, harassment, swear words",
-        "self-harm": "self-harm instructions, suicide encouragement",
-        "sexual": "sexual content, explicit descriptions",
-        "violence": "violent acts, threats, harm instructions",
-        "weapons": "weapon creation, bomb making, harmful tools"
-    }
-
-    answer_emb = embed_text(answer)
-
-    best_cat = "safe"
-    best_score = 0.0
+    labels, ref_matrix = get_safety_matrix()
 
-    for category, desc in unsafe_categories.items():
-        ref_emb = embed_text(desc)
+    if answer_emb is None:
+        answer_emb = embed_texts([answer])[0]
 
-        dot = float(np.dot(answer_emb, ref_emb))
-        denom = float(np.linalg.norm(answer_emb) * np.linalg.norm(ref_emb))
-        cos = dot / denom if denom != 0 else 0.0
+    norm = float(np.linalg.norm(answer_emb))
+    if norm == 0 or len(labels) == 0:
+        return {"safe": True, "category": None, "score": 0.0}
 
-        if cos > best_score:
-            best_score = cos
-            best_cat = category
+    # One matrix-vector product scores every reference phrase
+    scores = ref_matrix @ (answer_emb / norm)
+    best = int(np.argmax(scores))
+    best_score = max(float(scores[best]), 0.0)
 
     return {
         "safe": best_score < threshold,
-        "category": None if best_score < threshold else best_cat,
-        "score": float(best_score)
+        "category": None if best_score < threshold else labels[best],
+        "score": best_score
     }
 
 def guardrail_decision(answer: str, evaluation: dict, hallucination: dict,
@@ -1,8 +1,22 @@
-import ollama
+import asyncio
+import json
+import logging
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from app.core.config import CONFIG
+from app.core.metrics import metrics
+from app.core.ollama_client import get_async_client, get_sync_client
+from app.core.rerank_cache import rerank_cache
+from app.core.timer import Timer
+from app.ingestion.dedup import chunk_hash
+from app.rag.adaptive_rerank import RerankPlan, plan_rerank
+from app.rag.local_reranker import rerank_local
 
-def score_chunk(question: str, chunk: str) -> int:
-    prompt = f"""
+logger = logging.getLogger("rag")
+
+def build_score_prompt(question: str, chunk: str) -> str:
+    return f"""
 You are a relevance evaluator.
 
 Question:
@@ -17,27 +31,298 @@ Give a score from 0 (not relevant) to 100 (highly relevant).
 Only return the number.
 """
 
-    response = ollama.generate(
-        model=CONFIG.llm_model,
-        prompt=prompt
-    )
+def build_listwise_prompt(question: str, chunks: List[str]) -> str:
+    passages = "\n\n".join(f"[{i}] {text}" for i, text in enumerate(chunks))
+    return f"""
+You are a relevance evaluator.
+
+Question:
+{question}
+
+Passages:
+{passages}
 
+Task:
+Rank the passages by how relevant they are to answering the question,
+most relevant first. Use the passage numbers in square brackets.
+Return only JSON of the form {{"ranking": [3, 0, 1]}}.
+"""
+
+def parse_score(text: str) -> int:
     try:
-        score = int("".join(filter(str.isdigit, response["response"])))
+        score = int("".join(filter(str.isdigit, text)))
         return min(max(score, 0), 100)
     except:
         return 0
 
-def rerank_chunks(question: str, chunks: list):
+def parse_ranking(text: str, n: int) -> Optional[List[int]]:
+    """
+    Candidate positions best first, or None if the reply isn't a valid
+    ranking. Valid means JSON, a list of in-range integer ids (bare or
+    under "ranking"), no duplicates. Ids the model left out keep their
+    retrieval order after the ranked ones.
+    """
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+
+    if isinstance(data, dict):
+        data = data.get("ranking")
+    if not isinstance(data, list) or not data:
+        return None
+
+    ranking = []
+    for item in data:
+        if isinstance(item, str) and item.strip().isdigit():
+            item = int(item)
+        if isinstance(item, bool) or not isinstance(item, int) or not 0 <= item < n or item in ranking:
+            return None
+        ranking.append(item)
+
+    return ranking + [i for i in range(n) if i not in ranking]
+
+def _ranked(chunks: list, ranking: List[int]) -> list:
+    """Chunks in ranked order, scored 100 for the best down to 100/n."""
+    n = len(chunks)
+    return [
+        {**chunks[i], "score": round(100 * (n - rank) / n)}
+        for rank, i in enumerate(ranking)
+    ]
+
+def _fallback_scores(chunks: list) -> List[int]:
+    """Retrieval scores rescaled to 0-100, the best candidate at 100."""
+    best = max((c.get("score") or 0.0 for c in chunks), default=0.0)
+    return [round(100 * (c.get("score") or 0.0) / best) if best > 0 else 0 for c in chunks]
+
+def _chunk_hashes(chunks: list) -> List[str]:
+    return [chunk.get("chunk_hash") or chunk_hash(chunk["text"]) for chunk in chunks]
+
+def invalidate_scores(chunks: list):
+    """Drops cached scores for these chunks' content, e.g. once their document is deleted."""
+    rerank_cache.invalidate_chunks(_chunk_hashes(chunks))
+
+def _cached_scores(question: str, chunks: list):
+    """Returns (scores with None for misses, content hashes, indices to score)."""
+    hashes = _chunk_hashes(chunks)
+    if not CONFIG.rerank_cache_enabled:
+        return [None] * len(chunks), hashes, list(range(len(chunks)))
+    scores = rerank_cache.get_many(CONFIG.llm_model, question, hashes)
+    return scores, hashes, [i for i, s in enumerate(scores) if s is None]
+
+def _store_scores(question: str, hashes: List[str], scores: List[Optional[int]], missing: List[int]):
+    # Failed calls (None) aren't cached
+    fresh = [i for i in missing if scores[i] is not None]
+    if CONFIG.rerank_cache_enabled and fresh:
+        rerank_cache.put_many(CONFIG.llm_model, question, [hashes[i] for i in fresh], [scores[i] for i in fresh])
+
+def _pointwise_sorted(chunks: list, scores: List[Optional[int]]) -> list:
+    """Failed calls (None) keep the candidate's retrieval score."""
+    if any(s is None for s in scores):
+        fallback = _fallback_scores(chunks)
+        scores = [f if s is None else s for s, f in zip(scores, fallback)]
+    scored = [{**chunk, "score": s} for chunk, s in zip(chunks, scores)]
+    return sorted(scored, key=lambda x: x["score"], reverse=True)
+
+# ------------------------------------------------------
+# Pointwise: one generation per candidate, run concurrently
+# ------------------------------------------------------
+def score_chunk(question: str, chunk: str, timeout: float = None) -> int:
+    response = get_sync_client(timeout).generate(
+        model=CONFIG.llm_model,
+        prompt=build_score_prompt(question, chunk)
+    )
+
+    return parse_score(response["response"])
+
+async def ascore_chunk(question: str, chunk: str, timeout: float = None) -> int:
+    response = await get_async_client(timeout).generate(
+        model=CONFIG.llm_model,
+        prompt=build_score_prompt(question, chunk)
+    )
+
+    return parse_score(response["response"])
+
+def _score_or_none(question: str, chunk: str) -> Optional[int]:
+    """The chunk's score, or None if the call timed out or failed."""
+    try:
+        return score_chunk(question, chunk, timeout=CONFIG.rerank_timeout_s)
+    except httpx.TimeoutException:
+        metrics.increment("rerank_timeout_count")
+    except Exception as e:
+        logger.warning(f"⚠️ [RERANK] Pointwise call failed: {e}")
+        metrics.increment("rerank_error_count")
+    return None
+
+def rerank_pointwise(question: str, chunks: list):
+    """
+    Scores up to `rerank_concurrency` chunks at once (Ollama serves
+    OLLAMA_NUM_PARALLEL requests in parallel). A call that fails or
+    exceeds `rerank_timeout_s` keeps the chunk's retrieval score.
+    Cached scores skip the LLM.
+    """
+    with Timer() as t:
+        scores, hashes, missing = _cached_scores(question, chunks)
+        if missing:
+            workers = min(CONFIG.rerank_concurrency, len(missing))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rerank") as pool:
+                fetched = pool.map(lambda i: _score_or_none(question, chunks[i]["text"]), missing)
+                for i, score in zip(missing, fetched):
+                    scores[i] = score
+            _store_scores(question, hashes, scores, missing)
+    metrics.record("rerank_pointwise_ms", t.ms)
+    return _pointwise_sorted(chunks, scores)
+
+async def arerank_pointwise(question: str, chunks: list):
+    """Async variant of rerank_pointwise."""
+    semaphore = asyncio.Semaphore(CONFIG.rerank_concurrency)
+
+    async def score(chunk: dict) -> Optional[int]:
+        async with semaphore:
+            try:
+                return await ascore_chunk(question, chunk["text"], timeout=CONFIG.rerank_timeout_s)
+            except httpx.TimeoutException:
+                metrics.increment("rerank_timeout_count")
+            except Exception as e:
+                logger.warning(f"⚠️ [RERANK] Pointwise call failed: {e}")
+                metrics.increment("rerank_error_count")
+            return None
+
+    with Timer() as t:
+        # The cache's SQLite tier would block the event loop
+        scores, hashes, missing = await asyncio.to_thread(_cached_scores, question, chunks)
+        if missing:
+            fetched = await asyncio.gather(*(score(chunks[i]) for i in missing))
+            for i, s in zip(missing, fetched):
+                scores[i] = s
+            await asyncio.to_thread(_store_scores, question, hashes, scores, missing)
+    metrics.record("rerank_pointwise_ms", t.ms)
+    return _pointwise_sorted(chunks, scores)
+
+# ------------------------------------------------------
+# Listwise: one generation ranks every candidate
+# ------------------------------------------------------
+def rerank_listwise(question: str, chunks: list):
+    """
+    Ranks all candidates in one call. A failed call or an unparseable
+    reply falls back to pointwise, then to retrieval order.
+    """
+    try:
+        with Timer() as t:
+            response = get_sync_client().generate(
+                model=CONFIG.llm_model,
+                prompt=build_listwise_prompt(question, [c["text"] for c in chunks]),
+                format="json",
+            )
+        metrics.record("rerank_listwise_ms", t.ms)
+        ranking = parse_ranking(response["response"], len(chunks))
+        if ranking is not None:
+            return _ranked(chunks, ranking)
+        logger.warning("⚠️ [RERANK] Unparseable listwise ranking, falling back to pointwise")
+    except Exception as e:
+        logger.warning(f"⚠️ [RERANK] Listwise call failed ({e}), falling back to pointwise")
+
+    metrics.increment("rerank_fallback_count")
+    try:
+        return rerank_pointwise(question, chunks)
+    except Exception as e:
+        logger.warning(f"⚠️ [RERANK] Pointwise fallback failed ({e}), keeping retrieval order")
+        return _pointwise_sorted(chunks, [None] * len(chunks))
+
+async def arerank_listwise(question: str, chunks: list):
+    """Async variant of rerank_listwise."""
+    try:
+        with Timer() as t:
+            response = await get_async_client().generate(
+                model=CONFIG.llm_model,
+                prompt=build_listwise_prompt(question, [c["text"] for c in chunks]),
+                format="json",
+            )
+        metrics.record("rerank_listwise_ms", t.ms)
+        ranking = parse_ranking(response["response"], len(chunks))
+        if ranking is not None:
+            return _ranked(chunks, ranking)
+        logger.warning("⚠️ [RERANK] Unparseable listwise ranking, falling back to pointwise")
+    except Exception as e:
+        logger.warning(f"⚠️ [RERANK] Listwise call failed ({e}), falling back to pointwise")
+
+    metrics.increment("rerank_fallback_count")
+    try:
+        return await arerank_pointwise(question, chunks)
+    except Exception as e:
+        logger.warning(f"⚠️ [RERANK] Pointwise fallback failed ({e}), keeping retrieval order")
+        return _pointwise_sorted(chunks, [None] * len(chunks))
+
+# ------------------------------------------------------
+# Backends
+# ------------------------------------------------------
+RERANK_BACKENDS = ("llm", "local", "off")
+
+def rerank_backend() -> str:
+    """Configured backend; "off" whenever reranking is disabled."""
+    return CONFIG.rerank_backend if CONFIG.rerank_enabled else "off"
+
+def _rerank_llm(question: str, chunks: list):
+    if CONFIG.rerank_mode == "listwise":
+        return rerank_listwise(question, chunks)
+    return rerank_pointwise(question, chunks)
+
+async def _arerank_llm(question: str, chunks: list):
+    if CONFIG.rerank_mode == "listwise":
+        return await arerank_listwise(question, chunks)
+    return await arerank_pointwise(question, chunks)
+
+def _plan(question: str, chunks: list, q_emb, top_k: int) -> RerankPlan:
+    plan = plan_rerank(question, chunks, q_emb, top_k)
+    logger.info(
+        "🎯 [RERANK PLAN] %s: head=%d band=%d tail=%d (top margin %.1f)",
+        plan.action, len(plan.head), len(plan.band), len(plan.tail), plan.margin
+    )
+    if plan.action == "skip":
+        metrics.increment("rerank_skip_count")
+    metrics.record("rerank_candidates", len(plan.band) if len(plan.band) > 1 else 0)
+    return plan
+
+def _adaptive(backend: str, top_k: int) -> bool:
+    # Only the LLM backend is worth trimming; the others cost nothing
+    return backend == "llm" and top_k is not None and CONFIG.rerank_adaptive
+
+def rerank_chunks(question: str, chunks: list, q_emb=None, backend: str = None, top_k: int = None):
+    """
+    Reorders retrieved chunks by relevance with `backend` (default: the
+    configured one). "local" needs the query embedding for its vector
+    feature; "off" keeps retrieval order and scores. Given `top_k`, the
+    LLM backend only sees the candidates whose place in the top_k the
+    retrieval scores leave in doubt (see plan_rerank).
+    """
     if not chunks:
         return []
 
-    scored = []
-    for chunk in chunks:
-        s = score_chunk(question, chunk)
-        scored.append({
-            "score": s,
-            **chunk
-        })
+    backend = backend or rerank_backend()
+    if backend == "off":
+        return _pointwise_sorted(chunks, [None] * len(chunks))
+    if backend == "local":
+        return rerank_local(question, chunks, q_emb)
+    if not _adaptive(backend, top_k):
+        return _rerank_llm(question, chunks)
 
-    return sorted(scored, key=lambda x: x["score"], reverse=True)
+    plan = _plan(question, chunks, q_emb, top_k)
+    band = _rerank_llm(question, plan.band) if len(plan.band) > 1 else plan.band
+    return plan.head + band + plan.tail
+
+async def arerank_chunks(question: str, chunks: list, q_emb=None, backend: str = None, top_k: int = None):
+    if not chunks:
+        return []
+
+    backend = backend or rerank_backend()
+    if backend == "off":
+        return _pointwise_sorted(chunks, [None] * len(chunks))
+    if backend == "local":
+        # Pure NumPy over a handful of candidates: cheaper than a thread hop
+        return rerank_local(question, chunks, q_emb)
+    if not _adaptive(backend, top_k):
+        return await _arerank_llm(question, chunks)
+
+    plan = _plan(question, chunks, q_emb, top_k)
+    band = await _arerank_llm(question, plan.band) if len(plan.band) > 1 else plan.band
+    return plan.head + band + plan.tail
@@ -1,8 +1,31 @@
+import logging
+import re
 import ollama
+from typing import Optional
 from app.core.config import CONFIG
+from app.core.metrics import metrics
+from app.core.ollama_client import get_async_client
+from app.core.rewrite_cache import rewrite_cache
+from app.rag.bm25 import tokenize
 
-def rewrite_query(question: str) -> str:
-    prompt = f"""
+logger = logging.getLogger("rag")
+
+# Words that lean on missing context, and short all-caps abbreviations:
+# both are what the rewrite prompt exists to fix
+VAGUE_TERMS = {"thing", "things", "stuff", "etc"}
+# Vague only without an antecedent: no content word before them in the question
+PRONOUNS = {"it", "this", "that", "these", "those", "they", "them"}
+FUNCTION_WORDS = PRONOUNS | {
+    "a", "an", "the", "and", "or", "but", "so", "if", "then", "of", "in", "on", "at", "to",
+    "for", "with", "from", "by", "about", "as", "not", "is", "are", "was", "were", "be",
+    "been", "do", "does", "did", "can", "could", "should", "would", "will", "may", "might",
+    "must", "have", "has", "had", "what", "how", "why", "when", "where", "who", "which",
+    "i", "you", "we", "me", "my", "your", "our", "please", "explain", "tell", "show", "describe",
+}
+ABBREVIATION_RE = re.compile(r"\b[A-Z]{2,5}s?\b")
+
+def build_rewrite_prompt(question: str) -> str:
+    return f"""
 Rewrite the following question so it becomes a better search query for a document-based retrieval system.
 
 Guidelines:
@@ -17,9 +40,69 @@ Original question:
 {question}
 """
 
+def _unresolved_pronoun(words: list) -> bool:
+    """A pronoun before any content word: "how does it work" but not "why is the index slow when it grows"."""
+    for w in words:
+        if w in PRONOUNS:
+            return True
+        if w not in FUNCTION_WORDS:
+            return False
+    return False
+
+def should_rewrite(question: str) -> bool:
+    """
+    "always"/"off" force the choice. "auto" skips questions that are
+    already specific: at least `rewrite_min_words` words, no vague
+    references and no abbreviations to expand.
+    """
+    if CONFIG.rewrite_mode != "auto":
+        return CONFIG.rewrite_mode == "always"
+
+    words = tokenize(question)
+    return (
+        len(words) < CONFIG.rewrite_min_words
+        or any(w in VAGUE_TERMS for w in words)
+        or _unresolved_pronoun(words)
+        or ABBREVIATION_RE.search(question) is not None
+    )
+
+def cached_rewrite(question: str) -> Optional[str]:
+    """The rewrite if it costs no LLM call (bypassed or cached), else None."""
+    if not should_rewrite(question):
+        logger.info("⏭️ [REWRITE] Skipped (mode=%s)", CONFIG.rewrite_mode)
+        metrics.increment("rewrite_bypass_count")
+        return question
+    return rewrite_cache.get(CONFIG.llm_model, question)
+
+def generate_rewrite(question: str) -> str:
+    """LLM rewrite, stored in the rewrite cache. Checks neither the cache nor the bypass."""
     response = ollama.generate(
         model=CONFIG.llm_model,
-        prompt=prompt
+        prompt=build_rewrite_prompt(question)
     )
 
-    return response["response"].strip()
+    rewritten = response["response"].strip()
+    rewrite_cache.put(CONFIG.llm_model, question, rewritten)
+    return rewritten
+
+async def agenerate_rewrite(question: str) -> str:
+    response = await get_async_client().generate(
+        model=CONFIG.llm_model,
+        prompt=build_rewrite_prompt(question)
+    )
+
+    rewritten = response["response"].strip()
+    rewrite_cache.put(CONFIG.llm_model, question, rewritten)
+    return rewritten
+
+def rewrite_query(question: str) -> str:
+    rewritten = cached_rewrite(question)
+    if rewritten is not None:
+        return rewritten
+    return generate_rewrite(question)
+
+async def arewrite_query(question: str) -> str:
+    rewritten = cached_rewrite(question)
+    if rewritten is not None:
+        return rewritten
+    return await agenerate_rewrite(question)
@@ -2,88 +2,1075 @@ import faiss
 import numpy as np
 import json
 import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app.core.config import CONFIG
+from app.core.errors import VectorStoreError
+from app.core.logger import logger
+from app.core.timer import Timer
+from app.rag.bm25 import BM25Index, reciprocal_rank_fusion
+from app.rag.document_registry import DocumentRegistry
+from app.rag.metadata_index import MetadataIndex
+from app.rag.wal import WriteAheadLog, decode_vectors, encode_vectors, fsync_dir
+from app.rag.index_factory import (
+    ShardedIndex,
+    build_index,
+    copy_index,
+    describe_index,
+    enable_reconstruct,
+    has_ids,
+    informative_dim,
+    is_exact_flat,
+    is_flat,
+    is_hnsw,
+    requires_training,
+    search_params,
+    stores_exact_vectors,
+    training_sample_size,
+    with_ids,
+)
 
 DB_FOLDER = "db"
-META_FILE = os.path.join(DB_FOLDER, "meta.json")
-INDEX_FILE = os.path.join(DB_FOLDER, "index.faiss")
 
-def keyword_score(query: str, text: str) -> int:
-    """Simple lexical scoring: counts how many query words appear in the chunk."""
-    query_words = query.lower().split()
-    text_lower = text.lower()
+# File names inside a store's folder
+MANIFEST_FILE = "manifest.json"
+WAL_FILE = "wal.log"
 
-    score = 0
-    for w in query_words:
-        if w in text_lower:
-            score += 1
-    return score
+# Pre-checkpoint layout, migrated on first load
+META_FILE = "meta.json"
+INDEX_FILE = "index.faiss"
+BM25_FILE = "bm25.json"
+
+class Segment(NamedTuple):
+    """One write's vectors: ids from `start` up to the next segment's start."""
+    start: int
+    index: object
+
+class Snapshot(NamedTuple):
+    """
+    What a search reads, published as one object. Nothing reachable
+    from a published snapshot is ever mutated, so readers need no lock.
+
+    index: base index, holding ids below delta_start
+    deltas: small immutable segments of the base's kind for ids in
+            [delta_start, next_id), one appended per write, in id order
+    selector: (batch, not) pair excluding tombstoned ids, or None
+    """
+    index: object
+    deltas: Tuple[Segment, ...]
+    delta_start: int
+    next_id: int
+    selector: Optional[Tuple]
 
 class VectorStore:
-    def __init__(self, dim=768):
+    """
+    FAISS index + chunk metadata addressed by stable 64-bit chunk ids.
+
+    Searches read an immutable Snapshot and never block on writes.
+    Writers serialize on a lock, put their vectors in a new small
+    segment and publish a snapshot with it appended; nothing already
+    published is copied. In the background, segments are folded into
+    one once there are `delta_max_segments` of them, and into a copy of
+    the base index once they hold `delta_merge_vectors`.
+
+    Deletes are O(chunks deleted): metadata and BM25 entries go away
+    immediately, while FAISS rows become tombstones filtered out at
+    search time by an IDSelector. The merge also drops them once they
+    exceed `compaction_tombstone_ratio`.
+
+    Each store owns one folder and reads its settings from `config`
+    (RagConfig, defaults to the global CONFIG), so several collections
+    can coexist with different index types.
+    """
+
+    def __init__(self, dim=768, folder=DB_FOLDER, config=None):
         self.dim = dim
+        self.folder = folder
+        self.config = config or CONFIG
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        # Held by the running background job; acquired without blocking,
+        # so a second trigger returns instead of starting another
+        self._maintenance_lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        self._snapshot: Optional[Snapshot] = None
+        # Empty single-shard index of the base's kind (trained, same
+        # transforms) that delta segments are copied from
+        self._template = None
 
+        # Nothing is read from disk until load(): importing the store
+        # (once per worker) stays cheap and startup is not blocked
+        self.loaded = False
+        self.load_ms = None
+        self.load_error = None
+        self.mmapped = False
+
+    # ---------------------------
+    # Loading & migration
+    # ---------------------------
+    def load(self):
+        """
+        Loads the last checkpoint and replays the WAL on first call;
+        later calls return immediately. Every public method calls it,
+        so the first request (or an explicit warmup) pays the cost.
+        """
+        if self.loaded:
+            return
+        with self._load_lock:
+            if self.loaded:
+                return
+            try:
+                with Timer() as t:
+                    self._load()
+            except Exception as e:
+                self.load_error = str(e)
+                # Never silently replace a store we failed to read
+                raise VectorStoreError(f"Failed to load vector store from {self.folder}: {e}") from e
+
+            self.load_ms = t.ms
+            self.load_error = None
+            self.loaded = True
+
+        logger.info(
+            f"📂 [FAISS] Vector store loaded: {self.ntotal} vectors, "
+            f"{len(self.meta)} chunks, mmap={self.mmapped} ({self.load_ms:.0f} ms)"
+        )
+
+        # Picks up a changed index configuration or leftover tombstones
+        self._maybe_promote()
+        self._maybe_compact()
+
+    def load_status(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "load_ms": self.load_ms,
+            "mmap": self.mmapped,
+            "error": self.load_error,
+        }
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.folder, name)
+
+    def _load(self):
         # Ensure db folder exists
-        if not os.path.exists(DB_FOLDER):
-            os.makedirs(DB_FOLDER)
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+
+        # Load the last checkpoint (or the legacy layout)
+        self.meta: Dict[int, dict] = {}
+        self.tombstones = set()
+        self.next_id = 0
+        self.checkpoint_generation = 0
+        self.checkpoint_lsn = 0
+        self.index_files = []
+        self._last_checkpoint = time.time()
+
+        index, bm25_file = self._load_checkpoint()
+        self._publish(index=index, deltas=(), delta_start=self.next_id)
+
+        self.documents = DocumentRegistry()
+        self.metadata = MetadataIndex()
+        for chunk_id in sorted(self.meta):
+            chunk = self.meta[chunk_id]
+            self.documents.add(chunk_id, chunk)
+            self.metadata.add(chunk_id, chunk)
+
+        self.bm25 = self._load_bm25(bm25_file)
+
+        # Replay everything logged after the checkpoint
+        self.wal = WriteAheadLog(self._path(WAL_FILE), group_commit_ms=self.config.wal_group_commit_ms)
+        replayed = 0
+        for _, record in self.wal.replay(after_lsn=self.checkpoint_lsn):
+            self._apply(record)
+            replayed += 1
+        if replayed:
+            logger.info(f"🔁 [WAL] Replayed {replayed} records after checkpoint lsn={self.checkpoint_lsn}")
+
+        self._publish(selector=self._build_selector())
+
+    def _read_index(self, paths: List[str]):
+        """
+        Flat and IVF indexes are memory-mapped read-only: pages are
+        faulted in on demand and shared between worker processes
+        through the page cache. The base index is never written to, so
+        the mapping stays valid until a merge swaps in an in-RAM copy.
+        Several paths are the shards of one index.
+        """
+        if len(paths) > 1:
+            return ShardedIndex([self._read_index([path]) for path in paths])
+
+        path = paths[0]
+        if not self.config.index_mmap:
+            return faiss.read_index(path)
+
+        index = faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        if is_hnsw(index) or not has_ids(index):
+            # HNSW walks its graph randomly, and positional indexes are
+            # rewritten by _ensure_ids anyway → load those into RAM
+            return faiss.read_index(path)
+
+        self.mmapped = True
+        return index
+
+    def _load_checkpoint(self):
+        """Loads metadata; returns the index and the BM25 file to load (if any)."""
+        if os.path.exists(self._path(MANIFEST_FILE)):
+            with open(self._path(MANIFEST_FILE), "r") as f:
+                manifest = json.load(f)
+            self.checkpoint_generation = manifest["generation"]
+            self.checkpoint_lsn = manifest["lsn"]
+            # A sharded index is checkpointed as one file per shard
+            names = manifest["index"]
+            self.index_files = [self._path(name) for name in (names if isinstance(names, list) else [names])]
+
+            index = self._read_index(self.index_files)
+            if manifest.get("template"):
+                self._template = faiss.read_index(self._path(manifest["template"]))
+                enable_reconstruct(self._template)
+            with open(self._path(manifest["meta"]), "r") as f:
+                self._load_meta(json.load(f))
+            return self._ensure_ids(index), self._path(manifest["bm25"])
+
+        if os.path.exists(self._path(INDEX_FILE)) and os.path.exists(self._path(META_FILE)):
+            self.index_files = [self._path(INDEX_FILE)]
+            index = self._read_index(self.index_files)
+            with open(self._path(META_FILE), "r") as f:
+                self._load_meta(json.load(f))
+            return self._ensure_ids(index), self._path(BM25_FILE)
+
+        # Fresh DB: the empty index is its own template
+        index = self._new_index()
+        self._template = copy_index(index.shards[0] if isinstance(index, ShardedIndex) else index)
+        return index, None
+
+    def _load_meta(self, data):
+        if isinstance(data, list):
+            # Legacy format: list position == FAISS row
+            self.meta = {i: self._normalize_entry(i, e) for i, e in enumerate(data)}
+            self.next_id = len(data)
+            return
+
+        self.meta = {int(i): chunk for i, chunk in data["chunks"].items()}
+        self.tombstones = set(data.get("tombstones", []))
+        self.next_id = data["next_id"]
+
+    @staticmethod
+    def _normalize_entry(i: int, entry) -> dict:
+        # Enforce correct format
+        if isinstance(entry, dict) and "text" in entry:
+            return entry
+
+        # Convert non-dict entries to dict format
+        return {
+            "doc_id": str(i),
+            "text": str(entry)
+        }
+
+    def _ensure_ids(self, index):
+        """Migrates a positional (pre-id) index: row i gets id i."""
+        if has_ids(index):
+            # IVF labels are already the ids
+            enable_reconstruct(index)
+            return index
+
+        n = index.ntotal
+        xb = index.reconstruct_n(0, n) if n else None
+        empty = faiss.clone_index(index)
+        empty.reset()
+        migrated = with_ids(empty)
+        if n:
+            migrated.add_with_ids(xb, np.arange(n, dtype="int64"))
+            logger.info(f"🔁 [FAISS] Migrated {n} positional vectors to id-mapped index")
+        return migrated
+
+    def _new_index(self):
+        """
+        Empty index for the configured type. Anything that needs training
+        (IVF, SQ8, PCA) starts as exact flat and is promoted once enough
+        vectors exist to train on.
+        """
+        config = self.config
+        if requires_training(config.index_type, config=config):
+            return build_index(
+                "flat", self.dim, config.index_metric, encoding="float32", reduction="none",
+                shards=config.index_shards, config=config,
+            )
+        return build_index(
+            config.index_type, self.dim, config.index_metric, shards=config.index_shards, config=config
+        )
+
+    # ---------------------------
+    # Snapshots
+    # ---------------------------
+    def _publish(self, **changes):
+        """Replaces the snapshot readers see. Caller holds the lock (or is loading)."""
+        if self._snapshot is None:
+            self._snapshot = Snapshot(next_id=self.next_id, selector=None, **changes)
+        else:
+            self._snapshot = self._snapshot._replace(next_id=self.next_id, **changes)
+
+    @property
+    def index(self):
+        """Base index of the current snapshot (the delta segments are not included)."""
+        return self._snapshot.index
+
+    @property
+    def version(self) -> int:
+        """WAL position of the latest write: advances with every add or delete, across restarts."""
+        self.load()
+        return self.wal.lsn
+
+    @property
+    def ntotal(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.index.ntotal + self._delta_vectors(snapshot)
+
+    @property
+    def delta_segments(self) -> int:
+        return len(self._snapshot.deltas)
+
+    @staticmethod
+    def _delta_vectors(snapshot: Snapshot) -> int:
+        return sum(segment.index.ntotal for segment in snapshot.deltas)
+
+    def _new_segment(self):
+        """Empty index of the base's kind, copied from the template."""
+        if self._template is None:
+            # Store from before templates were checkpointed: derive one
+            # from the base once; the next checkpoint persists it
+            index = self._snapshot.index
+            if is_exact_flat(index):
+                metric = "cosine" if self.normalize else "l2"
+                template = build_index("flat", self.dim, metric, encoding="float32", reduction="none", config=self.config)
+            else:
+                template = copy_index(index.shards[0] if isinstance(index, ShardedIndex) else index)
+                template.reset()
+                enable_reconstruct(template)
+            self._template = template
+        return copy_index(self._template)
+
+    def _reconstruct(self, snapshot: Snapshot, ids: np.ndarray) -> np.ndarray:
+        """Stored vectors for ids visible in `snapshot`, routed to the base or their segment."""
+        if not snapshot.deltas or not len(ids) or ids.max() < snapshot.delta_start:
+            return snapshot.index.reconstruct_batch(ids)
+
+        # -1 is the base, i the i-th segment
+        starts = np.array([segment.start for segment in snapshot.deltas], dtype="int64")
+        owner = np.searchsorted(starts, ids, side="right") - 1
+        out = np.empty((len(ids), self.dim), dtype="float32")
+        for i in np.unique(owner).tolist():
+            rows = owner == i
+            source = snapshot.index if i < 0 else snapshot.deltas[i].index
+            out[rows] = source.reconstruct_batch(ids[rows])
+        return out
+
+    # ---------------------------
+    # Vectors
+    # ---------------------------
+    @property
+    def normalize(self) -> bool:
+        # Cosine indexes store L2-normalized vectors
+        return self.index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+    def _prepare(self, embs) -> np.ndarray:
+        x = np.array(embs, dtype="float32", order="C", copy=True)
+        if self.normalize:
+            faiss.normalize_L2(x)
+        return x
+
+    def _build_selector(self):
+        """
+        (batch, not) selector pair excluding tombstoned ids. Snapshots
+        hold the tuple, so swapping it never frees one in use.
+        """
+        if not self.tombstones:
+            return None
+        dead = np.array(sorted(self.tombstones), dtype="int64")
+        batch = faiss.IDSelectorBatch(len(dead), faiss.swig_ptr(dead))
+        return (batch, faiss.IDSelectorNot(batch))
+
+    @staticmethod
+    def _filter_selector(allowed: np.ndarray, next_id: int):
+        """
+        (buffer, selector) admitting only `allowed` ids. A bitmap costs
+        next_id / 8 bytes, so it's used once the match set is large
+        enough that a hash set would be bigger. The buffer is returned
+        with the selector, which only holds a pointer into it.
+        """
+        if len(allowed) * 64 < next_id:
+            return (allowed, faiss.IDSelectorBatch(len(allowed), faiss.swig_ptr(allowed)))
+
+        mask = np.zeros(next_id, dtype=bool)
+        mask[allowed] = True
+        bits = np.packbits(mask, bitorder="little")
+        # FAISS takes the bitmap length in bytes, not bits
+        return (bits, faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits)))
+
+    def _exact_search(self, snapshot: Snapshot, xq: np.ndarray, allowed: np.ndarray, k: int):
+        """Brute-force scoring of a small filtered id set (no ANN recall loss)."""
+        xb = np.ascontiguousarray(self._reconstruct(snapshot, allowed), dtype="float32")
+        D, rows = faiss.knn(xq, xb, k, metric=snapshot.index.metric_type)
+        I = np.where(rows >= 0, allowed[np.maximum(rows, 0)], -1)
+        return D, I
+
+    def _ann_search(self, snapshot: Snapshot, xq: np.ndarray, k: int, params):
+        """Searches the base and every delta segment and keeps the k best overall."""
+        D, I = snapshot.index.search(xq, k, params=params)
+        segments = [segment.index for segment in snapshot.deltas if segment.index.ntotal]
+        if not segments:
+            return D, I
+
+        results = [(D, I)] + [segment.search(xq, k, params=params) for segment in segments]
+        D = np.hstack([d for d, _ in results])
+        I = np.hstack([i for _, i in results])
+        # Missing results carry the worst distance, so they sort last
+        descending = snapshot.index.metric_type == faiss.METRIC_INNER_PRODUCT
+        order = np.argsort(-D if descending else D, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+
+    # ---------------------------
+    # Background maintenance
+    # ---------------------------
+    def _start_maintenance(self, job, *args):
+        if not self._maintenance_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                job(*args)
+            except Exception as e:
+                logger.error(f"❌ [FAISS] {job.__name__} failed: {e}", exc_info=True)
+            finally:
+                self._maintenance_lock.release()
+
+        threading.Thread(target=run, name=f"faiss{job.__name__}", daemon=True).start()
+
+    def _swap_in(self, new_index, snapshot_next_id: int, removed=(), template=None):
+        """
+        Publishes a base index built from the vectors below
+        `snapshot_next_id`, with no delta segments. Must hold the lock.
+        Live vectors added after the snapshot are copied over first;
+        `removed` lists tombstoned ids the new index no longer holds.
+        `template` is an empty copy when the index kind changed.
+        """
+        removed = set(removed) | {i for i in self.tombstones if i >= snapshot_next_id}
+        added = np.array([i for i in range(snapshot_next_id, self.next_id) if i in self.meta], dtype="int64")
+        if len(added):
+            new_index.add_with_ids(self._reconstruct(self._snapshot, added), added)
+
+        enable_reconstruct(new_index)
+        if template is not None:
+            self._template = template
+        self.tombstones -= removed
+        self.mmapped = False
+        self._publish(
+            index=new_index, deltas=(), delta_start=self.next_id, selector=self._build_selector()
+        )
+
+    def _promotion_target(self):
+        config = self.config
+        # A trained flat mode (SQ8, PCA) is an explicit storage choice
+        # and wins over auto-promotion
+        if requires_training(config.index_type, config=config):
+            return config.index_type
+        uncompressed = config.index_encoding == "float32" and config.index_reduction == "none"
+        if config.index_type == "flat" and config.index_auto_promote and uncompressed:
+            return "ivf_flat"
+        return None
+
+    def _maybe_promote(self):
+        target = self._promotion_target()
+        if target is None or len(self.meta) < self.config.index_promote_threshold:
+            return
+        # Brute-force indexes move to an ANN structure; a compressed
+        # flat target only replaces the uncompressed placeholder
+        due = is_exact_flat(self.index) if target == "flat" else is_flat(self.index)
+        if due:
+            self._start_maintenance(self._promote, target)
+
+    def _promote(self, target: str):
+        """
+        Trains `target` on a snapshot of the live vectors and swaps it in.
+        Tombstoned vectors are left out, so promotion also compacts.
+        """
+        with Timer() as t:
+            with self._lock:
+                snapshot = self._snapshot
+                ids = np.array(sorted(self.meta), dtype="int64")
+                dead = list(self.tombstones)
+                metric = "cosine" if self.normalize else "l2"
+
+            # The snapshot is immutable, so the copy needs no lock
+            xb = self._reconstruct(snapshot, ids)
+            n = len(ids)
+            new_index = build_index(target, self.dim, metric, n=n, shards=self.config.index_shards, config=self.config)
+            n_train = training_sample_size(new_index, n)
+            sample = xb[np.random.default_rng(0).choice(n, n_train, replace=False)]
+            new_index.train(sample)
+            # Trained and still empty: cheap to keep as the segment template
+            template = copy_index(new_index.shards[0] if isinstance(new_index, ShardedIndex) else new_index)
+            new_index.add_with_ids(xb, ids)
+
+            with self._lock:
+                self._swap_in(new_index, snapshot.next_id, removed=dead, template=template)
+
+        logger.info(
+            f"🚀 [FAISS] Promoted flat index to {target} "
+            f"(ntotal={new_index.ntotal}, {describe_index(new_index)}, {t.ms:.0f} ms)"
+        )
 
-        # Load or create index + metadata
-        if os.path.exists(INDEX_FILE) and os.path.exists(META_FILE):
+    def tombstone_ratio(self) -> float:
+        self.load()
+        ntotal = self.ntotal
+        return len(self.tombstones) / ntotal if ntotal else 0.0
+
+    def _maybe_compact(self):
+        snapshot = self._snapshot
+        compact = self.tombstones and self.tombstone_ratio() >= self.config.compaction_tombstone_ratio
+        if compact or self._delta_vectors(snapshot) >= self.config.delta_merge_vectors:
+            self._start_maintenance(self.compact)
+        elif len(snapshot.deltas) >= self.config.delta_max_segments:
+            self._start_maintenance(self._fold_segments)
+
+    def _fold_segments(self):
+        """
+        Replaces the delta segments with one holding their live vectors,
+        so searches call FAISS twice instead of once per write. Costs
+        O(delta), unlike a merge into the base.
+        """
+        with Timer() as t:
+            with self._lock:
+                snapshot = self._snapshot
+                if len(snapshot.deltas) < 2:
+                    return
+                start = snapshot.delta_start
+                live = np.array(sorted(i for i in self.meta if start <= i < snapshot.next_id), dtype="int64")
+                dead = [i for i in self.tombstones if start <= i < snapshot.next_id]
+
+            folded = self._new_segment()
+            if len(live):
+                folded.add_with_ids(self._reconstruct(snapshot, live), live)
+
+            with self._lock:
+                current = self._snapshot
+                if current.index is not snapshot.index:
+                    # A merge replaced the base and its segments meanwhile
+                    return
+                later = tuple(segment for segment in current.deltas if segment.start >= snapshot.next_id)
+                self.tombstones.difference_update(dead)
+                self._publish(deltas=(Segment(start, folded),) + later, selector=self._build_selector())
+
+        logger.info(
+            f"🧩 [FAISS] Folded {len(snapshot.deltas)} delta segments "
+            f"({len(live)} vectors, {t.ms:.0f} ms)"
+        )
+
+    def _merged(self, snapshot: Snapshot, live: np.ndarray, dead: np.ndarray):
+        """
+        New base index holding the live vectors of `snapshot` (base and
+        delta segments), built on a copy so searches keep using the snapshot.
+        """
+        new_index = copy_index(snapshot.index)
+        base_live = live[live < snapshot.delta_start]
+        base_dead = dead[dead < snapshot.delta_start]
+
+        if len(base_dead):
+            if is_hnsw(new_index):
+                # HNSW graphs can't drop nodes → rebuild from live vectors
+                xb = new_index.reconstruct_batch(base_live) if len(base_live) else None
+                new_index.reset()
+                if len(base_live):
+                    new_index.add_with_ids(xb, base_live)
+            else:
+                new_index.remove_ids(base_dead)
+
+        delta_live = live[live >= snapshot.delta_start]
+        if len(delta_live):
+            new_index.add_with_ids(self._reconstruct(snapshot, delta_live), delta_live)
+        return new_index
+
+    def compact(self):
+        """
+        Merges the delta into the base index and physically removes
+        tombstoned vectors. Works on a copy, so searches keep using the
+        current snapshot until the swap.
+        """
+        self.load()
+        with Timer() as t:
+            with self._lock:
+                snapshot = self._snapshot
+                if not self.tombstones and not snapshot.deltas:
+                    return
+                dead = np.array(sorted(self.tombstones), dtype="int64")
+                live = np.array(sorted(i for i in self.meta if i < snapshot.next_id), dtype="int64")
+
+            new_index = self._merged(snapshot, live, dead)
+
+            with self._lock:
+                self._swap_in(new_index, snapshot.next_id, removed=dead)
+
+        logger.info(
+            f"🧹 [FAISS] Merged delta and compacted {len(dead)} tombstones "
+            f"(ntotal={new_index.ntotal}, {t.ms:.0f} ms)"
+        )
+
+    # ---------------------------
+    # BM25
+    # ---------------------------
+    def _load_bm25(self, path: str = None) -> BM25Index:
+        if path and os.path.exists(path):
             try:
-                self.index = faiss.read_index(INDEX_FILE)
-                with open(META_FILE, "r") as f:
-                    self.meta = json.load(f)
+                bm25 = BM25Index.load(path)
+                if set(bm25.doc_len) == set(self.meta):
+                    return bm25
             except Exception:
-                # Failed to load → start fresh
-                self.index = faiss.IndexFlatL2(self.dim)
-                self.meta = []
+                pass
+
+        # Missing, stale or unreadable → rebuild from metadata
+        bm25 = BM25Index()
+        for chunk_id, chunk in self.meta.items():
+            bm25.add(chunk_id, chunk["text"])
+        if self.meta:
+            logger.info(f"🔤 [BM25] Rebuilt inverted index over {len(self.meta)} chunks")
+        return bm25
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+    def _apply(self, record: dict):
+        """Applies one logged mutation. Caller holds the lock (or is replaying)."""
+        if record["op"] == "add":
+            self._apply_add(np.array(record["ids"], dtype="int64"), decode_vectors(record["vectors"]), record["chunks"])
+        elif record["op"] == "delete":
+            self._apply_delete(record["ids"])
+
+    def _apply_add(self, ids: np.ndarray, x: np.ndarray, chunks: list):
+        """
+        Vectors go to a new delta segment, published after the metadata
+        so every visible id has its chunk. WAL replay runs before any
+        reader exists and adds to the last segment in place.
+        """
+        deltas = self._snapshot.deltas
+        if deltas and not self.loaded:
+            deltas[-1].index.add_with_ids(x, ids)
         else:
-            # Fresh DB
-            self.index = faiss.IndexFlatL2(self.dim)
-            self.meta = []
+            segment = self._new_segment()
+            segment.add_with_ids(x, ids)
+            deltas = deltas + (Segment(int(ids[0]), segment),)
+        self.next_id = max(self.next_id, int(ids[-1]) + 1)
 
-    def add(self, emb, chunk):
-        self.index.add(np.array([emb]).astype("float32"))
-        self.meta.append(chunk)
+        for chunk_id, chunk in zip(ids.tolist(), chunks):
+            self.meta[chunk_id] = chunk
+            self.documents.add(chunk_id, chunk)
+            self.metadata.add(chunk_id, chunk)
+            self.bm25.add(chunk_id, chunk["text"])
 
-    def save(self):
-        os.makedirs("db", exist_ok=True)
-        faiss.write_index(self.index, INDEX_FILE)
-        with open(META_FILE, "w") as f:
-            json.dump(self.meta, f)
-
-    def search(self, q_emb, retrieval_k=5, query_text=""):
-        # 1. Vector search
-        D, I = self.index.search(np.array([q_emb]).astype("float32"), retrieval_k * 3)
-
-        vector_results = []
-        for i in I[0]:
-            if i == -1:
+        self._publish(deltas=deltas)
+
+    def _apply_delete(self, ids) -> List[int]:
+        removed = []
+        for chunk_id in ids:
+            chunk = self.meta.pop(chunk_id, None)
+            if chunk is None:
                 continue
+            removed.append(chunk_id)
+            self.tombstones.add(chunk_id)
+            self.bm25.remove(chunk_id, chunk["text"])
+            self.metadata.remove(chunk_id, chunk)
+            self.documents.remove(chunk_id, chunk)
+        return removed
 
-            entry = self.meta[i]
+    def add(self, emb, chunk) -> int:
+        return self.add_batch(np.array([emb]), [chunk])[0]
 
-            # Enforce correct format
-            if isinstance(entry, dict) and "text" in entry:
-                vector_results.append(entry)
-            else:
-                # Convert non-dict entries to dict format
-                vector_results.append({
-                    "doc_id": str(i),
-                    "text": str(entry)
-                })
-
-        # 2. Keyword scoring
-        scored = []
-        for entry in vector_results:
-            kw = keyword_score(query_text, entry["text"])
-            scored.append({
-                "score": kw,
-                **entry
+    def add_batch(self, embs, chunks) -> List[int]:
+        """
+        Adds a (n, dim) embedding matrix and its n chunks in one FAISS
+        call. Returns the chunk ids assigned to them once the write is
+        durable in the WAL.
+        """
+        if len(chunks) == 0:
+            return []
+        self.load()
+        x = self._prepare(embs)
+
+        with self._lock:
+            ids = np.arange(self.next_id, self.next_id + len(chunks), dtype="int64")
+            # Logged before applied: a failed append leaves the store untouched
+            lsn = self.wal.append({
+                "op": "add",
+                "ids": ids.tolist(),
+                "vectors": encode_vectors(x),
+                "chunks": chunks,
             })
+            self._apply_add(ids, x, chunks)
+
+        # Outside the lock, so concurrent uploads share one fsync
+        self.wal.sync(lsn)
+
+        self._maybe_promote()
+        self._maybe_compact()
+        self._maybe_checkpoint()
+        return ids.tolist()
+
+    def delete_ids(self, ids) -> int:
+        """Tombstones chunks by id. Returns how many existed."""
+        self.load()
+        with self._lock:
+            removed = [i for i in dict.fromkeys(ids) if i in self.meta]
+            if removed:
+                lsn = self.wal.append({"op": "delete", "ids": removed})
+                self._apply_delete(removed)
+                self._publish(selector=self._build_selector())
+
+        if removed:
+            self.wal.sync(lsn)
+            self._maybe_compact()
+            self._maybe_checkpoint()
+        return len(removed)
+
+    def delete_document(self, doc_id: str) -> int:
+        """Tombstones every chunk of a document. Returns the chunk count."""
+        self.load()
+        return self.delete_ids(list(self.documents.chunk_ids(doc_id)))
+
+    def find_file(self, file_hash: str) -> Optional[str]:
+        """doc_id of a live document uploaded from identical file bytes, if any."""
+        self.load()
+        for chunk_id in self.metadata.lookup("file_hash", file_hash):
+            chunk = self.meta.get(chunk_id)
+            if chunk is not None:
+                return chunk["doc_id"]
+        return None
+
+    def vectors_for_hashes(self, chunk_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Stored vectors of already indexed chunks, by normalized text
+        hash, so re-uploaded text needs no embedding call. Vectors come
+        back as stored (normalized for cosine). A quantized or reduced
+        index returns nothing: its vectors would be re-added with the
+        loss compounded, so callers go through the embedding cache.
+        """
+        self.load()
+        snapshot = self._snapshot
+        if not stores_exact_vectors(snapshot.index):
+            return {}
+        found = {}
+        for h in set(chunk_hashes):
+            ids = [i for i in self.metadata.lookup("chunk_hash", h) if i < snapshot.next_id and i in self.meta]
+            if ids:
+                found[h] = min(ids)
+        if not found:
+            return {}
+
+        matrix = self._reconstruct(snapshot, np.array(list(found.values()), dtype="int64"))
+        return dict(zip(found, matrix))
+
+    def stored_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (ids, vectors) of every live chunk, as stored. Raises when the
+        index keeps them lossily (quantized or reduced).
+        """
+        self.load()
+        snapshot = self._snapshot
+        if not stores_exact_vectors(snapshot.index):
+            raise VectorStoreError(
+                f"Stored vectors are lossy ({describe_index(snapshot.index)['type']}, "
+                f"encoding={self.config.index_encoding}, reduction={self.config.index_reduction})"
+            )
+        ids = np.array(sorted(i for i in self.meta if i < snapshot.next_id), dtype="int64")
+        if not len(ids):
+            return ids, np.zeros((0, self.dim), dtype="float32")
+        return ids, self._reconstruct(snapshot, ids)
+
+    def get_document(self, doc_id: str) -> Optional[dict]:
+        """Registry record of a document (filename, size, hash, chunk count...)."""
+        self.load()
+        return self.documents.get(doc_id)
+
+    def list_documents(self, offset: int = 0, limit: int = 50) -> dict:
+        """One page of document records, newest upload first."""
+        self.load()
+        return {
+            "total": len(self.documents),
+            "offset": offset,
+            "limit": limit,
+            "documents": self.documents.page(offset, limit),
+        }
+
+    def get_chunks(self, doc_id: str, offset: int = 0, limit: Optional[int] = None) -> List[dict]:
+        """A document's chunks in order, looked up by id (no scan)."""
+        self.load()
+        chunks = (self.meta.get(i) for i in self.documents.chunk_ids(doc_id, offset, limit))
+        # A concurrent delete may have removed some meanwhile
+        return [chunk for chunk in chunks if chunk is not None]
+
+    # ---------------------------
+    # Checkpoints
+    # ---------------------------
+    def _maybe_checkpoint(self):
+        due = (
+            self.wal.size_bytes() >= self.config.wal_checkpoint_bytes
+            or time.time() - self._last_checkpoint >= self.config.wal_checkpoint_interval_s
+        )
+        if not due or not self._checkpoint_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self._checkpoint()
+            except Exception as e:
+                logger.error(f"❌ [WAL] Checkpoint failed: {e}", exc_info=True)
+            finally:
+                self._checkpoint_lock.release()
+
+        threading.Thread(target=run, name="faiss-checkpoint", daemon=True).start()
+
+    @staticmethod
+    def _write_durable(path: str, write):
+        """write(tmp_path), fsync, then atomically rename over `path`."""
+        tmp = path + ".tmp"
+        write(tmp)
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def checkpoint(self):
+        """
+        Writes a full snapshot under a new generation, atomically
+        switches the manifest to it, then drops the WAL records it
+        covers. A crash at any point leaves either the old or the new
+        checkpoint intact.
+        """
+        self.load()
+        with self._checkpoint_lock:
+            self._checkpoint()
+
+    def _checkpoint(self):
+        """
+        Only the state capture holds the write lock; merging the delta,
+        serializing and fsyncing run outside it while writes continue
+        (they land in the WAL after the captured position).
+        Caller holds the checkpoint lock.
+        """
+        with Timer() as t:
+            with self._lock:
+                snapshot = self._snapshot
+                lsn, wal_offset = self.wal.position()
+                next_id = self.next_id
+                meta = dict(self.meta)
+                tombstones = set(self.tombstones)
+                bm25 = self.bm25.copy()
+
+            # The delta segments are folded into the base first, so one index is written
+            index = snapshot.index
+            template = self._template
+            dead = np.array(sorted(i for i in tombstones if i >= snapshot.delta_start), dtype="int64")
+            if snapshot.deltas:
+                live = np.array(sorted(i for i in meta if i >= snapshot.delta_start), dtype="int64")
+                index = self._merged(snapshot, live, dead)
+                tombstones.difference_update(dead.tolist())
+
+            generation = self.checkpoint_generation + 1
+            shards = index.shards if isinstance(index, ShardedIndex) else [index]
+            index_names = (
+                [f"index.{generation}.{i}.faiss" for i in range(len(shards))]
+                if len(shards) > 1 else [f"index.{generation}.faiss"]
+            )
+            files = {
+                "index": index_names if len(shards) > 1 else index_names[0],
+                "meta": f"meta.{generation}.json",
+                "bm25": f"bm25.{generation}.json",
+            }
+            if template is not None:
+                # Empty but trained: lets a reload create segments without copying the base
+                files["template"] = f"template.{generation}.faiss"
+
+            def write_meta(path):
+                with open(path, "w") as f:
+                    json.dump({
+                        "next_id": next_id,
+                        "chunks": meta,
+                        "tombstones": sorted(tombstones),
+                    }, f)
+
+            def write_manifest(path):
+                with open(path, "w") as f:
+                    json.dump({"generation": generation, "lsn": lsn, **files}, f)
+
+            for shard, name in zip(shards, index_names):
+                self._write_durable(
+                    self._path(name),
+                    lambda path, shard=shard: faiss.write_index(shard, path),
+                )
+            if template is not None:
+                self._write_durable(
+                    self._path(files["template"]),
+                    lambda path: faiss.write_index(template, path),
+                )
+            self._write_durable(self._path(files["meta"]), write_meta)
+            self._write_durable(self._path(files["bm25"]), bm25.save)
+            fsync_dir(self.folder)
+
+            # The commit point
+            self._write_durable(self._path(MANIFEST_FILE), write_manifest)
+            fsync_dir(self.folder)
+
+            self.wal.truncate(wal_offset)
+            previous = self.checkpoint_generation
+            previous_index_files = self.index_files
+            self.checkpoint_generation = generation
+            self.checkpoint_lsn = lsn
+            self.index_files = [self._path(name) for name in index_names]
+            self._last_checkpoint = time.time()
+
+            if index is not snapshot.index:
+                with self._lock:
+                    # Unless a merge replaced the base meanwhile, serve
+                    # the merged index too: the segments go for free
+                    if self._snapshot.index is snapshot.index:
+                        self._swap_in(index, snapshot.next_id, removed=dead)
+
+        self._remove_old_checkpoints(previous, previous_index_files)
+        logger.info(f"💾 [WAL] Checkpoint {generation} at lsn={lsn} ({t.ms:.0f} ms)")
+
+    def _remove_old_checkpoints(self, generation: int, index_files: List[str]):
+        if generation:
+            names = [f"meta.{generation}.json", f"bm25.{generation}.json", f"template.{generation}.faiss"]
+        else:
+            names = [META_FILE, BM25_FILE]
+        paths = list(index_files) + [self._path(name) for name in names]
+
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def save(self):
+        """Forces a checkpoint. Writes are already durable through the WAL."""
+        self.checkpoint()
+
+    def close(self):
+        if not self.loaded:
+            # Never loaded → nothing new to persist
+            return
+        self.checkpoint()
+        self.wal.close()
+
+    # ---------------------------
+    # Reads
+    # ---------------------------
+    def search(self, q_emb, retrieval_k=5, query_text="", nprobe=None, ef_search=None, filters=None):
+        """
+        Hybrid search: FAISS and BM25 each produce `retrieval_k * 3`
+        candidates over the whole corpus, fused with reciprocal-rank
+        fusion. Each hit carries its chunk `id` and the stored `vector`,
+        so callers never need to re-embed chunk text.
+
+        `nprobe` (IVF) and `ef_search` (HNSW) override the configured
+        defaults for this call only.
+
+        `filters` restricts both rankings to chunks whose metadata
+        matches, e.g. {"doc_id": ["a", "b"], "tags": "returns",
+        "uploaded_after": datetime(...)}; see MetadataIndex.match.
+        """
+        return self.search_batch(
+            np.asarray([q_emb]), retrieval_k, [query_text], nprobe, ef_search, filters
+        )[0]
+
+    def search_batch(self, q_embs, retrieval_k=5, query_texts=None, nprobe=None, ef_search=None, filters=None):
+        """
+        search() for a (n, dim) query matrix: one FAISS call for all
+        rows (multithreaded inside FAISS) and one reconstruct for every
+        returned chunk. `query_texts` feeds BM25, one per row.
+        Returns one result list per query.
+        """
+        self.load()
+        n_candidates = retrieval_k * 3
+        # Everything below reads this snapshot; ids added after it
+        # (seen by BM25 or the posting index) are left out
+        snapshot = self._snapshot
+        index = snapshot.index
+        selector = snapshot.selector
+        query_texts = query_texts or [""] * len(q_embs)
+
+        if len(q_embs) == 0:
+            return []
+
+        # Filters resolve to live chunk ids through the posting index,
+        # so tombstones never match and need no separate selector
+        allowed = self.metadata.match(filters) if filters else None
+        if allowed is not None:
+            allowed = {i for i in allowed if i < snapshot.next_id}
+            if not allowed:
+                return [[] for _ in range(len(q_embs))]
+
+        # 1. Vector search (tombstones / filtered-out ids excluded inside FAISS)
+        xq = self._prepare(q_embs)
+        if allowed is not None and len(allowed) <= self.config.filter_exact_threshold:
+            D, I = self._exact_search(snapshot, xq, np.array(sorted(allowed), dtype="int64"), n_candidates)
+        else:
+            if allowed is not None:
+                selector = self._filter_selector(np.array(sorted(allowed), dtype="int64"), snapshot.next_id)
+            D, I = self._ann_search(
+                snapshot,
+                xq,
+                n_candidates,
+                search_params(
+                    index, nprobe, ef_search, sel=selector[1] if selector else None, config=self.config
+                ),
+            )
+
+        per_query = []
+        for row, query_text in enumerate(query_texts):
+            vector_ids = [int(i) for i in I[row] if i != -1]
+            distances = {int(i): float(d) for i, d in zip(I[row], D[row]) if i != -1}
+
+            # 2. Lexical search
+            bm25_hits = []
+            if self.config.bm25_enabled and query_text:
+                bm25_hits = self.bm25.search(query_text, n_candidates, allowed=allowed)
+
+            # 3. Reciprocal-rank fusion
+            fused = reciprocal_rank_fusion(
+                [
+                    (vector_ids, self.config.rrf_vector_weight),
+                    ([i for i, _ in bm25_hits], self.config.rrf_bm25_weight),
+                ],
+                k=self.config.rrf_k,
+            )
+            # A chunk deleted since the snapshot has no metadata left
+            chunks = {}
+            for i in sorted(fused, key=fused.get, reverse=True):
+                chunk = self.meta.get(i) if i < snapshot.next_id else None
+                if chunk is not None:
+                    chunks[i] = chunk
+                    if len(chunks) == retrieval_k:
+                        break
+            per_query.append((chunks, fused, distances, dict(bm25_hits)))
 
-        # 3. Sort & truncate
-        scored = sorted(scored, key=lambda x: x["score"], reverse=True)
-        
-        return scored[:retrieval_k]
+        # 4. Stored vectors for every hit in one call
+        # (truncated indexes return the kept prefix only)
+        unique_ids = sorted({i for chunks, *_ in per_query for i in chunks})
+        vectors = {}
+        if unique_ids:
+            matrix = self._reconstruct(snapshot, np.array(unique_ids, dtype="int64"))[:, :informative_dim(index)]
+            vectors = dict(zip(unique_ids, matrix))
 
+        results = []
+        for chunks, fused, distances, bm25_scores in per_query:
+            results.append([
+                {
+                    **chunk,
+                    "score": fused[i],
+                    "id": i,
+                    "vector": vectors[i],
+                    "vector_distance": distances.get(i),
+                    "bm25_score": bm25_scores.get(i, 0.0),
+                }
+                for i, chunk in chunks.items()
+            ])
 
+        return results
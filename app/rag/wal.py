@@ -0,0 +1,189 @@
+import base64
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Iterator, Tuple
+import numpy as np
+from app.core.logger import logger
+
+def encode_vectors(x: np.ndarray) -> dict:
+    x = np.ascontiguousarray(x, dtype="float32")
+    return {"shape": list(x.shape), "data": base64.b64encode(x.tobytes()).decode("ascii")}
+
+def decode_vectors(obj: dict) -> np.ndarray:
+    raw = base64.b64decode(obj["data"])
+    return np.frombuffer(raw, dtype="float32").reshape(obj["shape"]).copy()
+
+def fsync_dir(path: str):
+    """Makes a rename inside `path` durable (no-op where unsupported)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class WriteAheadLog:
+    """
+    Append-only log of vector store mutations.
+
+    Each line is "<crc32 hex> <json>\\n" and carries a monotonically
+    increasing `lsn`. A torn last line (crash mid-write) fails its
+    checksum and is dropped on replay.
+
+    Group commit: append() only buffers; sync(lsn) blocks until that
+    record is on disk. Whichever waiter finds no fsync in flight
+    becomes the leader and fsyncs everything buffered so far, so
+    concurrent writers share one fsync.
+    """
+
+    def __init__(self, path: str, group_commit_ms: float = 0.0):
+        self.path = path
+        self.group_commit_ms = group_commit_ms
+        self._cond = threading.Condition()
+        self._file = open(path, "ab")
+        self._lsn = 0
+        self._durable_lsn = 0
+        self._syncing = False
+        self.fsync_count = 0
+
+    # ---------------------------
+    # Replay
+    # ---------------------------
+    def replay(self, after_lsn: int = 0) -> Iterator[Tuple[int, dict]]:
+        """
+        Yields (lsn, record) for every intact record newer than
+        `after_lsn`, and truncates a corrupt tail so new appends
+        start on a clean line.
+        """
+        good_bytes = 0
+        max_lsn = after_lsn
+
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    crc, payload = line.rstrip(b"\n").split(b" ", 1)
+                    if not line.endswith(b"\n") or int(crc, 16) != zlib.crc32(payload):
+                        raise ValueError("checksum mismatch")
+                    record = json.loads(payload)
+                except ValueError:
+                    logger.warning(f"⚠️ [WAL] Dropping corrupt tail at byte {good_bytes}")
+                    break
+
+                good_bytes += len(line)
+                lsn = record.pop("lsn")
+                max_lsn = max(max_lsn, lsn)
+                if lsn > after_lsn:
+                    yield lsn, record
+
+        with self._cond:
+            if good_bytes < os.path.getsize(self.path):
+                self._file.close()
+                with open(self.path, "r+b") as f:
+                    f.truncate(good_bytes)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._file = open(self.path, "ab")
+
+            self._lsn = max(self._lsn, max_lsn)
+            self._durable_lsn = self._lsn
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+    @property
+    def lsn(self) -> int:
+        return self._lsn
+
+    def size_bytes(self) -> int:
+        with self._cond:
+            return self._file.tell()
+
+    def append(self, record: dict) -> int:
+        """Buffers a record and returns its lsn. Not durable until sync()."""
+        with self._cond:
+            self._lsn += 1
+            payload = json.dumps({**record, "lsn": self._lsn}).encode("utf-8")
+            self._file.write(b"%08x " % zlib.crc32(payload) + payload + b"\n")
+            return self._lsn
+
+    def sync(self, lsn: int):
+        """Blocks until every record up to `lsn` has been fsynced."""
+        with self._cond:
+            while self._durable_lsn < lsn:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+
+                # Become the leader for this group
+                self._syncing = True
+                try:
+                    if self.group_commit_ms:
+                        # Let concurrent writers join the group
+                        self._cond.release()
+                        try:
+                            time.sleep(self.group_commit_ms / 1000)
+                        finally:
+                            self._cond.acquire()
+
+                    target = self._lsn
+                    self._file.flush()
+                    fd = self._file.fileno()
+
+                    self._cond.release()
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        self._cond.acquire()
+
+                    self._durable_lsn = max(self._durable_lsn, target)
+                    self.fsync_count += 1
+                finally:
+                    self._syncing = False
+                    self._cond.notify_all()
+
+    def position(self) -> Tuple[int, int]:
+        """(lsn, byte offset) of the last appended record, for truncate()."""
+        with self._cond:
+            return self._lsn, self._file.tell()
+
+    def truncate(self, offset: int = None):
+        """
+        Drops every record before byte `offset` (all of them by
+        default); call only once a checkpoint covers them. Records
+        appended since are kept: they are copied to a new file that
+        atomically replaces the log.
+        """
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+            self._file.flush()
+            if offset is None or offset >= self._file.tell():
+                self._file.truncate(0)
+                self._file.seek(0)
+                os.fsync(self._file.fileno())
+            else:
+                tmp = self.path + ".tmp"
+                with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+                    src.seek(offset)
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                self._file.close()
+                os.replace(tmp, self.path)
+                fsync_dir(os.path.dirname(self.path) or ".")
+                self._file = open(self.path, "ab")
+            self._durable_lsn = self._lsn
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
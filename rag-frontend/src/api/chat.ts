@@ -1,5 +1,5 @@
 import API from "./client";
-import type { ChatResponse } from "../models/rag";
+import type { ChatResponse, ChatStreamHandlers } from "../models/rag";
 import type { AxiosError } from "axios";
 
 export async function sendChat(
@@ -36,6 +36,77 @@ export async function sendChat(
   }
 }
 
+// Server-sent events from /chat/stream: sources, tokens, then the
+// guardrail verdict. Uses fetch because EventSource can't POST.
+export async function streamChat(
+  sessionId: string,
+  userMessage: string,
+  handlers: ChatStreamHandlers
+): Promise<void> {
+  const body = {
+    session_id: sessionId,
+    messages: [{ role: "user", content: userMessage }],
+  };
+
+  let res: Response;
+  try {
+    res = await fetch(`${API.defaults.baseURL}/chat/stream`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(body),
+    });
+  } catch {
+    throw new Error("Failed to communicate with the server.");
+  }
+
+  if (!res.ok || !res.body) {
+    throw new Error("Failed to communicate with the server.");
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary !== -1) {
+      await dispatchEvent(buffer.slice(0, boundary), handlers);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf("\n\n");
+    }
+  }
+}
+
+async function dispatchEvent(block: string, handlers: ChatStreamHandlers) {
+  let event = "message";
+  const data: string[] = [];
+
+  for (const line of block.split("\n")) {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+  }
+  if (data.length === 0) return;
+
+  const payload = JSON.parse(data.join("\n"));
+  switch (event) {
+    case "sources":
+      await handlers.onSources(payload.sources);
+      break;
+    case "token":
+      await handlers.onToken(payload.text);
+      break;
+    case "done":
+      await handlers.onDone(payload);
+      break;
+    case "error":
+      throw new Error(payload.message ?? "RAG error");
+  }
+}
+
 function isAxiosError(error: unknown): error is AxiosError {
   return (
     typeof error === "object" &&
@@ -1,8 +1,8 @@
-import type { DocumentChunk } from "../models/rag";
+import type { DocumentChunk, DocumentPage, DocumentRecord } from "../models/rag";
 import API from "./client";
 
-export function listDocuments() {
-  return API.get<Record<string, { count: number }>>("/documents");
+export function listDocuments(offset = 0, limit = 50) {
+  return API.get<DocumentPage>("/documents", { params: { offset, limit } });
 }
 
 export function getDocument(docId: string) {
@@ -26,5 +26,5 @@ export function uploadDocument(form: FormData) {
 }
 
 export async function getDocumentChunks(docId: string) {
-  return API.get<{ chunks: DocumentChunk[] }>(`/documents/${docId}`);
+  return API.get<{ document: DocumentRecord; chunks: DocumentChunk[] }>(`/documents/${docId}`);
 }
\ No newline at end of file
@@ -4,6 +4,7 @@ export interface FaissInfo {
   vectors: number;
   dimension: number;
   documents: number;
+  chunks: number;
   index_file_size_bytes: number;
 }
 
@@ -1,6 +1,6 @@
 import { useState, useRef, useEffect } from "react";
 import { Send } from "lucide-react";
-import { sendChat } from "../api/chat";
+import { streamChat } from "../api/chat";
 import type { SourceChunk, Confidence } from "../models/rag";
 import SourcesDrawer from "./SourcesDrawer";
 
@@ -70,49 +70,53 @@ export default function Chat({ sessionId }: Props) {
     const userInput = input;
     setInput("");
 
-    try {
-      const response = await sendChat(sessionId, userInput);
-
-      // Create an empty assistant message first
-      setMessages((prev) => [
-        ...prev,
-        { role: "assistant", content: "", rendered: "", sources: response.sources },
-      ]);
-
-      await animateAssistantResponse(response.answer, response.confidence, response.sources);
-
-    } catch {
-      setMessages((prev) => [
-        ...prev,
-        {
-          role: "assistant",
-          content: "⚠️ Error communicating with backend.",
-        },
-      ]);
-    }
-  }
-
-  async function animateAssistantResponse(fullText: string, confidence?: Confidence, sources?: SourceChunk[]) {
-    let displayed = "";
+    // Empty assistant message, filled in as tokens arrive
+    setMessages((prev) => [...prev, { role: "assistant", content: "", rendered: "" }]);
 
-    for (let i = 0; i < fullText.length; i++) {
-      displayed += fullText[i];
-
-      const rendered = await renderMarkdown(displayed);
+    let content = "";
+    let sources: SourceChunk[] | undefined;
+    let confidence: Confidence | undefined;
 
+    const updateAssistant = async () => {
+      const rendered = await renderMarkdown(content);
       setMessages((prev) => {
         const updated = [...prev];
         updated[updated.length - 1] = {
           role: "assistant",
-          content: displayed,
+          content,
           rendered,
           sources,
-          confidence
+          confidence,
         };
         return updated;
       });
+    };
 
-      await new Promise((res) => setTimeout(res, 8)); // typing speed
+    try {
+      await streamChat(sessionId, userInput, {
+        onSources: (s) => {
+          sources = s;
+        },
+        onToken: async (text) => {
+          content += text;
+          await updateAssistant();
+        },
+        onDone: async (result) => {
+          // Final decoded answer; guardrails may also have replaced it
+          content = result.answer;
+          confidence = result.confidence;
+          await updateAssistant();
+        },
+      });
+    } catch {
+      setMessages((prev) => {
+        const updated = [...prev];
+        updated[updated.length - 1] = {
+          role: "assistant",
+          content: "⚠️ Error communicating with backend.",
+        };
+        return updated;
+      });
     }
   }
 
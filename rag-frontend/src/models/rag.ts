@@ -11,6 +11,25 @@ export interface DocumentChunk {
   offset_end: number;
 }
 
+export interface DocumentRecord {
+  doc_id: string;
+  filename: string | null;
+  file_size: number | null;
+  file_hash: string | null;
+  tags: string[] | null;
+  uploaded_at: number | null;
+  updated_at: number | null;
+  chunk_count: number;
+  chunk_ranges: [number, number][];
+}
+
+export interface DocumentPage {
+  total: number;
+  offset: number;
+  limit: number;
+  documents: DocumentRecord[];
+}
+
 export interface ChatResponse {
   answer: string;
   allowed: boolean;
@@ -19,4 +38,10 @@ export interface ChatResponse {
   sources: SourceChunk[];
 }
 
-export type Confidence = "high" | "medium" | "low" | "blocked";
\ No newline at end of file
+export type Confidence = "high" | "medium" | "low" | "blocked";
+
+export interface ChatStreamHandlers {
+  onSources: (sources: SourceChunk[]) => void | Promise<void>;
+  onToken: (text: string) => void | Promise<void>;
+  onDone: (result: Omit<ChatResponse, "sources">) => void | Promise<void>;
+}
\ No newline at end of file
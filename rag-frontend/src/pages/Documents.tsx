@@ -4,10 +4,21 @@ import { Trash2, RefreshCcw } from "lucide-react";
 import UploadBox from "../components/UploadBox";
 import { getDocumentChunks } from "../api/docs";
 import ChunkDrawer from "../components/ChunkDrawer";
-import type { DocumentChunk } from "../models/rag";
+import type { DocumentChunk, DocumentRecord } from "../models/rag";
+
+const PAGE_SIZE = 50;
+
+function formatSize(bytes: number | null) {
+  if (bytes == null) return null;
+  if (bytes < 1024) return `${bytes} B`;
+  if (bytes < 1024 * 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+  return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+}
 
 export default function DocumentsPage() {
-  const [docs, setDocs] = useState<Record<string, { count: number }>>({});
+  const [docs, setDocs] = useState<DocumentRecord[]>([]);
+  const [total, setTotal] = useState(0);
+  const [offset, setOffset] = useState(0);
   const [loading, setLoading] = useState(false);
   const [drawerOpen, setDrawerOpen] = useState(false);
   const [selectedDoc, setSelectedDoc] = useState<string | null>(null);
@@ -17,8 +28,9 @@ export default function DocumentsPage() {
   async function refreshDocs() {
     setLoading(true);
     try {
-      const res = await listDocuments();
-      setDocs(res.data);
+      const res = await listDocuments(offset, PAGE_SIZE);
+      setDocs(res.data.documents);
+      setTotal(res.data.total);
     } catch (err) {
       console.error(err);
     }
@@ -31,8 +43,11 @@ export default function DocumentsPage() {
     async function load() {
         setLoading(true);
         try {
-        const res = await listDocuments();
-        if (mounted) setDocs(res.data);
+        const res = await listDocuments(offset, PAGE_SIZE);
+        if (mounted) {
+          setDocs(res.data.documents);
+          setTotal(res.data.total);
+        }
         } finally {
         if (mounted) setLoading(false);
         }
@@ -43,7 +58,7 @@ export default function DocumentsPage() {
     return () => {
         mounted = false;
     };
-    }, []);
+    }, [offset]);
 
   async function handleDelete(docId: string) {
     if (!confirm("Delete this document?")) return;
@@ -73,35 +88,42 @@ export default function DocumentsPage() {
     </div>
 
       <div className="space-y-4">
-        {Object.entries(docs).map(([docId, info]) => (
+        {docs.map((doc) => (
           <div
-            key={docId}
+            key={doc.doc_id}
             className="border border-neutral-700 bg-neutral-800 rounded-xl p-4 flex justify-between items-center"
           >
             <div>
-              <div className="font-medium">{docId}</div>
+              <div className="font-medium">{doc.filename ?? doc.doc_id}</div>
               <div className="text-sm text-neutral-400">
-                {info.count} chunks
+                {[
+                  `${doc.chunk_count} chunks`,
+                  formatSize(doc.file_size),
+                  doc.uploaded_at ? new Date(doc.uploaded_at * 1000).toLocaleString() : null,
+                ]
+                  .filter(Boolean)
+                  .join(" · ")}
               </div>
+              <div className="text-xs text-neutral-500">{doc.doc_id}</div>
             </div>
 
             <div className="flex gap-3">
               <button
-                onClick={() => handleViewChunks(docId)}
+                onClick={() => handleViewChunks(doc.doc_id)}
                 className="p-2 bg-neutral-700 hover:bg-neutral-600 rounded-xl"
               >
                 View
               </button>
               
               <button
-                onClick={() => handleReindex(docId)}
+                onClick={() => handleReindex(doc.doc_id)}
                 className="p-2 bg-blue-600 hover:bg-blue-700 rounded-xl"
               >
                 <RefreshCcw size={18} />
               </button>
 
               <button
-                onClick={() => handleDelete(docId)}
+                onClick={() => handleDelete(doc.doc_id)}
                 className="p-2 bg-red-600 hover:bg-red-700 rounded-xl"
               >
                 <Trash2 size={18} />
@@ -110,10 +132,32 @@ export default function DocumentsPage() {
           </div>
         ))}
 
-        {Object.keys(docs).length === 0 && !loading && (
+        {docs.length === 0 && !loading && (
           <div className="text-neutral-400">No documents indexed yet.</div>
         )}
       </div>
+
+      {total > PAGE_SIZE && (
+        <div className="flex justify-between items-center mt-6 text-sm text-neutral-400">
+          <button
+            onClick={() => setOffset(Math.max(offset - PAGE_SIZE, 0))}
+            disabled={offset === 0}
+            className="px-3 py-1 bg-neutral-700 hover:bg-neutral-600 rounded-xl disabled:opacity-40"
+          >
+            Previous
+          </button>
+          <span>
+            {offset + 1}–{Math.min(offset + PAGE_SIZE, total)} of {total}
+          </span>
+          <button
+            onClick={() => setOffset(offset + PAGE_SIZE)}
+            disabled={offset + PAGE_SIZE >= total}
+            className="px-3 py-1 bg-neutral-700 hover:bg-neutral-600 rounded-xl disabled:opacity-40"
+          >
+            Next
+          </button>
+        </div>
+      )}
       <ChunkDrawer
         open={drawerOpen}
         onClose={() => setDrawerOpen(false)}
@@ -0,0 +1,13 @@
+import pytest
+
+from app.rag.rag import _decode_answer
+
+
+@pytest.mark.parametrize("raw, decoded", [
+    ("Caf\\u00e9\\nNext line", "Café\nNext line"),
+    ("Café, déjà vu", "Café, déjà vu"),
+    ("naïve \\u00e9", "naïve é"),
+    ("a \\ b", "a \\ b"),
+])
+def test_decode_keeps_non_ascii_text(raw, decoded):
+    assert _decode_answer(raw) == decoded
@@ -0,0 +1,121 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import CONFIG
+from app.core.metrics import metrics
+from app.rag import reranker
+
+CHUNKS = [
+    {"text": "alpha", "score": 0.4},
+    {"text": "beta", "score": 0.9},
+    {"text": "gamma", "score": 0.6},
+]
+
+
+class FakeClient:
+    """Stands in for the Ollama client: fails listwise calls, scores by text."""
+
+    def __init__(self, listwise=None, pointwise=None):
+        self.listwise = listwise
+        self.pointwise = pointwise or {}
+
+    def _reply(self, prompt, format=None):
+        if format == "json":
+            if isinstance(self.listwise, Exception):
+                raise self.listwise
+            return {"response": self.listwise}
+        for text, score in self.pointwise.items():
+            if f"Chunk:\n{text}\n" in prompt:
+                if isinstance(score, Exception):
+                    raise score
+                return {"response": str(score)}
+        raise AssertionError("unexpected prompt")
+
+    def generate(self, model, prompt, format=None):
+        return self._reply(prompt, format)
+
+
+class FakeAsyncClient(FakeClient):
+    async def generate(self, model, prompt, format=None):
+        return self._reply(prompt, format)
+
+
+@pytest.fixture(autouse=True)
+def _fresh(monkeypatch):
+    monkeypatch.setattr(CONFIG, "rerank_cache_enabled", False)
+    metrics.reset()
+
+
+def _use(monkeypatch, **replies):
+    monkeypatch.setattr(reranker, "get_sync_client", lambda timeout=None: FakeClient(**replies))
+    monkeypatch.setattr(reranker, "get_async_client", lambda timeout=None: FakeAsyncClient(**replies))
+
+
+def _pointwise(mode, chunks):
+    if mode == "async":
+        return asyncio.run(reranker.arerank_pointwise("q", chunks))
+    return reranker.rerank_pointwise("q", chunks)
+
+
+def _rerank(mode, chunks):
+    if mode == "async":
+        return asyncio.run(reranker.arerank_listwise("q", chunks))
+    return reranker.rerank_listwise("q", chunks)
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_failed_listwise_call_falls_back_to_pointwise(monkeypatch, mode):
+    _use(monkeypatch, listwise=ConnectionError("reset"), pointwise={"alpha": 90, "beta": 10, "gamma": 50})
+
+    ranked = _rerank(mode, CHUNKS)
+
+    assert [c["text"] for c in ranked] == ["alpha", "gamma", "beta"]
+    assert metrics.data["rerank_fallback_count"] == 1
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_unparseable_listwise_reply_falls_back_to_pointwise(monkeypatch, mode):
+    _use(monkeypatch, listwise="not json", pointwise={"alpha": 90, "beta": 10, "gamma": 50})
+
+    ranked = _rerank(mode, CHUNKS)
+
+    assert [c["text"] for c in ranked] == ["alpha", "gamma", "beta"]
+    assert metrics.data["rerank_fallback_count"] == 1
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_failed_fallback_keeps_retrieval_order(monkeypatch, mode):
+    _use(monkeypatch, listwise=ConnectionError("reset"))
+    monkeypatch.setattr(reranker, "rerank_pointwise", _raise)
+    monkeypatch.setattr(reranker, "arerank_pointwise", _araise)
+
+    ranked = _rerank(mode, CHUNKS)
+
+    assert [c["text"] for c in ranked] == ["beta", "gamma", "alpha"]
+    assert ranked[0]["score"] == 100
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_failed_pointwise_calls_keep_their_retrieval_score(monkeypatch, mode):
+    _use(monkeypatch, pointwise={
+        "alpha": 80,
+        "beta": httpx.ReadTimeout("slow"),
+        "gamma": ConnectionError("reset"),
+    })
+
+    ranked = _pointwise(mode, CHUNKS)
+
+    # beta and gamma fall back to their retrieval scores rescaled: 100 and 67
+    assert [(c["text"], c["score"]) for c in ranked] == [("beta", 100), ("alpha", 80), ("gamma", 67)]
+    assert metrics.data["rerank_timeout_count"] == 1
+    assert metrics.data["rerank_error_count"] == 1
+
+
+def _raise(*args):
+    raise RuntimeError("pointwise down")
+
+
+async def _araise(*args):
+    raise RuntimeError("pointwise down")
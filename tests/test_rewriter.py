@@ -0,0 +1,40 @@
+import pytest
+
+from app.core.config import CONFIG
+from app.rag.rewriter import should_rewrite
+
+
+@pytest.fixture(autouse=True)
+def _auto(monkeypatch):
+    monkeypatch.setattr(CONFIG, "rewrite_mode", "auto")
+    monkeypatch.setattr(CONFIG, "rewrite_min_words", 6)
+
+
+@pytest.mark.parametrize("question", [
+    "How does it work with large PDF files?",
+    "What is this used for in the pipeline?",
+    "Why did they change the default chunk size?",
+    "Can you explain what that means for retrieval?",
+    "Explain the stuff about embeddings and indexes",
+    "How should I tune HNSW for faster search?",
+    "reranker timeout setting",
+])
+def test_vague_questions_are_rewritten(question):
+    assert should_rewrite(question)
+
+
+@pytest.mark.parametrize("question", [
+    "How does the vector store compact segments when it grows large?",
+    "Which settings control the reranker timeout and what do they default to?",
+    "Does the ingestion pipeline keep this document's metadata after chunking?",
+    "Why does the ingestion pipeline split documents into overlapping chunks?",
+])
+def test_specific_questions_skip_the_rewrite(question):
+    assert not should_rewrite(question)
+
+
+def test_modes_force_the_choice(monkeypatch):
+    monkeypatch.setattr(CONFIG, "rewrite_mode", "always")
+    assert should_rewrite("Why does the ingestion pipeline split documents into overlapping chunks?")
+    monkeypatch.setattr(CONFIG, "rewrite_mode", "off")
+    assert not should_rewrite("How does it work?")
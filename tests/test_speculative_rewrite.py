@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from app.core.config import CONFIG
+from app.core.metrics import metrics
+from app.rag import rag
+
+HITS = [{"id": 1, "text": "alpha", "score": 0.9}]
+
+
+@pytest.fixture(autouse=True)
+def _speculative(monkeypatch):
+    monkeypatch.setattr(CONFIG, "rewrite_speculative", True)
+    monkeypatch.setattr(rag, "cached_rewrite", lambda question: None)
+    monkeypatch.setattr(rag, "_embed_stage", lambda text: [0.0])
+    monkeypatch.setattr(rag, "_search_stage", lambda *args: HITS)
+
+    async def aembed(text):
+        return [0.0]
+
+    async def asearch(*args):
+        return HITS
+
+    monkeypatch.setattr(rag, "_aembed_stage", aembed)
+    monkeypatch.setattr(rag, "_asearch_stage", asearch)
+    metrics.reset()
+
+
+def _fail(question):
+    raise ConnectionError("ollama down")
+
+
+async def _afail(question):
+    raise ConnectionError("ollama down")
+
+
+def test_failed_rewrite_answers_from_the_original_question(monkeypatch):
+    monkeypatch.setattr(rag, "generate_rewrite", _fail)
+
+    rewritten, q_emb, chunks = rag._retrieve_stage("what is it")
+
+    assert (rewritten, q_emb, chunks) == ("what is it", [0.0], HITS)
+    assert metrics.data["rewrite_discarded_count"] == 1
+
+
+def test_failed_async_rewrite_answers_from_the_original_question(monkeypatch):
+    monkeypatch.setattr(rag, "agenerate_rewrite", _afail)
+
+    rewritten, q_emb, chunks = asyncio.run(rag._aretrieve_stage("what is it"))
+
+    assert (rewritten, q_emb, chunks) == ("what is it", [0.0], HITS)
+    assert metrics.data["rewrite_discarded_count"] == 1
@@ -0,0 +1,27 @@
+import pytest
+from app.evaluation.concurrency_stress import run_stress
+
+@pytest.mark.parametrize("index_type, overrides", [
+    ("flat", {}),
+    # Promoted mid-run, so training, the template swap and merges all race the writers
+    ("ivf_flat", {"index_promote_threshold": 300, "ivf_nlist": 8}),
+])
+def test_stress_has_no_errors_and_reloads_consistently(tmp_path, index_type, overrides):
+    report = run_stress(
+        seconds=2.0,
+        writers=2,
+        deleters=1,
+        searchers=2,
+        index_type=index_type,
+        dim=16,
+        folder=str(tmp_path),
+        # Checkpoints and segment folds happen during the run too
+        wal_checkpoint_bytes=50_000,
+        delta_max_segments=4,
+        **overrides,
+    )
+
+    assert report["error_count"] == 0, report["errors"]
+    assert report["uploads"] > 0
+    assert report["deletes"] > 0
+    assert report["searches"] > 0
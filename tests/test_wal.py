@@ -0,0 +1,124 @@
+import numpy as np
+from app.core.config import CONFIG, RagConfig
+from app.rag.vectorstore import WAL_FILE, VectorStore
+from app.rag.wal import WriteAheadLog
+
+def _records(path, after_lsn=0):
+    return [(lsn, record["n"]) for lsn, record in WriteAheadLog(path).replay(after_lsn)]
+
+def test_replay_drops_a_corrupt_tail(tmp_path):
+    path = str(tmp_path / "wal.log")
+    wal = WriteAheadLog(path)
+    for n in range(3):
+        wal.sync(wal.append({"n": n}))
+    wal.close()
+
+    # Torn write: half a record, no newline
+    with open(path, "ab") as f:
+        f.write(b'deadbeef {"n": 3, "ls')
+
+    wal = WriteAheadLog(path)
+    assert [(lsn, r["n"]) for lsn, r in wal.replay()] == [(1, 0), (2, 1), (3, 2)]
+
+    # The tail is cut, so new records follow the last intact line
+    wal.sync(wal.append({"n": 4}))
+    wal.close()
+    assert _records(path) == [(1, 0), (2, 1), (3, 2), (4, 4)]
+
+def test_replay_drops_a_bad_checksum(tmp_path):
+    path = str(tmp_path / "wal.log")
+    wal = WriteAheadLog(path)
+    for n in range(2):
+        wal.sync(wal.append({"n": n}))
+    wal.close()
+
+    with open(path, "rb") as f:
+        lines = f.readlines()
+    lines[1] = lines[1].replace(b'"n": 1', b'"n": 9')
+    with open(path, "wb") as f:
+        f.writelines(lines)
+
+    assert _records(path) == [(1, 0)]
+
+def test_truncate_keeps_records_after_the_offset(tmp_path):
+    path = str(tmp_path / "wal.log")
+    wal = WriteAheadLog(path)
+    for n in range(3):
+        wal.append({"n": n})
+    lsn, offset = wal.position()
+    for n in range(3, 5):
+        wal.append({"n": n})
+
+    wal.truncate(offset)
+    wal.sync(wal.append({"n": 5}))
+    wal.close()
+
+    assert lsn == 3
+    assert _records(path) == [(4, 3), (5, 4), (6, 5)]
+
+def test_truncate_without_offset_drops_everything(tmp_path):
+    path = str(tmp_path / "wal.log")
+    wal = WriteAheadLog(path)
+    wal.append({"n": 0})
+    wal.truncate()
+    wal.close()
+
+    assert _records(path) == []
+
+def _store(folder):
+    # No background promotion or compaction: the tests inspect tombstones and segments
+    config = RagConfig(**{
+        **CONFIG.model_dump(),
+        "index_auto_promote": False,
+        "compaction_tombstone_ratio": 1.0,
+        "wal_group_commit_ms": 0.0,
+    })
+    store = VectorStore(dim=8, folder=str(folder), config=config)
+    store.load()
+    return store
+
+def _add(store, doc_id, n, seed):
+    vectors = np.random.default_rng(seed).standard_normal((n, 8))
+    return store.add_batch(vectors, [{"doc_id": doc_id, "text": f"{doc_id} chunk {i}"} for i in range(n)])
+
+def test_writes_during_a_checkpoint_survive_a_restart(tmp_path):
+    store = _store(tmp_path)
+    _add(store, "before", 5, seed=0)
+    store.delete_ids([0])
+
+    # A write landing after the checkpoint captured its state, just
+    # before the WAL is truncated
+    truncate = store.wal.truncate
+    late = []
+
+    def truncate_after_write(offset=None):
+        late.extend(_add(store, "during", 3, seed=1))
+        truncate(offset)
+
+    store.wal.truncate = truncate_after_write
+    store.checkpoint()
+    store.wal.truncate = truncate
+    store.wal.close()
+
+    reloaded = _store(tmp_path)
+    assert reloaded.checkpoint_generation == 1
+    assert sorted(reloaded.meta) == [1, 2, 3, 4] + late
+    assert reloaded.ntotal - len(reloaded.tombstones) == len(reloaded.meta)
+    hits = reloaded.search(np.random.default_rng(1).standard_normal(8), retrieval_k=3)
+    assert hits[0]["doc_id"] == "during"
+    reloaded.close()
+
+def test_replay_restores_deltas_and_tombstones(tmp_path):
+    store = _store(tmp_path)
+    first = _add(store, "a", 4, seed=0)
+    second = _add(store, "b", 4, seed=1)
+    store.delete_document("a")
+    assert store.delta_segments == 2
+    store.wal.close()
+
+    # No checkpoint: everything comes back from the WAL
+    reloaded = _store(tmp_path)
+    assert sorted(reloaded.meta) == second
+    assert set(first) <= reloaded.tombstones
+    assert {hit["doc_id"] for hit in reloaded.search(np.ones(8), retrieval_k=8)} == {"b"}
+    reloaded.close()